@@ -0,0 +1,325 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Tuple
+from Logic.Belief_Functions.Engine import BeliefParameters, RISK_ORDER, norm_column
+
+
+# Search ranges per parameter kind
+WEIGHT_BOUNDS = (0.0, 2.0)
+GATE_THRESHOLD_BOUNDS = (0.0, 1.0)
+GATE_FACTOR_BOUNDS = (0.0, 1.0)
+COMPETITION_BOUNDS = (0.0, 1.0)
+PRIOR_BOUNDS = (0.05, 1.0)
+
+# Cells (rows x candidates) evaluated per vectorized block, bounds memory use
+BLOCK_CELLS = 4_000_000
+
+
+@dataclass
+class CalibrationResult:
+    params: BeliefParameters
+    score: float
+    baseline_score: float
+    evaluated: int
+
+
+class ParameterSpace:
+    """
+    Flat vector view of a BeliefParameters.
+    Candidates are rows of a (C, dim) matrix so they can be scored together.
+    """
+
+    def __init__(self, template: BeliefParameters):
+        self.template = template
+        self.slots: List[Tuple[str, str]] = []
+        bounds = []
+
+        for group in ("low_weights", "medium_weights", "high_weights"):
+            for name in getattr(template, group):
+                self.slots.append((group, name))
+                bounds.append(WEIGHT_BOUNDS)
+
+        for attr, bound in (
+            ("gate_threshold", GATE_THRESHOLD_BOUNDS),
+            ("gate_factor", GATE_FACTOR_BOUNDS),
+            ("high_competition", COMPETITION_BOUNDS),
+            ("medium_competition", COMPETITION_BOUNDS),
+        ):
+            self.slots.append((attr, None))
+            bounds.append(bound)
+
+        for level in RISK_ORDER:
+            self.slots.append(("priors", level.value))
+            bounds.append(PRIOR_BOUNDS)
+
+        self.bounds = np.array(bounds, dtype=float)
+
+    @property
+    def dim(self) -> int:
+        return len(self.slots)
+
+    def to_vector(self, params: BeliefParameters) -> np.ndarray:
+        vector = np.empty(self.dim)
+        for i, (attr, key) in enumerate(self.slots):
+            value = getattr(params, attr)
+            vector[i] = value[key] if key is not None else value
+        return vector
+
+    def to_params(self, vector: np.ndarray) -> BeliefParameters:
+        data = self.template.to_dict()
+        for (attr, key), value in zip(self.slots, vector):
+            if key is None:
+                data[attr] = float(value)
+            else:
+                data[attr][key] = float(value)
+
+        # Only the ratio of priors matters for the decision, publish them normalized
+        total = sum(data["priors"].values())
+        data["priors"] = {k: v / total for k, v in data["priors"].items()}
+        return BeliefParameters.from_dict(data)
+
+    def clip(self, candidates: np.ndarray) -> np.ndarray:
+        return np.clip(candidates, self.bounds[:, 0], self.bounds[:, 1])
+
+    def sample(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        low, high = self.bounds[:, 0], self.bounds[:, 1]
+        return low + rng.random((n, self.dim)) * (high - low)
+
+
+class _Objective:
+    """Vectorized scoring of many candidate parameter vectors on fixed data"""
+
+    def __init__(self, space: ParameterSpace, features: np.ndarray, labels: np.ndarray, metric: str):
+        if metric not in ("accuracy", "log_loss"):
+            raise ValueError(f"Unknown metric: {metric}")
+
+        self.metric = metric
+
+        # Rows sorted by label: correctness becomes a per-slice comparison.
+        # float64 like the engine, so near ties are decided the same way.
+        order = np.argsort(labels, kind="stable")
+        features, self.labels = features[order].astype(np.float64), labels[order]
+        self.slices = [
+            slice(*np.searchsorted(self.labels, [k, k + 1])) for k in range(len(RISK_ORDER))
+        ]
+
+        columns = space.template.columns()
+        position = {name: i for i, name in enumerate(columns)}
+
+        # Feature sub-matrices, column order matching the vector slots
+        template = space.template
+        self.x_low = features[:, [position[n] for n in template.low_weights]]
+        self.x_medium = features[:, [position[n] for n in template.medium_weights]]
+        self.x_high = features[:, [position[n] for n in template.high_weights]]
+        self.strong_high = features[:, [position[n] for n in template.gate_columns]].max(axis=1)
+
+        n_low, n_medium, n_high = len(template.low_weights), len(template.medium_weights), len(template.high_weights)
+        self.cuts = np.cumsum([n_low, n_medium, n_high, 1, 1, 1, 1])
+
+    def __call__(self, candidates: np.ndarray) -> np.ndarray:
+        n = len(self.labels)
+        block = max(1, BLOCK_CELLS // max(n, 1))
+        return np.concatenate([
+            self._score(candidates[start:start + block])
+            for start in range(0, len(candidates), block)
+        ]) if len(candidates) else np.empty(0)
+
+    def _beliefs(self, c: np.ndarray):
+        w_low, w_medium, w_high, threshold, factor, high_comp, medium_comp, priors = np.split(c, self.cuts, axis=1)
+
+        # (N, C) evidence for every candidate at once
+        low = self.x_low @ w_low.T
+        medium = self.x_medium @ w_medium.T
+        high = self.x_high @ w_high.T
+
+        gated = self.strong_high[:, None] < threshold[:, 0]
+        high *= np.where(gated, factor[:, 0], 1.0)
+
+        high *= 1 - high_comp[:, 0] * medium
+        medium *= 1 - medium_comp[:, 0] * low
+
+        # Normalized as ParameterSpace.to_params publishes them
+        priors = priors / priors.sum(axis=1, keepdims=True)
+        low *= priors[:, 0]
+        medium *= priors[:, 1]
+        high *= priors[:, 2]
+        return low, medium, high
+
+    def _score(self, c: np.ndarray) -> np.ndarray:
+        low, medium, high = self._beliefs(c.astype(np.float64))
+        total = low + medium + high
+        empty = total == 0
+
+        # The engine's decision rule: beliefs divided by their total. Competition
+        # can make the total negative, which reverses the order of the beliefs.
+        total = np.where(empty, 1.0, total)
+        low, medium, high = low / total, medium / total, high / total
+
+        if self.metric == "accuracy":
+            # Same tie-breaking as max() over the LOW, MEDIUM, HIGH dict
+            s_low, s_medium, s_high = self.slices
+            correct = (
+                ((low[s_low] >= medium[s_low]) & (low[s_low] >= high[s_low]) & ~empty[s_low]).sum(axis=0)
+                + ((medium[s_medium] > low[s_medium]) & (medium[s_medium] >= high[s_medium])
+                   & ~empty[s_medium]).sum(axis=0)
+                + ((high[s_high] > low[s_high]) & (high[s_high] > medium[s_high]) | empty[s_high]).sum(axis=0)
+            )
+            return correct / max(len(self.labels), 1)
+
+        # Mean log-likelihood of the true class, so that higher is better for both metrics
+        log_likelihood = 0.0
+        for k, (beliefs, fallback) in enumerate(zip((low, medium, high), (0.33, 0.33, 0.34))):
+            rows = self.slices[k]
+            chosen = np.where(empty[rows], fallback, beliefs[rows])
+            log_likelihood = log_likelihood + np.log(np.clip(chosen, 1e-12, 1.0)).sum(axis=0)
+        return log_likelihood / max(len(self.labels), 1)
+
+
+# Worker-side state, set once per process by the pool initializer
+_WORKER_OBJECTIVE = None
+
+
+def _init_worker(objective: _Objective):
+    global _WORKER_OBJECTIVE
+    _WORKER_OBJECTIVE = objective
+
+
+def _score_in_worker(candidates: np.ndarray) -> np.ndarray:
+    return _WORKER_OBJECTIVE(candidates)
+
+
+class BeliefCalibrator:
+    """
+    Fits BeliefEngine weights, gating, competition and priors on a labeled
+    DataFrame ("Level" column). Candidates are scored in vectorized blocks,
+    spread over worker processes.
+    """
+
+    def __init__(self, df: pd.DataFrame, params: BeliefParameters = None,
+                 metric: str = "accuracy", n_jobs: int = None):
+        self.params = params or BeliefParameters()
+        self.space = ParameterSpace(self.params)
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+
+        features, labels = self._prepare(df)
+        self.objective = _Objective(self.space, features, labels, metric)
+        self.evaluated = 0
+        self._pool = None
+
+    def _prepare(self, df: pd.DataFrame):
+        if "Level" not in df:
+            raise ValueError("Calibration needs a labeled DataFrame with a 'Level' column")
+
+        levels = df["Level"].astype(str).str.strip().str.capitalize()
+        index = {level.value: i for i, level in enumerate(RISK_ORDER)}
+        labels = levels.map(index)
+        known = labels.notna().to_numpy()
+
+        features = np.column_stack([norm_column(df, name) for name in self.params.columns()])
+        return features[known], labels[known].to_numpy(dtype=np.int64)
+
+    # ==================== Scoring ====================
+
+    def score(self, candidates: np.ndarray) -> np.ndarray:
+        candidates = np.atleast_2d(candidates)
+        self.evaluated += len(candidates)
+
+        if self.n_jobs <= 1 or len(candidates) < 2 * self.n_jobs:
+            return self.objective(candidates)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_jobs, initializer=_init_worker, initargs=(self.objective,)
+            )
+        chunks = np.array_split(candidates, self.n_jobs)
+        return np.concatenate(list(self._pool.map(_score_in_worker, chunks)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _result(self, best: np.ndarray, best_score: float, baseline: float) -> CalibrationResult:
+        return CalibrationResult(
+            params=self.space.to_params(best),
+            score=float(best_score),
+            baseline_score=float(baseline),
+            evaluated=self.evaluated
+        )
+
+    # ==================== Search strategies ====================
+
+    def random_search(self, n_candidates: int = 2000, seed: int = None,
+                      local_fraction: float = 0.5, spread: float = 0.15) -> CalibrationResult:
+        """
+        Random search: a share of candidates is drawn uniformly over the bounds,
+        the rest as perturbations of the starting parameters.
+        """
+        rng = np.random.default_rng(seed)
+        start = self.space.to_vector(self.params)
+        baseline = self.score(start)[0]
+
+        n_local = int(n_candidates * local_fraction)
+        width = self.space.bounds[:, 1] - self.space.bounds[:, 0]
+        local = self.space.clip(start + rng.normal(size=(n_local, self.space.dim)) * width * spread)
+        candidates = np.vstack([local, self.space.sample(n_candidates - n_local, rng)])
+
+        scores = self.score(candidates)
+        best = int(np.argmax(scores))
+        if scores[best] <= baseline:
+            return self._result(start, baseline, baseline)
+        return self._result(candidates[best], scores[best], baseline)
+
+    def coordinate_descent(self, steps: int = 21, rounds: int = 5, tol: float = 1e-6) -> CalibrationResult:
+        """
+        Coordinate descent: each parameter in turn is scanned over a grid
+        of its range (all grid points scored in one batch), keeping the best.
+        """
+        current = self.space.to_vector(self.params)
+        baseline = current_score = self.score(current)[0]
+
+        for _ in range(rounds):
+            improved = False
+
+            for i in range(self.space.dim):
+                grid = np.linspace(self.space.bounds[i, 0], self.space.bounds[i, 1], steps)
+                candidates = np.repeat(current[None, :], steps, axis=0)
+                candidates[:, i] = grid
+
+                scores = self.score(candidates)
+                best = int(np.argmax(scores))
+                if scores[best] > current_score + tol:
+                    current = candidates[best]
+                    current_score = scores[best]
+                    improved = True
+
+            if not improved:
+                break
+
+        return self._result(current, current_score, baseline)
+
+
+def calibrate_belief_engine(df: pd.DataFrame, method: str = "coordinate_descent",
+                            output_path: str = None, metric: str = "accuracy",
+                            n_jobs: int = None, **kwargs) -> CalibrationResult:
+    """Fit BeliefEngine parameters on labeled data and optionally save them"""
+    with BeliefCalibrator(df, metric=metric, n_jobs=n_jobs) as calibrator:
+        if method == "random_search":
+            result = calibrator.random_search(**kwargs)
+        elif method == "coordinate_descent":
+            result = calibrator.coordinate_descent(**kwargs)
+        else:
+            raise ValueError(f"Unknown calibration method: {method}")
+
+    if output_path:
+        result.params.save(output_path)
+    return result
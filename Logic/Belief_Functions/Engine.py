@@ -1,13 +1,149 @@
-from typing import Dict
+import json
+import threading
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field, asdict, replace
+from typing import Dict, List
 from Knowledge.Hierarchy import RiskLevel
 
 
+# Column order used by the batch (array) outputs
+RISK_ORDER = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH]
+
+
+@dataclass
+class BeliefParameters:
+    """
+    Tunable constants of BeliefEngine (evidence weights, gating,
+    competition, priors). Defaults are the hand-calibrated values.
+    """
+
+    # LOW risk: weak / common symptoms
+    low_weights: Dict[str, float] = field(default_factory=lambda: {
+        "Frequent Cold": 0.4,
+        "Snoring": 0.4,
+        "Air Pollution": 0.3,
+        "Fatigue": 0.3,
+    })
+
+    # MEDIUM risk: functional impairment
+    medium_weights: Dict[str, float] = field(default_factory=lambda: {
+        "Chest Pain": 0.4,
+        "Dry Cough": 0.4,
+        "Weight Loss": 0.3,
+        "Shortness of Breath": 0.2,
+        "Alcohol use": 0.2,
+    })
+
+    # HIGH raw evidence
+    high_weights: Dict[str, float] = field(default_factory=lambda: {
+        "Coughing of Blood": 1.2,
+        "Smoking": 0.6,
+        "Wheezing": 0.7,
+    })
+
+    # Severity gating: HIGH evidence is damped unless a strong symptom is present
+    gate_columns: List[str] = field(default_factory=lambda: [
+        "Coughing of Blood", "Weight Loss", "Shortness of Breath"
+    ])
+    gate_threshold: float = 0.5
+    gate_factor: float = 0.4
+
+    # Competition (belief interaction)
+    high_competition: float = 0.5
+    medium_competition: float = 0.3
+
+    # Dataset priors (calibration), keyed by RiskLevel value
+    priors: Dict[str, float] = field(default_factory=lambda: {
+        "Low": 0.35,
+        "Medium": 0.35,
+        "High": 0.30,
+    })
+
+    def columns(self) -> List[str]:
+        """Every input column used, in first-seen order"""
+        seen = {}
+        for group in (self.low_weights, self.medium_weights, self.high_weights, self.gate_columns):
+            for name in group:
+                seen.setdefault(name, None)
+        return list(seen)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BeliefParameters":
+        return cls(**data)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "BeliefParameters":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _to_float(v) -> float:
+    try:
+        return float(v)
+    except Exception:
+        return 0.0
+
+
+def norm_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    """Column-wise BeliefEngine._norm: severities of a column in [0,1] (missing column => 0)"""
+    if name not in df:
+        return np.zeros(len(df))
+
+    column = df[name]
+    if pd.api.types.is_numeric_dtype(column):
+        values = column.to_numpy(dtype=float)
+    else:
+        # Mixed / text columns keep the exact scalar semantics
+        values = np.array([_to_float(v) for v in column], dtype=float)
+
+    return np.minimum(np.maximum(values / 10.0, 0.0), 1.0)
+
+
 class BeliefEngine:
     """
     Calibrated belief-based inference engine
     (Dempster–Shafer inspired, but decision-oriented)
+
+    params can be a BeliefParameters, a dict, or a path to a saved parameter file.
     """
 
+    def __init__(self, params=None):
+        if params is None:
+            params = BeliefParameters()
+        elif isinstance(params, dict):
+            params = BeliefParameters.from_dict(params)
+        elif isinstance(params, str):
+            params = BeliefParameters.load(params)
+        self._params_lock = threading.Lock()
+        self._params = params
+
+    @property
+    def params(self) -> BeliefParameters:
+        return self._params
+
+    @params.setter
+    def params(self, params: BeliefParameters):
+        with self._params_lock:
+            self._params = params
+
+    def update_params(self, **changes) -> BeliefParameters:
+        """
+        Replace some fields of the current parameters in one step: the
+        read and the swap happen under the same lock as a plain
+        params assignment, so concurrent swaps are never lost.
+        """
+        with self._params_lock:
+            self._params = replace(self._params, **changes)
+            return self._params
+
     def _norm(self, v):
         """Normalize symptom severity to [0,1]"""
         try:
@@ -16,74 +152,32 @@ class BeliefEngine:
             return 0.0
 
     def infer(self, row) -> Dict:
+        p = self.params
 
         # --- Normalize symptoms (UI-safe: missing => 0) ---
-        blood = self._norm(row.get("Coughing of Blood", 0))
-        weight = self._norm(row.get("Weight Loss", 0))
-        breath = self._norm(row.get("Shortness of Breath", 0))
-        air = self._norm(row.get("Air Pollution", 0))
-        alcohol = self._norm(row.get("Alcohol use", 0))
-
-        chest = self._norm(row.get("Chest Pain", 0))
-        fatigue = self._norm(row.get("Fatigue", 0))
-        cough = self._norm(row.get("Dry Cough", 0))
-        wheeze = self._norm(row.get("Wheezing", 0))
-
-        cold = self._norm(row.get("Frequent Cold", 0))
-        snore = self._norm(row.get("Snoring", 0))
-
-        smoking = self._norm(row.get("Smoking", 0))
-        passive = self._norm(row.get("Passive Smoker", 0))
+        values = {name: self._norm(row.get(name, 0)) for name in p.columns()}
 
         # Evidence construction
-
-        # LOW risk: weak / common symptoms
-        low_evidence = (
-            cold * 0.4 +
-            snore * 0.4 +
-            air * 0.3 +
-            fatigue * 0.3 
-        )
-
-        # MEDIUM risk: functional impairment
-        medium_evidence = (
-            chest * 0.4 +
-            cough * 0.4 +
-            weight * 0.3 +
-            breath * 0.2 +
-            alcohol * 0.2
-        )
-
-        # HIGH raw evidence
-        high_raw = (
-            blood * 1.2 +
-            smoking * 0.6 +
-            wheeze * 0.7
-        )
+        low_evidence = sum(values[name] * w for name, w in p.low_weights.items())
+        medium_evidence = sum(values[name] * w for name, w in p.medium_weights.items())
+        high_raw = sum(values[name] * w for name, w in p.high_weights.items())
 
         # Severity gating (CRITICAL)
-        strong_high = max(blood, weight, breath)
+        strong_high = max(values[name] for name in p.gate_columns)
 
-        if strong_high < 0.5:
-            high_evidence = high_raw * 0.4
+        if strong_high < p.gate_threshold:
+            high_evidence = high_raw * p.gate_factor
         else:
             high_evidence = high_raw
 
         # Competition (belief interaction)
-        high_evidence *= (1 - 0.5 * medium_evidence)
-        medium_evidence *= (1 - 0.3 * low_evidence)
-
-        # Dataset priors (calibration)
-        priors = {
-            RiskLevel.LOW: 0.35,
-            RiskLevel.MEDIUM: 0.35,
-            RiskLevel.HIGH: 0.30,
-        }
+        high_evidence *= (1 - p.high_competition * medium_evidence)
+        medium_evidence *= (1 - p.medium_competition * low_evidence)
 
         beliefs = {
-            RiskLevel.LOW: low_evidence * priors[RiskLevel.LOW],
-            RiskLevel.MEDIUM: medium_evidence * priors[RiskLevel.MEDIUM],
-            RiskLevel.HIGH: high_evidence * priors[RiskLevel.HIGH],
+            RiskLevel.LOW: low_evidence * p.priors[RiskLevel.LOW.value],
+            RiskLevel.MEDIUM: medium_evidence * p.priors[RiskLevel.MEDIUM.value],
+            RiskLevel.HIGH: high_evidence * p.priors[RiskLevel.HIGH.value],
         }
 
         # Normalize
@@ -105,3 +199,52 @@ class BeliefEngine:
             "beliefs": beliefs,
             "confidence": beliefs[predicted]
         }
+
+    def _weighted_sum(self, values: Dict[str, np.ndarray], weights: Dict[str, float], n: int) -> np.ndarray:
+        # Accumulate left to right like the scalar sum() so results are bit-identical
+        total = np.zeros(n)
+        for name, w in weights.items():
+            total = total + values[name] * w
+        return total
+
+    def infer_batch(self, df: pd.DataFrame) -> Dict:
+        """
+        Vectorized equivalent of infer() over a whole DataFrame.
+        Beliefs columns follow RISK_ORDER.
+        """
+        p = self.params
+        n = len(df)
+
+        values = {name: norm_column(df, name) for name in p.columns()}
+
+        low_evidence = self._weighted_sum(values, p.low_weights, n)
+        medium_evidence = self._weighted_sum(values, p.medium_weights, n)
+        high_raw = self._weighted_sum(values, p.high_weights, n)
+
+        strong_high = np.max([values[name] for name in p.gate_columns], axis=0)
+        high_evidence = np.where(strong_high < p.gate_threshold, high_raw * p.gate_factor, high_raw)
+
+        high_evidence = high_evidence * (1 - p.high_competition * medium_evidence)
+        medium_evidence = medium_evidence * (1 - p.medium_competition * low_evidence)
+
+        beliefs = np.column_stack([
+            low_evidence * p.priors[RiskLevel.LOW.value],
+            medium_evidence * p.priors[RiskLevel.MEDIUM.value],
+            high_evidence * p.priors[RiskLevel.HIGH.value],
+        ])
+
+        total = beliefs[:, 0] + beliefs[:, 1] + beliefs[:, 2]
+        empty = total == 0
+
+        beliefs = beliefs / np.where(empty, 1.0, total)[:, None]
+        beliefs[empty] = [0.33, 0.33, 0.34]
+
+        predicted_index = np.argmax(beliefs, axis=1)
+        confidence = beliefs[np.arange(len(beliefs)), predicted_index]
+
+        return {
+            "predicted_index": predicted_index,
+            "predicted": np.array(RISK_ORDER, dtype=object)[predicted_index],
+            "beliefs": beliefs,
+            "confidence": confidence
+        }
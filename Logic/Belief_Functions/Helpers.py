@@ -1,7 +1,35 @@
 import pandas as pd
 from typing import List, Dict
 from Knowledge.Hierarchy import RiskLevel
-from Logic.Belief_Functions.Engine import BeliefEngine
+from Logic.Belief_Functions.Engine import BeliefEngine, RISK_ORDER, norm_column
+from Logic.Belief_Functions.Mass import RISK_FRAME, MassFunction, combine
+
+
+# Per-symptom evidence sources: column -> (focal risk levels, max support)
+# Severity (normalized to [0,1]) scales the support given to the focal set.
+SYMPTOM_EVIDENCE = {
+    "Frequent Cold": ([RiskLevel.LOW], 0.4),
+    "Snoring": ([RiskLevel.LOW], 0.4),
+    "Air Pollution": ([RiskLevel.LOW, RiskLevel.MEDIUM], 0.3),
+    "Fatigue": ([RiskLevel.LOW, RiskLevel.MEDIUM], 0.3),
+
+    "Chest Pain": ([RiskLevel.MEDIUM, RiskLevel.HIGH], 0.4),
+    "Dry Cough": ([RiskLevel.MEDIUM], 0.4),
+    "Weight Loss": ([RiskLevel.MEDIUM, RiskLevel.HIGH], 0.3),
+    "Shortness of Breath": ([RiskLevel.MEDIUM, RiskLevel.HIGH], 0.3),
+    "Alcohol use": ([RiskLevel.MEDIUM], 0.2),
+
+    "Coughing of Blood": ([RiskLevel.HIGH], 0.8),
+    "Smoking": ([RiskLevel.HIGH], 0.5),
+    "Wheezing": ([RiskLevel.HIGH], 0.5),
+}
+
+
+def _parse_level(value):
+    try:
+        return RiskLevel(str(value).strip().capitalize())
+    except Exception:
+        return None
 
 
 def analyze_with_belief(df: pd.DataFrame, verbose: bool = False) -> List[Dict]:
@@ -12,29 +40,30 @@ def analyze_with_belief(df: pd.DataFrame, verbose: bool = False) -> List[Dict]:
     if verbose:
         print("Running Dempster–Shafer belief analysis...")
 
-    for _, row in df.iterrows():
-        inference = engine.infer(row)
+    # Whole-frame inference, rows are only walked to build the result dicts
+    inference = engine.infer_batch(df)
 
-        predicted = inference["predicted"]
-        confidence = inference["confidence"]
+    n = len(df)
+    patient_ids = df["Patient Id"].tolist() if "Patient Id" in df else ["UI"] * n
+    actuals = [_parse_level(v) for v in df["Level"]] if "Level" in df else [None] * n
+    beliefs = inference["beliefs"].tolist()
+
+    for i in range(n):
+        predicted = inference["predicted"][i]
+        confidence = float(inference["confidence"][i])
 
         # Actual label (if exists)
-        actual = None
-        if "Level" in row:
-            try:
-                actual = RiskLevel(str(row["Level"]).strip().capitalize())
-            except Exception:
-                actual = None
+        actual = actuals[i]
 
         correct = predicted == actual if actual else False
 
         results.append({
-            "patient_id": row.get("Patient Id", "UI"),
+            "patient_id": patient_ids[i],
             "predicted": predicted,
             "predicted_risk": predicted,   # UI compatibility
             "actual": actual,
             "correct": correct,
-            "belief": {k.value: v for k, v in inference["beliefs"].items()},
+            "belief": {k.value: v for k, v in zip(RISK_ORDER, beliefs[i])},
             "confidence": confidence
         })
 
@@ -46,3 +75,70 @@ def analyze_with_belief(df: pd.DataFrame, verbose: bool = False) -> List[Dict]:
             )
 
     return results
+
+
+def build_symptom_masses(df: pd.DataFrame, evidence: Dict = None) -> List[MassFunction]:
+    """One simple support function per symptom, batched over the DataFrame rows"""
+    evidence = evidence or SYMPTOM_EVIDENCE
+
+    return [
+        MassFunction.simple(RISK_FRAME, focal, norm_column(df, column) * strength)
+        for column, (focal, strength) in evidence.items()
+    ]
+
+
+def analyze_with_mass_functions(df: pd.DataFrame, rule: str = "dempster",
+                                verbose: bool = False) -> List[Dict]:
+    """
+    Dempster–Shafer analysis: per-symptom sources are combined for all
+    patients at once, decision is taken on the pignistic probabilities.
+    """
+    sources = build_symptom_masses(df)
+
+    # Keep the conflict of the unnormalized combination for reporting
+    if rule == "dempster":
+        conjunctive = combine(sources, "conjunctive")
+        conflict = conjunctive.conflict
+        combined = conjunctive.normalize()
+    else:
+        combined = combine(sources, rule)
+        conflict = combined.conflict
+
+    belief = combined.belief()
+    plausibility = combined.plausibility()
+    betp = combined.pignistic()
+    predicted_index = betp.argmax(axis=1)
+
+    masks = [RISK_FRAME.mask(level) for level in RISK_ORDER]
+
+    n = len(df)
+    patient_ids = df["Patient Id"].tolist() if "Patient Id" in df else ["UI"] * n
+    actuals = [_parse_level(v) for v in df["Level"]] if "Level" in df else [None] * n
+
+    results = []
+    for i in range(n):
+        predicted = RISK_ORDER[predicted_index[i]]
+        actual = actuals[i]
+
+        results.append({
+            "patient_id": patient_ids[i],
+            "predicted": predicted,
+            "predicted_risk": predicted,   # UI compatibility
+            "actual": actual,
+            "correct": predicted == actual if actual else False,
+            "belief": {k.value: float(belief[i, m]) for k, m in zip(RISK_ORDER, masks)},
+            "plausibility": {k.value: float(plausibility[i, m]) for k, m in zip(RISK_ORDER, masks)},
+            "conflict": float(conflict[i]),
+            "confidence": float(betp[i, predicted_index[i]])
+        })
+
+        if verbose:
+            print(
+                f"Pred={predicted.value} | "
+                f"Bel/Pl={belief[i, masks[predicted_index[i]]]:.3f}/"
+                f"{plausibility[i, masks[predicted_index[i]]]:.3f} | "
+                f"Conflict={conflict[i]:.3f} | "
+                f"Actual={actual.value if actual else 'N/A'}"
+            )
+
+    return results
@@ -0,0 +1,319 @@
+import numpy as np
+from enum import Enum
+from typing import Dict, Iterable, List, Sequence, Union
+from Knowledge.Hierarchy import RiskLevel
+
+
+# Dense storage holds 2**n masses per patient, keep frames reasonable
+MAX_FRAME_SIZE = 24
+
+RULES = ("dempster", "conjunctive", "disjunctive")
+
+# Conflict this close to 1 counts as total: Dempster's rule is undefined
+TOTAL_CONFLICT_TOLERANCE = 1e-12
+
+
+class Frame:
+    """
+    Frame of discernment.
+    Every subset of hypotheses is an integer bitmask (bit i <=> hypothesis i),
+    so a mass function is a dense array indexed by that mask.
+    """
+
+    def __init__(self, hypotheses: Iterable):
+        self.hypotheses = list(hypotheses)
+        self.index = {h: i for i, h in enumerate(self.hypotheses)}
+
+        if len(self.index) != len(self.hypotheses):
+            raise ValueError("Frame hypotheses must be unique")
+        if not 0 < len(self.hypotheses) <= MAX_FRAME_SIZE:
+            raise ValueError(f"Frame size must be between 1 and {MAX_FRAME_SIZE}")
+
+    @classmethod
+    def from_enum(cls, enum_cls) -> "Frame":
+        """Frame over the members of an Enum (RiskLevel, disease hierarchies...)"""
+        return cls(list(enum_cls))
+
+    @property
+    def size(self) -> int:
+        return len(self.hypotheses)
+
+    @property
+    def n_subsets(self) -> int:
+        return 1 << self.size
+
+    @property
+    def full(self) -> int:
+        """Mask of the whole frame (total ignorance)"""
+        return self.n_subsets - 1
+
+    def mask(self, hypotheses) -> int:
+        """Bitmask of a hypothesis or a collection of hypotheses"""
+        if isinstance(hypotheses, (int, np.integer)) and not isinstance(hypotheses, Enum):
+            return int(hypotheses)
+        if isinstance(hypotheses, (str, Enum)):
+            hypotheses = [hypotheses]
+
+        mask = 0
+        for h in hypotheses:
+            mask |= 1 << self.index[h]
+        return mask
+
+    def members(self, mask: int) -> List:
+        return [h for i, h in enumerate(self.hypotheses) if mask >> i & 1]
+
+    def cardinalities(self) -> np.ndarray:
+        """|A| for every subset mask"""
+        masks = np.arange(self.n_subsets)
+        counts = np.zeros(self.n_subsets, dtype=np.int64)
+        for i in range(self.size):
+            counts += (masks >> i) & 1
+        return counts
+
+
+RISK_FRAME = Frame.from_enum(RiskLevel)
+
+
+# ==================== Fast transforms over the subset lattice ====================
+# Each transform is n passes of vectorized adds, O(n 2^n) per mass function,
+# instead of enumerating every (A, B) pair of subsets.
+
+def _bit_views(values: np.ndarray):
+    n = int(values.shape[-1]).bit_length() - 1
+    batch = values.shape[:-1]
+    for i in range(n):
+        yield values.reshape(batch + (1 << (n - i - 1), 2, 1 << i))
+
+
+def zeta_subset(values: np.ndarray) -> np.ndarray:
+    """f(A) = sum of values(B) for B subset of A"""
+    out = np.array(values, dtype=float)
+    for view in _bit_views(out):
+        view[..., 1, :] += view[..., 0, :]
+    return out
+
+
+def mobius_subset(values: np.ndarray) -> np.ndarray:
+    """Inverse of zeta_subset"""
+    out = np.array(values, dtype=float)
+    for view in _bit_views(out):
+        view[..., 1, :] -= view[..., 0, :]
+    return out
+
+
+def zeta_superset(values: np.ndarray) -> np.ndarray:
+    """f(A) = sum of values(B) for B superset of A"""
+    out = np.array(values, dtype=float)
+    for view in _bit_views(out):
+        view[..., 0, :] += view[..., 1, :]
+    return out
+
+
+def mobius_superset(values: np.ndarray) -> np.ndarray:
+    """Inverse of zeta_superset"""
+    out = np.array(values, dtype=float)
+    for view in _bit_views(out):
+        view[..., 0, :] -= view[..., 1, :]
+    return out
+
+
+class MassFunction:
+    """
+    Basic belief assignment over a Frame.
+    masses has shape (..., 2**n): any leading axes are a batch (e.g. patients).
+    """
+
+    def __init__(self, frame: Frame, masses):
+        self.frame = frame
+        self.masses = np.asarray(masses, dtype=float)
+
+        if self.masses.shape[-1:] != (frame.n_subsets,):
+            raise ValueError(
+                f"Expected last axis of size {frame.n_subsets}, got {self.masses.shape}"
+            )
+
+    # ==================== Construction ====================
+
+    @classmethod
+    def vacuous(cls, frame: Frame, batch_shape=()) -> "MassFunction":
+        """Total ignorance: all mass on the frame"""
+        masses = np.zeros(tuple(batch_shape) + (frame.n_subsets,))
+        masses[..., frame.full] = 1.0
+        return cls(frame, masses)
+
+    @classmethod
+    def simple(cls, frame: Frame, focal, weight) -> "MassFunction":
+        """Simple support function: m(focal) = weight, m(frame) = 1 - weight"""
+        weight = np.clip(np.asarray(weight, dtype=float), 0.0, 1.0)
+        masses = np.zeros(weight.shape + (frame.n_subsets,))
+
+        focal = frame.mask(focal)
+        masses[..., frame.full] += 1.0 - weight
+        masses[..., focal] += weight
+        return cls(frame, masses)
+
+    @classmethod
+    def from_dict(cls, frame: Frame, assignment: Dict) -> "MassFunction":
+        """Single mass function from {hypotheses or mask: mass}"""
+        masses = np.zeros(frame.n_subsets)
+        for focal, mass in assignment.items():
+            masses[frame.mask(focal)] += mass
+        return cls(frame, masses)
+
+    # ==================== Properties ====================
+
+    @property
+    def batch_shape(self):
+        return self.masses.shape[:-1]
+
+    @property
+    def conflict(self) -> np.ndarray:
+        """Mass on the empty set (non-zero only after unnormalized combination)"""
+        return self.masses[..., 0]
+
+    def focal_elements(self, tol: float = 0.0) -> np.ndarray:
+        """Masks with non-zero mass (single mass function)"""
+        if self.batch_shape:
+            raise ValueError("focal_elements() needs a single mass function")
+        return np.flatnonzero(self.masses > tol)
+
+    def to_dict(self, tol: float = 0.0) -> Dict:
+        return {
+            frozenset(self.frame.members(int(mask))): float(self.masses[mask])
+            for mask in self.focal_elements(tol)
+        }
+
+    # ==================== Derived set functions ====================
+
+    def belief(self) -> np.ndarray:
+        """bel(A) = sum of m(B) for non-empty B subset of A, for every mask"""
+        bel = zeta_subset(self.masses)
+        return bel - self.masses[..., :1]
+
+    def plausibility(self) -> np.ndarray:
+        """pl(A) = sum of m(B) for B intersecting A, for every mask"""
+        implicability = zeta_subset(self.masses)
+        total = implicability[..., -1:]
+        # complement of A is (full ^ A), i.e. the reversed mask order
+        return total - implicability[..., ::-1]
+
+    def commonality(self) -> np.ndarray:
+        """q(A) = sum of m(B) for B superset of A"""
+        return zeta_superset(self.masses)
+
+    def belief_interval(self, hypotheses):
+        """(belief, plausibility) of a hypothesis set, one value per batch entry"""
+        mask = self.frame.mask(hypotheses)
+        return self.belief()[..., mask], self.plausibility()[..., mask]
+
+    def pignistic(self) -> np.ndarray:
+        """Pignistic probabilities BetP, shape (..., n)"""
+        cardinalities = self.frame.cardinalities()
+        shared = np.zeros_like(self.masses)
+        shared[..., 1:] = self.masses[..., 1:] / cardinalities[1:]
+
+        membership = (np.arange(self.frame.n_subsets)[:, None] >> np.arange(self.frame.size)) & 1
+        betp = shared @ membership
+
+        normalizer = 1.0 - self.conflict
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return betp / np.asarray(normalizer)[..., None]
+
+    # ==================== Combination ====================
+
+    def normalize(self) -> "MassFunction":
+        """
+        Dempster normalization: drop the conflict and rescale.
+        Entries in total conflict, where Dempster's rule is undefined, get
+        NaN masses instead of failing the whole batch (see undefined()).
+        """
+        conflict = np.asarray(self.conflict)
+        undefined = conflict >= 1.0 - TOTAL_CONFLICT_TOLERANCE
+
+        masses = self.masses.copy()
+        masses[..., 0] = 0.0
+        masses /= np.where(undefined, 1.0, 1.0 - conflict)[..., None]
+        masses[undefined] = np.nan
+        return MassFunction(self.frame, masses)
+
+    def undefined(self) -> np.ndarray:
+        """Batch entries left without masses by normalize() (total conflict)"""
+        return np.isnan(self.masses).any(axis=-1)
+
+    def combine(self, other: "MassFunction", rule: str = "dempster") -> "MassFunction":
+        return combine([self, other], rule)
+
+    def __repr__(self):
+        return f"MassFunction(frame={self.frame.hypotheses}, batch_shape={self.batch_shape})"
+
+
+def _source_transform(masses: np.ndarray, transform) -> np.ndarray:
+    """
+    Commonality / implicability of one source.
+    Evidence sources usually have a handful of focal sets (a simple support
+    function has two), in which case summing focal contributions directly
+    beats the n-pass transform.
+    """
+    masses = np.asarray(masses, dtype=float)
+    n = int(masses.shape[-1]).bit_length() - 1
+
+    used = masses.reshape(-1, masses.shape[-1]).any(axis=0)
+    focal = np.flatnonzero(used)
+    if len(focal) >= n:
+        return transform(masses)
+
+    subsets = np.arange(masses.shape[-1])
+    out = np.zeros(masses.shape)
+    for b in focal:
+        if transform is zeta_superset:
+            related = np.flatnonzero((subsets & b) == subsets)   # A subset of b
+        else:
+            related = np.flatnonzero((subsets & b) == b)         # b subset of A
+
+        if len(related) == len(subsets):
+            out += masses[..., b:b + 1]
+        else:
+            out[..., related] += masses[..., b:b + 1]
+    return out
+
+
+def combine(sources: Union[Sequence[MassFunction], MassFunction], rule: str = "dempster") -> MassFunction:
+    """
+    Combine many evidence sources at once.
+
+    sources is a list of MassFunction (broadcastable batch shapes), or a single
+    MassFunction whose first axis indexes the sources.
+    Conjunctive combination is a product of commonalities, disjunctive a
+    product of implicabilities, so S sources cost S transforms and one inverse,
+    with a single running product in memory.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Unknown combination rule: {rule}")
+
+    if isinstance(sources, MassFunction):
+        frame = sources.frame
+        arrays = list(sources.masses)
+    else:
+        sources = list(sources)
+        frame = sources[0].frame if sources else None
+        if any(s.frame.hypotheses != frame.hypotheses for s in sources):
+            raise ValueError("All sources must share the same frame")
+        arrays = [s.masses for s in sources]
+
+    if not arrays:
+        raise ValueError("No sources to combine")
+
+    transform, inverse = (
+        (zeta_subset, mobius_subset) if rule == "disjunctive"
+        else (zeta_superset, mobius_superset)
+    )
+
+    # Not in place: a later source may have a larger batch shape than the first
+    product = _source_transform(arrays[0], transform)
+    for masses in arrays[1:]:
+        product = product * _source_transform(masses, transform)
+
+    result = MassFunction(frame, inverse(product))
+    if rule == "dempster":
+        result = result.normalize()
+    return result
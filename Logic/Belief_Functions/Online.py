@@ -0,0 +1,188 @@
+import threading
+import numpy as np
+from dataclasses import replace
+from typing import Dict, Iterable, List, Tuple
+from Knowledge.Hierarchy import RiskLevel
+from Logic.Belief_Functions.Engine import BeliefEngine, BeliefParameters, RISK_ORDER
+
+
+# Decayed counts are stored relative to a growing event weight,
+# rescaled once that weight gets this large
+_RESCALE_AT = 1e150
+
+
+def _level_index(level) -> int:
+    if isinstance(level, RiskLevel):
+        return RISK_ORDER.index(level)
+    return RISK_ORDER.index(RiskLevel(str(level).strip().capitalize()))
+
+
+class OnlinePriorAdapter:
+    """
+    Online calibration of BeliefEngine priors from streamed
+    (prediction, confirmed Level) pairs.
+
+    Keeps exponentially decayed class frequencies and a decayed confusion
+    matrix in constant memory. Decay is applied lazily: instead of shrinking
+    every count on each event, each new event weighs a bit more than the
+    previous one, so an update is a couple of additions.
+    Published priors are computed from one consistent snapshot of the
+    counts and swapped into the attached engines with
+    BeliefEngine.update_params, so running engines see either the old or
+    the new set, never a half-updated one, and a concurrent params swap
+    (e.g. a recalibration) is kept. Publications are serialized and one
+    built from an older snapshot than the last published is dropped.
+
+    The confusion matrix is reported (confusion(), accuracy()) for
+    monitoring only: published priors come from the confirmed levels.
+    """
+
+    def __init__(self, half_life: float = 5000.0, base: BeliefParameters = None,
+                 prior_strength: float = 100.0, publish_every: int = 1000):
+        if half_life <= 0:
+            raise ValueError("half_life must be positive")
+
+        self.base = base or BeliefParameters()
+        self.growth = 2.0 ** (1.0 / half_life)
+        self.prior_strength = prior_strength
+        self.publish_every = publish_every
+
+        self.engines: List[BeliefEngine] = []
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._weight = 1.0
+            self._class_counts = [0.0] * len(RISK_ORDER)
+            self._confusion = [[0.0] * len(RISK_ORDER) for _ in RISK_ORDER]
+            self._total = 0.0
+            self.events = 0
+            self._since_publish = 0
+            self._published_events = -1
+            self._published = None
+
+    # ==================== Engines ====================
+
+    def attach(self, engine: BeliefEngine) -> BeliefEngine:
+        """Engine whose priors follow this adapter"""
+        self.engines.append(engine)
+        return engine
+
+    def detach(self, engine: BeliefEngine):
+        self.engines.remove(engine)
+
+    # ==================== Stream ====================
+
+    def observe(self, predicted, actual):
+        """One labeled outcome (RiskLevel or level string for both)"""
+        p, a = _level_index(predicted), _level_index(actual)
+
+        with self._lock:
+            w = self._weight
+            self._class_counts[a] += w
+            self._confusion[a][p] += w
+            self._total += w
+
+            self._weight = w * self.growth
+            if self._weight > _RESCALE_AT:
+                self._rescale()
+
+            self.events += 1
+            self._since_publish += 1
+            publish = self.publish_every and self._since_publish >= self.publish_every
+
+        if publish:
+            self.publish()
+
+    def observe_many(self, pairs: Iterable[Tuple]):
+        for predicted, actual in pairs:
+            self.observe(predicted, actual)
+
+    def _rescale(self):
+        scale = 1.0 / self._weight
+        self._class_counts = [c * scale for c in self._class_counts]
+        self._confusion = [[c * scale for c in row] for row in self._confusion]
+        self._total *= scale
+        self._weight = 1.0
+
+    # ==================== Statistics ====================
+
+    def class_frequencies(self) -> Dict[RiskLevel, float]:
+        """Decayed frequency of each confirmed level"""
+        with self._lock:
+            counts, total = list(self._class_counts), self._total
+        if total == 0:
+            return {level: 0.0 for level in RISK_ORDER}
+        return {level: c / total for level, c in zip(RISK_ORDER, counts)}
+
+    def confusion(self) -> np.ndarray:
+        """Decayed confusion matrix, rows = actual, columns = predicted (RISK_ORDER)"""
+        with self._lock:
+            matrix = np.array(self._confusion)
+            total = self._total
+        return matrix / total if total else matrix
+
+    def accuracy(self) -> float:
+        matrix = self.confusion()
+        return float(np.trace(matrix))
+
+    def effective_sample_size(self) -> float:
+        """Number of events the decayed counts are worth"""
+        _, total, weight, _ = self._snapshot()
+        return self._effective_size(total, weight)
+
+    def _effective_size(self, total: float, weight: float) -> float:
+        # Latest event weighs weight / growth, counts are in those units
+        return total * self.growth / weight if weight else 0.0
+
+    def _snapshot(self) -> Tuple[List[float], float, float, int]:
+        """Counts, total, weight and event number, read together"""
+        with self._lock:
+            return self._snapshot_locked()
+
+    def _snapshot_locked(self) -> Tuple[List[float], float, float, int]:
+        return list(self._class_counts), self._total, self._weight, self.events
+
+    def priors(self) -> Dict[str, float]:
+        """
+        Base priors updated by the observed frequencies
+        (Dirichlet smoothing, prior_strength pseudo-events on the base priors).
+        """
+        counts, total, weight, _ = self._snapshot()
+        return self._priors_from(counts, total, weight)
+
+    def _priors_from(self, counts: List[float], total: float, weight: float) -> Dict[str, float]:
+        n = self._effective_size(total, weight)
+        alpha = self.prior_strength
+
+        priors = {}
+        for level, count in zip(RISK_ORDER, counts):
+            frequency = count / total if total else 0.0
+            base = self.base.priors[level.value]
+            priors[level.value] = (frequency * n + base * alpha) / (n + alpha)
+
+        total = sum(priors.values())
+        return {k: v / total for k, v in priors.items()}
+
+    # ==================== Publication ====================
+
+    def publish(self) -> BeliefParameters:
+        """Swap updated priors into every attached engine"""
+        with self._publish_lock:
+            with self._lock:
+                counts, total, weight, events = self._snapshot_locked()
+                self._since_publish = 0
+
+            # Never replace newer published priors with older ones
+            if events < self._published_events:
+                return self._published
+
+            priors = self._priors_from(counts, total, weight)
+            for engine in list(self.engines):
+                engine.update_params(priors=dict(priors))
+
+            self._published_events = events
+            self._published = replace(self.base, priors=priors)
+            return self._published
@@ -0,0 +1,129 @@
+from typing import Dict
+from Knowledge.Hierarchy import RiskLevel
+from Logic.Belief_Functions.Engine import BeliefEngine
+
+
+class BeliefSession:
+    """
+    Stateful belief inference for one patient.
+
+    Keeps the LOW / MEDIUM / HIGH evidence accumulators of BeliefEngine.
+    Changing one symptom only recomputes the accumulators of the groups it
+    belongs to (a fixed handful of terms), so interactive and streaming
+    clients don't rebuild a row and re-run infer() on every edit. Results
+    are bit-identical to infer() on the same values.
+    If the engine's parameter set is replaced (recalibration, new priors),
+    the accumulators are rebuilt on the next access.
+    """
+
+    GROUPS = ("low_weights", "medium_weights", "high_weights")
+
+    def __init__(self, engine: BeliefEngine = None, row=None):
+        self.engine = engine or BeliefEngine()
+        self.values = {}
+        self._resync()
+
+        if row is not None:
+            self.update({name: row.get(name, 0) for name in self.values})
+
+    def _group_sum(self, group: str) -> float:
+        # Same expression as infer() so that rounding is identical
+        return sum(self.values[name] * w for name, w in getattr(self._params, group).items())
+
+    def _resync(self):
+        """Recompute every accumulator from the current values"""
+        p = self._params = self.engine.params
+        self.values = {name: self.values.get(name, 0.0) for name in p.columns()}
+        self._sums = {group: self._group_sum(group) for group in self.GROUPS}
+
+        # symptom -> groups whose accumulator depends on it
+        self._groups_of = {name: [] for name in self.values}
+        for group in self.GROUPS:
+            for name in getattr(p, group):
+                self._groups_of[name].append(group)
+
+    # ==================== Updates ====================
+
+    def _check_params(self):
+        if self.engine.params is not self._params:
+            self._resync()
+
+    def set(self, name: str, severity):
+        """Change one symptom severity (raw 0-10 scale)"""
+        self._check_params()
+        if name not in self.values:
+            # Column the engine doesn't use: nothing to update
+            return
+
+        new = self.engine._norm(severity)
+        if new == self.values[name]:
+            return
+
+        self.values[name] = new
+        for group in self._groups_of[name]:
+            self._sums[group] = self._group_sum(group)
+
+    def update(self, changes: Dict):
+        for name, severity in changes.items():
+            self.set(name, severity)
+
+    def reset(self):
+        self.values = {name: 0.0 for name in self.values}
+        self._resync()
+
+    # ==================== Outputs ====================
+
+    @property
+    def beliefs(self) -> Dict[RiskLevel, float]:
+        self._check_params()
+        p = self.engine.params
+
+        low_evidence = self._sums["low_weights"]
+        medium_evidence = self._sums["medium_weights"]
+        high_raw = self._sums["high_weights"]
+
+        # Severity gating
+        strong_high = max(self.values[name] for name in p.gate_columns)
+        if strong_high < p.gate_threshold:
+            high_evidence = high_raw * p.gate_factor
+        else:
+            high_evidence = high_raw
+
+        # Competition
+        high_evidence *= (1 - p.high_competition * medium_evidence)
+        medium_evidence *= (1 - p.medium_competition * low_evidence)
+
+        beliefs = {
+            RiskLevel.LOW: low_evidence * p.priors[RiskLevel.LOW.value],
+            RiskLevel.MEDIUM: medium_evidence * p.priors[RiskLevel.MEDIUM.value],
+            RiskLevel.HIGH: high_evidence * p.priors[RiskLevel.HIGH.value],
+        }
+
+        total = sum(beliefs.values())
+        if total == 0:
+            return {
+                RiskLevel.LOW: 0.33,
+                RiskLevel.MEDIUM: 0.33,
+                RiskLevel.HIGH: 0.34,
+            }
+        return {k: v / total for k, v in beliefs.items()}
+
+    @property
+    def predicted(self) -> RiskLevel:
+        beliefs = self.beliefs
+        return max(beliefs, key=beliefs.get)
+
+    @property
+    def confidence(self) -> float:
+        beliefs = self.beliefs
+        return max(beliefs.values())
+
+    def result(self) -> Dict:
+        """Same shape as BeliefEngine.infer()"""
+        beliefs = self.beliefs
+        predicted = max(beliefs, key=beliefs.get)
+        return {
+            "predicted": predicted,
+            "beliefs": beliefs,
+            "confidence": beliefs[predicted]
+        }
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional, Union
+from Knowledge.Hierarchy import RiskLevel
+from Logic.Default_Logic.Engine import ReiterDefaultEngine
+from Logic.Default_Logic.Helpers import evaluate_dataframe, get_lung_cancer_default_rules
+
+
+# Rows per chunk when reading a CSV file
+CHUNK_SIZE = 100_000
+
+
+def fire_matrix(applied_mask, n_rules: int) -> np.ndarray:
+    """(n, rules) boolean matrix from an applied_mask column"""
+    words = np.asarray(applied_mask).reshape(len(applied_mask), -1)
+    bits = np.unpackbits(words.astype("<u8").view(np.uint8), axis=1, bitorder="little")
+    return bits[:, :n_rules].view(bool)
+
+
+class RuleFiringStats:
+    """
+    Dataset-scale statistics on which default rules fire.
+
+    Chunks are evaluated column-wise and folded into fixed-size counters
+    (per rule vectors and a rules x rules co-firing matrix), so memory does
+    not grow with the number of rows. For each rule:
+      - fires: rows where it applied,
+      - hits: rows where its conclusion equals Level (precision = hits / labeled fires,
+        None without labeled fires, e.g. when the data has no Level column),
+      - decisive: rows where it gave the final risk,
+      - shadowed: rows where it applied but a higher-risk conclusion won,
+      - errors: rows where it applied and the prediction was wrong.
+    """
+
+    def __init__(self, engine: ReiterDefaultEngine = None):
+        self.engine = engine or ReiterDefaultEngine(get_lung_cancer_default_rules())
+        network = self.engine.network
+        self.names = [rule.name for rule in network.rules]
+        self.ranks = np.array(network.ranks, dtype=np.int64)
+
+        n_rules = len(self.names)
+        self.rows = 0
+        self.labeled = 0
+        self.correct = 0
+        self.fires = np.zeros(n_rules, dtype=np.int64)
+        self.labeled_fires = np.zeros(n_rules, dtype=np.int64)
+        self.hits = np.zeros(n_rules, dtype=np.int64)
+        self.decisive = np.zeros(n_rules, dtype=np.int64)
+        self.shadowed = np.zeros(n_rules, dtype=np.int64)
+        self.errors = np.zeros(n_rules, dtype=np.int64)
+        self.cofiring = np.zeros((n_rules, n_rules), dtype=np.int64)
+
+    # ==================== Accumulation ====================
+
+    def update(self, df: pd.DataFrame):
+        """Fold one chunk of rows in"""
+        if len(df) == 0:
+            return
+        evaluation = evaluate_dataframe(df, self.engine)
+        if "Level" not in df.columns:
+            # actual_levels reads a missing Level as LOW: these rows are unlabeled
+            evaluation["actual"] = np.full(len(df), None, dtype=object)
+            evaluation["correct"] = np.zeros(len(df), dtype=bool)
+        self.update_evaluation(evaluation)
+
+    def update_evaluation(self, evaluation: Dict):
+        """Fold in an evaluate_dataframe() result"""
+        fired = fire_matrix(evaluation["applied_mask"], len(self.names))
+        predicted = evaluation["predicted_rank"]
+
+        # Level ranks, decoded once per distinct value (-1 when unreadable)
+        codes, levels = pd.factorize(evaluation["actual"], use_na_sentinel=False)
+        lookup = np.array([self.engine._risk_value(a) if isinstance(a, RiskLevel) else -1 for a in levels], dtype=np.int64)
+        actual = lookup[codes]
+        labeled = actual >= 0
+        wrong = labeled & ~np.asarray(evaluation["correct"], dtype=bool)
+
+        self.rows += len(predicted)
+        self.labeled += int(labeled.sum())
+        self.correct += int((labeled & ~wrong).sum())
+
+        self.fires += fired.sum(axis=0)
+        self.labeled_fires += fired[labeled].sum(axis=0)
+        self.hits += (fired & (actual[:, None] == self.ranks)).sum(axis=0)
+        self.decisive += (fired & (predicted[:, None] == self.ranks)).sum(axis=0)
+        self.shadowed += (fired & (predicted[:, None] > self.ranks)).sum(axis=0)
+        self.errors += fired[wrong].sum(axis=0)
+
+        # float64 products are exact far beyond any chunk size
+        as_float = fired.astype(np.float64)
+        self.cofiring += np.rint(as_float.T @ as_float).astype(np.int64)
+
+    def update_many(self, chunks: Iterable[pd.DataFrame]):
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    # ==================== Reports ====================
+
+    def summary(self) -> pd.DataFrame:
+        """One row per rule"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pd.DataFrame({
+                "rule": self.names,
+                "conclusion": [rule.conclusion for rule in self.engine.network.rules],
+                "fires": self.fires,
+                "fire_rate": self.fires / self.rows if self.rows else 0.0,
+                "precision": [hits / fires if fires else None for hits, fires in zip(self.hits, self.labeled_fires)],
+                "decisive": self.decisive,
+                "shadowed": self.shadowed,
+                "shadow_rate": np.where(self.fires > 0, self.shadowed / self.fires, np.nan),
+                "errors": self.errors,
+            }).set_index("rule")
+
+    def cofiring_matrix(self) -> pd.DataFrame:
+        """Rows where both rules applied (diagonal = fire counts)"""
+        return pd.DataFrame(self.cofiring, index=self.names, columns=self.names)
+
+    def accuracy(self) -> Optional[float]:
+        """Share of labeled rows predicted right, None without labeled rows"""
+        return self.correct / self.labeled if self.labeled else None
+
+
+def analyze_rule_firing(source: Union[str, pd.DataFrame], engine: ReiterDefaultEngine = None,
+                        chunk_size: int = CHUNK_SIZE, verbose: bool = True) -> RuleFiringStats:
+    """Rule firing statistics over a DataFrame or a CSV file read in chunks"""
+    stats = RuleFiringStats(engine)
+
+    if isinstance(source, pd.DataFrame):
+        chunks = (source.iloc[start:start + chunk_size] for start in range(0, len(source), chunk_size))
+    else:
+        chunks = pd.read_csv(source, chunksize=chunk_size)
+    stats.update_many(chunks)
+
+    if verbose:
+        print("=" * 60)
+        print("DEFAULT RULE FIRING ANALYTICS")
+        print("=" * 60)
+        accuracy = stats.accuracy()
+        print(f"Rows: {stats.rows}, accuracy: " + (f"{accuracy * 100:.2f}%\n" if accuracy is not None else "n/a (no Level)\n"))
+        print(stats.summary().to_string())
+        print("\nCo-firing:")
+        print(stats.cofiring_matrix().to_string())
+
+    return stats
@@ -1,4 +1,17 @@
+import numpy as np
 from Knowledge.Hierarchy import RiskLevel
+from Logic.Default_Logic.Network import RuleNetwork
+from Logic.Default_Logic.Table import DecisionTable
+from Logic.Default_Logic.Extensions import ExtensionSolver, RISK_LITERALS, negate, risk_literal
+
+def _fact_column(facts, name, n):
+    """facts.get(name, 0) over fact columns"""
+    column = facts.get(name)
+    if column is None:
+        return np.zeros(n)
+    values, present = column
+    return np.where(present, values, 0)
+
 
 class DefaultRule:
     def __init__(self, name, prerequisite, justification, conclusion):
@@ -12,24 +25,51 @@ class ReiterDefaultEngine:
     """
     Simple implementation of Reiter's Default Logic.
     Applies default rules based on known facts about a patient.
+    Rules are compiled into a RuleNetwork, evaluation only visits
+    the rules whose prerequisite is among the patient's facts, and small
+    rule sets are compiled further into a DecisionTable indexed per patient.
     """
 
+    # Facts read by each justification in _is_consistent,
+    # lets the network cache consistency results per fact pattern
+    justification_facts = {
+        "HighRisk": ("age", "smoking_history"),
+        "MediumRisk": (),
+    }
+
     def __init__(self, rules):
         self.rules = rules
+        self._network = None
+        self._table = None
+        self._table_network = None
+        self._solvers = {}
+
+    @property
+    def network(self) -> RuleNetwork:
+        if self._network is None or self._network.is_stale(self.rules):
+            self._network = RuleNetwork(self.rules, self)
+        return self._network
+
+    @property
+    def table(self):
+        """DecisionTable of the rule set, None when its fact space is too large"""
+        network = self.network
+        if self._table_network is not network:
+            self._table = DecisionTable.compile(network)
+            self._table_network = network
+        return self._table
 
     def evaluate(self, patient):
         facts = self._extract_facts(patient)
+        table = self.table
 
-        applied_rules = []
-        final_risk = RiskLevel.LOW
-
-        for rule in self.rules:
-            if rule.prerequisite in facts:
-                if self._is_consistent(rule.justification, facts):
-                    applied_rules.append(rule.name)
-
-                    if self._risk_value(rule.conclusion) > self._risk_value(final_risk):
-                        final_risk = rule.conclusion
+        if table is not None:
+            index = table.index(facts)
+            final_risk, applied_rules = table.risks[index], table.names(index)
+        else:
+            network = self.network
+            final_risk, applied = network.match(facts)
+            applied_rules = [network.rules[i].name for i in applied]
 
         return {
             "patient_id": patient.id,
@@ -38,6 +78,127 @@ class ReiterDefaultEngine:
             "method": "Reiter Default Logic"
         }
 
+    def session(self, patient=None):
+        """Incremental evaluation: re-tests only what changed between updates"""
+        session = self.network.session()
+        if patient is not None:
+            session.update_patient(patient)
+        return session
+
+    def extensions(self, patient, limit=None, exclusive_risk=False):
+        """
+        Reiter extensions of the patient's default theory.
+        W holds the patient's facts plus the negated justifications that
+        _is_consistent rejects. With exclusive_risk, risk levels are mutually
+        exclusive so HIGH and MEDIUM defaults compete and yield separate
+        extensions. limit stops after the first k extensions.
+        """
+        facts = self._extract_facts(patient)
+
+        world = set(facts)
+        for justification in {rule.justification for rule in self.rules}:
+            if not self._is_consistent(justification, facts):
+                world.add(negate(risk_literal(justification)))
+
+        solved = self._extension_solver(exclusive_risk).solve(world, limit)
+        extensions = solved["extensions"]
+
+        derived = [ext.literals - world for ext in extensions]
+        predictions = [ext.predicted for ext in extensions]
+
+        return {
+            "patient_id": patient.id,
+            "extensions": [
+                {
+                    "applied_rules": [self.rules[i].name for i in ext.applied],
+                    "conclusions": conclusions,
+                    "predicted": ext.predicted
+                }
+                for ext, conclusions in zip(extensions, derived)
+            ],
+            "credulous": set().union(*derived) if derived else set(),
+            "skeptical": set.intersection(*map(set, derived)) if derived else set(),
+            "credulous_risk": max(predictions, key=self._risk_value, default=RiskLevel.LOW),
+            "skeptical_risk": min(predictions, key=self._risk_value, default=RiskLevel.LOW),
+            "complete": solved["complete"],
+            "method": "Reiter Default Logic (extensions)"
+        }
+
+    def _extension_solver(self, exclusive_risk):
+        solver = self._solvers.get(exclusive_risk)
+        if solver is None or solver.is_stale(self.rules):
+            exclusive = [RISK_LITERALS] if exclusive_risk else []
+            solver = self._solvers[exclusive_risk] = ExtensionSolver(self.rules, self, exclusive)
+        return solver
+
+    # ==================== Column-wise evaluation ====================
+
+    def evaluate_columns(self, columns, n):
+        """
+        evaluate() over n patients at once.
+        columns maps fact name -> (values, present) arrays, see
+        Helpers.create_patient_columns. Each network node fires on a boolean
+        column, the final risk is the row-wise max of the fired ranks
+        (or one table gather when the rule set has a DecisionTable).
+        applied_mask holds the applied rules as bits in rule order: a uint64
+        column, or an (n, words) matrix past 64 rules.
+        """
+        facts = self._extract_fact_columns(columns, n)
+        network = self.network
+        table = self.table
+
+        present = {name: column[1] for name, column in facts.items()}
+        consistent = lambda justification: self._consistent_columns(justification, facts, n)
+
+        if table is not None:
+            index = table.index_columns(present, consistent, n)
+            best, mask = table.ranks[index], table.masks[index]
+        else:
+            best, mask = network.match_columns(present, consistent, n)
+
+        return {
+            "predicted_rank": best,
+            "predicted": network.risks(best),
+            "applied_mask": mask[:, 0] if mask.shape[1] == 1 else mask,
+            "method": "Reiter Default Logic"
+        }
+
+    def rules_from_mask(self, mask):
+        """Names of the rules set in one applied_mask entry"""
+        words = np.atleast_1d(mask)
+        return [
+            rule.name for i, rule in enumerate(self.network.rules)
+            if (int(words[i // 64]) >> (i % 64)) & 1
+        ]
+
+    def _extract_fact_columns(self, columns, n):
+        """Column-wise _extract_facts: fact name -> (values, present)"""
+        facts = dict(columns)
+
+        age = _fact_column(facts, "age", n)
+        derived = {
+            "is_senior": age > 50,
+            "heavy_smoker": _fact_column(facts, "smoking_history", n) >= 7,
+            "severe_symptom": _fact_column(facts, "coughing_of_blood", n) >= 5,
+            "high_pollution": _fact_column(facts, "air_pollution_exposure", n) >= 6,
+        }
+        for name, holds in derived.items():
+            if name in facts:
+                values, present = facts[name]
+                facts[name] = (np.where(holds, True, values), present | holds)
+            else:
+                facts[name] = (holds, holds)
+
+        return facts
+
+    def _consistent_columns(self, justification, facts, n):
+        """Column-wise _is_consistent"""
+        if justification == "HighRisk":
+            age = _fact_column(facts, "age", n)
+            smoking = _fact_column(facts, "smoking_history", n)
+            return ~((age < 25) & (smoking == 0))
+        return np.ones(n, dtype=bool)
+
     def _extract_facts(self, patient):
         facts = {}
 
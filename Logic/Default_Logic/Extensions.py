@@ -0,0 +1,213 @@
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+from Knowledge.Hierarchy import RiskLevel
+from Logic.Default_Logic.Network import rules_changed
+
+
+# Bound on the per-solver cache of results by fact set
+RESULT_CACHE_SIZE = 4096
+
+
+def negate(literal: str) -> str:
+    return literal[1:] if literal.startswith("~") else "~" + literal
+
+
+def risk_literal(conclusion) -> str:
+    """Literal asserted by a rule conclusion (RiskLevel.HIGH -> 'HighRisk')"""
+    if isinstance(conclusion, RiskLevel):
+        return f"{conclusion.value}Risk"
+    return str(conclusion)
+
+
+RISK_LITERALS = frozenset(risk_literal(level) for level in RiskLevel)
+
+
+class Extension:
+    def __init__(self, literals: FrozenSet[str], applied: List[int], predicted):
+        self.literals = literals
+        self.applied = applied
+        self.predicted = predicted
+
+    def copy(self) -> "Extension":
+        return Extension(self.literals, list(self.applied), self.predicted)
+
+    def __repr__(self):
+        return f"Extension(predicted={self.predicted}, applied={self.applied})"
+
+
+class ExtensionSolver:
+    """
+    Computes Reiter extensions of a default theory with literal
+    prerequisites, justifications and conclusions.
+
+    E is an extension iff E = Gamma(E), and Gamma(E) only depends on which
+    justification literals E blocks (contains the negation of). The search
+    therefore branches on justification literals (blocked / consistent),
+    DPLL style:
+      - for a partial assignment, the closure allowing only consistent
+        justifications is a lower bound of E, the closure allowing every
+        non-blocked one an upper bound,
+      - open justifications are forced by those bounds (unit propagation),
+      - a branch is cut as soon as an assignment contradicts a bound,
+      - closures are memoized per allowed set, whole results per fact set.
+    exclusive lists groups of literals of which at most one can hold.
+    """
+
+    def __init__(self, rules, engine, exclusive: Iterable[Iterable[str]] = ()):
+        self.engine = engine
+        self.source = tuple(rules)
+        self.rules = list(rules)
+        self.prerequisites = [rule.prerequisite for rule in self.rules]
+        self.justifications = [risk_literal(rule.justification) for rule in self.rules]
+        self.conclusions = [risk_literal(rule.conclusion) for rule in self.rules]
+        self.ranks = [engine._risk_value(rule.conclusion) for rule in self.rules]
+
+        # literal -> literals it forces (itself + negations of exclusive partners)
+        self.implies: Dict[str, FrozenSet[str]] = {}
+        for group in exclusive:
+            group = set(group)
+            for literal in group:
+                forced = self.implies.get(literal, frozenset({literal}))
+                self.implies[literal] = forced | {negate(other) for other in group if other != literal}
+
+        # prerequisite -> defaults waiting on it
+        self.by_prerequisite: Dict[str, List[int]] = {}
+        for i, prerequisite in enumerate(self.prerequisites):
+            self.by_prerequisite.setdefault(prerequisite, []).append(i)
+
+        # Distinct justification literals, the search variables
+        self.variables = list(dict.fromkeys(self.justifications))
+
+        self._cache = {}
+
+    def is_stale(self, rules) -> bool:
+        return rules_changed(self.source, rules)
+
+    def _closure_of(self, literal: str) -> FrozenSet[str]:
+        return self.implies.get(literal, frozenset({literal}))
+
+    def _add(self, literals: Set[str], literal: str):
+        literals.update(self._closure_of(literal))
+
+    @staticmethod
+    def _consistent(literals: Set[str]) -> bool:
+        return not any(negate(l) in literals for l in literals if not l.startswith("~"))
+
+    # ==================== Search ====================
+
+    def solve(self, facts: Iterable[str], limit: Optional[int] = None) -> Dict:
+        """
+        Extensions for background facts W (literals).
+        limit stops after that many extensions ('complete' tells if the search finished).
+        Results are cached per fact set, callers get copies.
+        """
+        world = set()
+        for literal in facts:
+            self._add(world, literal)
+
+        key = (frozenset(world), limit)
+        result = self._cache.get(key)
+        if result is None:
+            extensions, complete = self._search(frozenset(world), limit)
+
+            if len(self._cache) >= RESULT_CACHE_SIZE:
+                self._cache.clear()
+            result = self._cache[key] = {"extensions": extensions, "complete": complete}
+
+        return {"extensions": [ext.copy() for ext in result["extensions"]], "complete": result["complete"]}
+
+    def _chain(self, world: FrozenSet[str], allowed: FrozenSet[str], closures: Dict) -> FrozenSet[str]:
+        """Forward chaining of W under the defaults whose justification is allowed"""
+        cached = closures.get(allowed)
+        if cached is not None:
+            return cached
+
+        literals = set(world)
+        queue = list(literals)
+        while queue:
+            literal = queue.pop()
+            for i in self.by_prerequisite.get(literal, ()):
+                if self.justifications[i] not in allowed:
+                    continue
+                for new in self._closure_of(self.conclusions[i]):
+                    if new not in literals:
+                        literals.add(new)
+                        queue.append(new)
+
+        result = closures[allowed] = frozenset(literals)
+        return result
+
+    def _propagate(self, world, assignment: Dict[str, bool], closures):
+        """
+        Unit propagation on a partial assignment (justification -> consistent?).
+        Returns the lower-bound closure, or None if the branch is dead.
+        """
+        while True:
+            lower = self._chain(world, frozenset(j for j, ok in assignment.items() if ok), closures)
+            upper = self._chain(
+                world, frozenset(j for j in self.variables if assignment.get(j, True)), closures
+            )
+
+            forced = False
+            for j in self.variables:
+                blocked_for_sure = negate(j) in lower
+                may_be_blocked = negate(j) in upper
+                value = assignment.get(j)
+
+                if value is None:
+                    if blocked_for_sure:
+                        assignment[j] = False
+                        forced = True
+                    elif not may_be_blocked:
+                        assignment[j] = True
+                        forced = True
+                elif value and blocked_for_sure:
+                    return None
+                elif not value and not may_be_blocked:
+                    return None
+
+            if not forced:
+                return lower if self._consistent(lower) else None
+
+    def _search(self, world: FrozenSet[str], limit):
+        if not self._consistent(world):
+            # Reiter: an inconsistent W has a single (trivial) extension
+            return [Extension(world, [], RiskLevel.LOW)], True
+
+        found: Dict[FrozenSet[str], Extension] = {}
+        closures = {}
+        stack = [{}]
+
+        while stack:
+            if limit is not None and len(found) >= limit:
+                return list(found.values()), False
+
+            assignment = stack.pop()
+            lower = self._propagate(world, assignment, closures)
+            if lower is None:
+                continue
+
+            open_variable = next((j for j in self.variables if j not in assignment), None)
+            if open_variable is None:
+                # Full assignment that survived the checks: lower == Gamma(E) == E
+                if lower not in found:
+                    found[lower] = self._extension(lower, assignment)
+                continue
+
+            stack.append({**assignment, open_variable: False})
+            stack.append({**assignment, open_variable: True})
+
+        return list(found.values()), True
+
+    def _extension(self, literals: FrozenSet[str], assignment: Dict[str, bool]) -> Extension:
+        # Generating defaults: prerequisite derived and justification consistent
+        indices = [
+            i for i in range(len(self.rules))
+            if self.prerequisites[i] in literals and assignment[self.justifications[i]]
+        ]
+
+        best_rank = self.engine._risk_value(RiskLevel.LOW)
+        predicted = RiskLevel.LOW
+        for i in indices:
+            if self.ranks[i] > best_rank:
+                best_rank, predicted = self.ranks[i], self.rules[i].conclusion
+        return Extension(literals, indices, predicted)
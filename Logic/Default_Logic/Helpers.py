@@ -1,8 +1,19 @@
+import numpy as np
 import pandas as pd
 from Knowledge.Hierarchy import Patient, Symptom, RiskLevel
 from Logic.Default_Logic.Engine import DefaultRule, ReiterDefaultEngine
 
 
+SYMPTOM_MAP = {
+    "Air Pollution": "air_pollution_exposure",
+    "Chest Pain": "chest_pain",
+    "Coughing of Blood": "coughing_of_blood",
+    "Fatigue": "fatigue",
+    "Weight Loss": "weight_loss",
+    "Shortness of Breath": "shortness_of_breath"
+}
+
+
 def safe_int(value):
     try:
         return int(float(value))
@@ -10,19 +21,24 @@ def safe_int(value):
         return 0
 
 
+def safe_int_column(column):
+    """safe_int over a whole column (truncated, unreadable cells -> 0)"""
+    values = np.asarray(column)
+    if values.dtype.kind in "iu":
+        return values
+    if values.dtype.kind == "b":
+        return values.astype(np.int64)
+    if values.dtype.kind == "f":
+        values = np.trunc(values)
+        values[~np.isfinite(values)] = 0
+        return values
+    return np.fromiter((safe_int(v) for v in values), dtype=np.float64, count=len(values))
+
+
 def create_patient_from_csv_row(row):
     symptoms = []
 
-    symptom_map = {
-        "Air Pollution": "air_pollution_exposure",
-        "Chest Pain": "chest_pain",
-        "Coughing of Blood": "coughing_of_blood",
-        "Fatigue": "fatigue",
-        "Weight Loss": "weight_loss",
-        "Shortness of Breath": "shortness_of_breath"
-    }
-
-    for csv_name, internal_name in symptom_map.items():
+    for csv_name, internal_name in SYMPTOM_MAP.items():
         if csv_name in row:
             severity = safe_int(row[csv_name])
             symptoms.append(Symptom(internal_name, severity))
@@ -39,6 +55,56 @@ def create_patient_from_csv_row(row):
     )
 
 
+def create_patient_columns(df):
+    """
+    Column-wise create_patient_from_csv_row:
+    fact name -> (values, present) arrays, one entry per row.
+    """
+    n = len(df)
+    everyone = np.ones(n, dtype=bool)
+    columns = {}
+
+    for csv_name, internal_name in SYMPTOM_MAP.items():
+        if csv_name in df.columns:
+            columns[internal_name] = (safe_int_column(df[csv_name]), everyone)
+
+    smoking = safe_int_column(df["Smoking"]) if "Smoking" in df.columns else np.zeros(n)
+    columns["smoking_history"] = (smoking, smoking > 0)
+
+    age = safe_int_column(df["Age"]) if "Age" in df.columns else np.zeros(n)
+    columns["age"] = (age, everyone)
+
+    return columns
+
+
+def actual_levels(df):
+    """Level column as RiskLevel (None when unreadable), decoded once per distinct value"""
+    if "Level" not in df.columns:
+        return np.full(len(df), RiskLevel.LOW, dtype=object)
+
+    codes, uniques = pd.factorize(df["Level"], use_na_sentinel=False)
+    table = np.empty(len(uniques), dtype=object)
+    for k, value in enumerate(uniques):
+        actual = str(value).capitalize()
+        table[k] = RiskLevel(actual) if actual in ["Low", "Medium", "High"] else None
+    return table[codes]
+
+
+def evaluate_dataframe(df, engine=None):
+    """
+    Default logic over a whole DataFrame without building Patients:
+    predicted, predicted_rank, applied_mask (see evaluate_columns),
+    actual and correct, one entry per row.
+    """
+    engine = engine or ReiterDefaultEngine(get_lung_cancer_default_rules())
+    evaluation = engine.evaluate_columns(create_patient_columns(df), len(df))
+
+    actual = actual_levels(df)
+    evaluation["actual"] = actual
+    evaluation["correct"] = evaluation["predicted"] == actual
+    return evaluation
+
+
 def get_lung_cancer_default_rules():
     return [
         DefaultRule("DR1", "heavy_smoker", "HighRisk", RiskLevel.HIGH),
@@ -51,21 +117,24 @@ def get_lung_cancer_default_rules():
 
 def analyze_with_default_logic(df):
     engine = ReiterDefaultEngine(get_lung_cancer_default_rules())
-    results = []
+    evaluation = evaluate_dataframe(df, engine)
 
-    for _, row in df.iterrows():
-        patient = create_patient_from_csv_row(row)
-        evaluation = engine.evaluate(patient)
+    ids = df["Patient Id"] if "Patient Id" in df.columns else ["Unknown"] * len(df)
 
-        actual = str(row.get("Level", "Low")).capitalize()
-        actual_risk = RiskLevel(actual) if actual in ["Low", "Medium", "High"] else None
+    # Each distinct applied-rule mask is decoded once
+    masks = evaluation["applied_mask"]
+    distinct, inverse = np.unique(masks, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    applied = [engine.rules_from_mask(mask) for mask in distinct]
 
+    results = []
+    for i, patient_id in enumerate(ids):
         results.append({
-            "patient_id": patient.id,
-            "predicted": evaluation["predicted"],
-            "actual": actual_risk,
-            "correct": evaluation["predicted"] == actual_risk,
-            "applied_rules": evaluation["applied_rules"]
+            "patient_id": str(patient_id),
+            "predicted": evaluation["predicted"][i],
+            "actual": evaluation["actual"][i],
+            "correct": bool(evaluation["correct"][i]),
+            "applied_rules": list(applied[inverse[i]])
         })
 
     return results
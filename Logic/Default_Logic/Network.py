@@ -0,0 +1,250 @@
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+from Knowledge.Hierarchy import RiskLevel
+
+
+# Bound on the shared justification-consistency cache
+CONSISTENCY_CACHE_SIZE = 65536
+
+
+class _Removed:
+    def __repr__(self):
+        return "REMOVED"
+
+
+# Fact value used in NetworkSession.update() to delete a fact
+REMOVED = _Removed()
+
+
+def rules_changed(source: Tuple, rules) -> bool:
+    """True when rules no longer holds the same rule objects, in order, as source"""
+    return len(rules) != len(source) or any(rule is not compiled for rule, compiled in zip(rules, source))
+
+
+class RuleNetwork:
+    """
+    Rete-style discrimination network compiled from a list of DefaultRule.
+
+    Alpha nodes index rules by prerequisite fact, and rules sharing a
+    prerequisite and a justification form one node, tested once.
+    Justification consistency is cached per fact pattern (the values of the
+    facts the justification reads, see ReiterDefaultEngine.justification_facts).
+    Matching a patient therefore costs one lookup per fact, not one test per rule.
+    """
+
+    def __init__(self, rules, engine):
+        self.engine = engine
+        self.source = tuple(rules)
+        self.rules = list(rules)
+        self.ranks = [engine._risk_value(rule.conclusion) for rule in self.rules]
+        self.low_rank = engine._risk_value(RiskLevel.LOW)
+
+        # Conclusion reported for a rank: the first rule reaching it, like the sequential scan
+        self.conclusion_of_rank = {}
+        for rule, rank in zip(self.rules, self.ranks):
+            self.conclusion_of_rank.setdefault(rank, rule.conclusion)
+
+        # prerequisite -> [(justification, rule indices, best rank)]
+        groups: Dict[str, Dict[str, List[int]]] = {}
+        for i, rule in enumerate(self.rules):
+            groups.setdefault(rule.prerequisite, {}).setdefault(rule.justification, []).append(i)
+
+        self.alpha: Dict[str, List[Tuple[str, Tuple[int, ...], int]]] = {
+            prerequisite: [
+                (justification, tuple(indices), max(self.ranks[i] for i in indices))
+                for justification, indices in by_justification.items()
+            ]
+            for prerequisite, by_justification in groups.items()
+        }
+
+        # justification -> prerequisites whose nodes depend on it
+        self.dependents: Dict[str, set] = {}
+        for prerequisite, nodes in self.alpha.items():
+            for justification, _, _ in nodes:
+                self.dependents.setdefault(justification, set()).add(prerequisite)
+
+        self._cache = {}
+
+    def is_stale(self, rules) -> bool:
+        return rules_changed(self.source, rules)
+
+    # ==================== Consistency ====================
+
+    def consistent(self, justification, facts) -> bool:
+        """Cached engine._is_consistent, keyed by the facts the justification reads"""
+        reads = self.engine.justification_facts.get(justification)
+        if reads is None:
+            # Unknown dependencies: no sharing across patients
+            return self.engine._is_consistent(justification, facts)
+
+        key = (justification, tuple(facts.get(name) for name in reads))
+        result = self._cache.get(key)
+        if result is None:
+            if len(self._cache) >= CONSISTENCY_CACHE_SIZE:
+                self._cache.clear()
+            result = self._cache[key] = self.engine._is_consistent(justification, facts)
+        return result
+
+    # ==================== Matching ====================
+
+    def final_risk(self, best_rank: int):
+        if best_rank > self.low_rank:
+            return self.conclusion_of_rank[best_rank]
+        return RiskLevel.LOW
+
+    def match(self, facts: Dict) -> Tuple[object, List[int]]:
+        """(final risk, indices of applied rules in rule order) for one fact set"""
+        applied = []
+        best_rank = self.low_rank
+        checked = {}
+
+        for fact in facts:
+            nodes = self.alpha.get(fact)
+            if not nodes:
+                continue
+
+            for justification, indices, rank in nodes:
+                ok = checked.get(justification)
+                if ok is None:
+                    ok = checked[justification] = self.consistent(justification, facts)
+                if ok:
+                    applied.extend(indices)
+                    if rank > best_rank:
+                        best_rank = rank
+
+        applied.sort()
+        return self.final_risk(best_rank), applied
+
+    def match_columns(self, present: Dict, consistent: Callable, n: int):
+        """
+        match() over n fact sets at once.
+        present maps prerequisite -> boolean column, consistent(justification)
+        returns a boolean column (only called for justifications in use).
+        Returns the best rank column and the applied rules as a bit matrix
+        (n, words) of uint64, bit i of word i // 64 set when rule i applies.
+        """
+        words = max(1, (len(self.rules) + 63) // 64)
+        mask = np.zeros((n, words), dtype=np.uint64)
+        best = np.full(n, self.low_rank, dtype=np.int64)
+        checked = {}
+
+        for prerequisite, nodes in self.alpha.items():
+            column = present.get(prerequisite)
+            if column is None:
+                continue
+
+            for justification, indices, rank in nodes:
+                ok = checked.get(justification)
+                if ok is None:
+                    ok = checked[justification] = consistent(justification)
+                fires = column & ok
+                if not fires.any():
+                    continue
+
+                if rank > self.low_rank:
+                    np.maximum(best, np.where(fires, rank, self.low_rank), out=best)
+
+                bits = {}
+                for i in indices:
+                    bits[i // 64] = bits.get(i // 64, 0) | (1 << (i % 64))
+                for word, value in bits.items():
+                    mask[:, word] |= np.where(fires, np.uint64(value), np.uint64(0))
+
+        return best, mask
+
+    def risks(self, ranks: np.ndarray) -> np.ndarray:
+        """final_risk over a rank column (object array of RiskLevel)"""
+        distinct = np.unique(ranks)
+        table = np.empty(int(distinct.max(initial=0)) + 1, dtype=object)
+        for rank in distinct:
+            table[rank] = self.final_risk(int(rank))
+        return table[ranks]
+
+    def session(self, facts: Dict = None) -> "NetworkSession":
+        return NetworkSession(self, facts)
+
+
+class NetworkSession:
+    """
+    Incremental matching for one patient: when facts change, only the nodes
+    of the changed prerequisites (and of justifications reading a changed
+    fact) are re-tested.
+    """
+
+    def __init__(self, network: RuleNetwork, facts: Dict = None):
+        self.network = network
+        self.facts = {}
+        self.active = set()          # (prerequisite, node position) pairs that fire
+        self.rank_counts = {}
+        self.update(facts or {})
+
+    def _set_node(self, prerequisite, position, on: bool):
+        key = (prerequisite, position)
+        if on == (key in self.active):
+            return
+
+        rank = self.network.alpha[prerequisite][position][2]
+        if on:
+            self.active.add(key)
+            self.rank_counts[rank] = self.rank_counts.get(rank, 0) + 1
+        else:
+            self.active.discard(key)
+            self.rank_counts[rank] -= 1
+
+    def _refresh(self, prerequisite, justification=None):
+        present = prerequisite in self.facts
+        for position, (node_justification, _, _) in enumerate(self.network.alpha[prerequisite]):
+            if justification is not None and node_justification != justification:
+                continue
+            on = present and self.network.consistent(node_justification, self.facts)
+            self._set_node(prerequisite, position, on)
+
+    def set_facts(self, facts: Dict):
+        """Replace the whole fact set, only the differences are propagated"""
+        changes = {name: value for name, value in facts.items() if self.facts.get(name, REMOVED) != value}
+        for name in self.facts:
+            if name not in facts:
+                changes[name] = REMOVED
+        self.update(changes)
+
+    def update(self, changes: Dict):
+        """Apply {fact: value} changes (value REMOVED deletes the fact)"""
+        if not changes:
+            return
+
+        for name, value in changes.items():
+            if value is REMOVED:
+                self.facts.pop(name, None)
+            else:
+                self.facts[name] = value
+
+        network = self.network
+        engine = network.engine
+        for name in changes:
+            if name in network.alpha:
+                self._refresh(name)
+
+        # Justifications reading a changed fact are re-checked on present prerequisites
+        for justification, prerequisites in network.dependents.items():
+            reads = engine.justification_facts.get(justification)
+            if reads is not None and not any(name in changes for name in reads):
+                continue
+            for fact in self.facts:
+                if fact in prerequisites and fact not in changes:
+                    self._refresh(fact, justification)
+
+    def update_patient(self, patient):
+        self.set_facts(self.network.engine._extract_facts(patient))
+
+    @property
+    def predicted(self):
+        ranks = [rank for rank, count in self.rank_counts.items() if count > 0]
+        return self.network.final_risk(max(ranks, default=self.network.low_rank))
+
+    @property
+    def applied_rules(self) -> List[str]:
+        indices = []
+        for prerequisite, position in self.active:
+            indices.extend(self.network.alpha[prerequisite][position][1])
+        indices.sort()
+        return [self.network.rules[i].name for i in indices]
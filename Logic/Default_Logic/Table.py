@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+
+# Largest fact space compiled into a table (2 ** bits entries)
+TABLE_MAX_BITS = 16
+
+# Bound on the table's applied-rule masks, in 64-bit words
+TABLE_MAX_WORDS = 1 << 20
+
+
+def _variable_justifications(network) -> List[str]:
+    """Justifications whose consistency depends on the patient"""
+    reads = network.engine.justification_facts
+    return [j for j in network.dependents if reads.get(j) != ()]
+
+
+class DecisionTable:
+    """
+    Every outcome of a small default theory, precomputed.
+
+    A network node fires iff its prerequisite is a fact and its
+    justification is consistent, so the outcome of a patient only depends on
+    one bit per prerequisite and one per justification reading patient facts
+    (justifications reading none are folded in as constants). The table maps
+    each of the 2^k bit patterns to (final risk, applied rule mask),
+    evaluating a patient is computing its index.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        engine = network.engine
+
+        self.prerequisites = list(network.alpha)
+        self.justifications = _variable_justifications(network)
+        self.constants = {
+            j: bool(engine._is_consistent(j, {}))
+            for j in network.dependents if j not in self.justifications
+        }
+        self.bits = len(self.prerequisites) + len(self.justifications)
+
+        # Prerequisite bits a justification bit matters for
+        offset = len(self.prerequisites)
+        self.watch = []
+        for k, justification in enumerate(self.justifications):
+            watched = 0
+            for bit, prerequisite in enumerate(self.prerequisites):
+                if prerequisite in network.dependents[justification]:
+                    watched |= 1 << bit
+            self.watch.append((justification, 1 << (offset + k), watched))
+
+        size = 1 << self.bits
+        index = np.arange(size, dtype=np.int64)
+        present = {
+            prerequisite: ((index >> bit) & 1).astype(bool)
+            for bit, prerequisite in enumerate(self.prerequisites)
+        }
+        consistent = {
+            justification: ((index >> (offset + k)) & 1).astype(bool)
+            for k, justification in enumerate(self.justifications)
+        }
+        for justification, ok in self.constants.items():
+            consistent[justification] = np.full(size, ok)
+
+        self.ranks, self.masks = network.match_columns(present, consistent.__getitem__, size)
+        self.risks = network.risks(self.ranks)
+        self._names: Dict[int, List[str]] = {}
+
+    @classmethod
+    def compile(cls, network) -> Optional["DecisionTable"]:
+        """Table for the network, None when its fact space is too large"""
+        bits = len(network.alpha) + len(_variable_justifications(network))
+        words = max(1, (len(network.rules) + 63) // 64)
+        if bits > TABLE_MAX_BITS or (1 << bits) * words > TABLE_MAX_WORDS:
+            return None
+        return cls(network)
+
+    # ==================== Lookup ====================
+
+    def index(self, facts: Dict) -> int:
+        """Bit pattern of a fact set"""
+        index = 0
+        for bit, prerequisite in enumerate(self.prerequisites):
+            if prerequisite in facts:
+                index |= 1 << bit
+
+        # Consistency is only checked when a prerequisite it guards is present
+        for justification, bit, watched in self.watch:
+            if index & watched and self.network.consistent(justification, facts):
+                index |= bit
+        return index
+
+    def index_columns(self, present: Dict, consistent, n: int) -> np.ndarray:
+        """index() over n fact sets, same arguments as RuleNetwork.match_columns"""
+        index = np.zeros(n, dtype=np.int64)
+        for bit, prerequisite in enumerate(self.prerequisites):
+            column = present.get(prerequisite)
+            if column is not None:
+                index |= column.astype(np.int64) << bit
+
+        for justification, bit, watched in self.watch:
+            if (index & watched).any():
+                index |= np.where(consistent(justification), bit, 0)
+        return index
+
+    def names(self, index: int) -> List[str]:
+        """Applied rule names of an entry, in rule order"""
+        names = self._names.get(index)
+        if names is None:
+            words = self.masks[index]
+            names = self._names[index] = [
+                rule.name for i, rule in enumerate(self.network.rules)
+                if (int(words[i // 64]) >> (i % 64)) & 1
+            ]
+        return list(names)
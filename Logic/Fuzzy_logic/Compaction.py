@@ -0,0 +1,140 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List
+from .Surface import surface_axes
+
+
+@dataclass
+class RuleReport:
+    """
+    Analyse d'une base de règles Mamdani (agrégation max par terme de sortie).
+    duplicates / subsumed: règle retirée -> règle qui la couvre.
+    """
+    names: List[str]
+    peaks: np.ndarray
+    kept: List[int] = field(default_factory=list)
+    duplicates: Dict[int, int] = field(default_factory=dict)
+    subsumed: Dict[int, int] = field(default_factory=dict)
+    dead: List[int] = field(default_factory=list)
+
+    def summary(self) -> List[str]:
+        lines = [f"{len(self.kept)}/{len(self.names)} règles gardées"]
+        for rule, other in self.duplicates.items():
+            lines.append(f"  doublon:  {self.names[rule]}  (= {self.names[other]})")
+        for rule, other in self.subsumed.items():
+            lines.append(f"  dominée:  {self.names[rule]}  (par {self.names[other]})")
+        for rule in self.dead:
+            lines.append(f"  inactive: {self.names[rule]}")
+        return lines
+
+
+def _joint_peak(universe: np.ndarray, mfs: List[np.ndarray]) -> float:
+    """
+    max_x min_k mf_k(x) pour des fonctions linéaires entre les points de
+    l'univers: atteint en un point de l'univers ou là où deux d'entre elles
+    se croisent.
+    """
+    points = [universe]
+    for i, f in enumerate(mfs):
+        for g in mfs[i + 1:]:
+            d = f - g
+            crossing = np.flatnonzero(d[:-1] * d[1:] < 0)
+            t = d[crossing] / (d[crossing] - d[crossing + 1])
+            points.append(universe[crossing] + t * (universe[crossing + 1] - universe[crossing]))
+    points = np.concatenate(points)
+    return float(np.min([np.interp(points, universe, mf) for mf in mfs], axis=0).max())
+
+
+def rule_peaks(snapshot) -> np.ndarray:
+    """Plus grand degré d'activation atteignable par chaque règle sur le domaine des entrées"""
+    n_terms = len(snapshot.term_mfs)
+    peaks = np.empty(len(snapshot.rule_terms))
+    for r, row in enumerate(snapshot.rule_terms):
+        by_input: Dict[int, List[np.ndarray]] = {}
+        for term in row:
+            if term < n_terms:
+                by_input.setdefault(int(snapshot.term_inputs[term]), []).append(snapshot.term_mfs[term])
+        # Entrées indépendantes: le min des maxima de chaque entrée est atteint
+        peaks[r] = min(
+            (_joint_peak(snapshot.universes[column], mfs) for column, mfs in by_input.items()),
+            default=1.
+        ) * snapshot.rule_weights[r]
+    return peaks
+
+
+def analyze_rules(snapshot) -> RuleReport:
+    """
+    Règles sans effet sur les coupes max par terme de sortie:
+      - inactive: degré nul partout sur le domaine,
+      - doublon: mêmes termes et même sortie qu'une autre (la plus lourde reste),
+      - dominée: une autre règle de même sortie, de poids au moins égal, n'a
+        qu'une partie de ses termes; son min est toujours au moins aussi grand.
+    Vrai pour l'agrégation max (mamdani), pas pour la somme du mode sugeno.
+    """
+    n_terms = len(snapshot.term_mfs)
+    report = RuleReport(names=list(snapshot.rule_names), peaks=rule_peaks(snapshot))
+    rules = [
+        (frozenset(int(t) for t in row if t < n_terms), int(output), float(weight))
+        for row, output, weight in zip(snapshot.rule_terms, snapshot.rule_outputs, snapshot.rule_weights)
+    ]
+
+    report.dead = [r for r in range(len(rules)) if report.peaks[r] <= 0]
+    alive = [r for r in range(len(rules)) if r not in report.dead]
+
+    # Doublons: première règle de poids maximal de chaque (termes, sortie)
+    representative: Dict = {}
+    for r in alive:
+        terms, output, weight = rules[r]
+        best = representative.get((terms, output))
+        if best is None or weight > rules[best][2]:
+            representative[(terms, output)] = r
+    for r in alive:
+        best = representative[(rules[r][0], rules[r][1])]
+        if best != r:
+            report.duplicates[r] = best
+    candidates = [r for r in alive if r not in report.duplicates]
+
+    # Domination par un sous-ensemble strict (relation sans cycle: retirer
+    # toutes les dominées garde toujours une règle dominante)
+    for r in candidates:
+        terms, output, weight = rules[r]
+        for other in candidates:
+            o_terms, o_output, o_weight = rules[other]
+            if o_output == output and o_weight >= weight and o_terms < terms:
+                report.subsumed[r] = other
+                break
+
+    report.kept = [r for r in candidates if r not in report.subsumed]
+    return report
+
+
+def verify_compaction(system, axes: List[np.ndarray] = None, block: int = 65536) -> Dict:
+    """
+    Compare les coupes de sortie (N, termes) de la base complète et de la base
+    compactée du système sur toute la grille (par défaut celle de la surface
+    de risque). Coupes identiques => sorties identiques, la défuzzification
+    ne dépend que d'elles.
+    """
+    axes = axes if axes is not None else surface_axes(system)
+    shape = tuple(len(axis) for axis in axes)
+    size = int(np.prod(shape))
+    rules = system._mamdani_rules
+
+    differing, worst = 0, 0.
+    for start in range(0, size, block):
+        coords = np.unravel_index(np.arange(start, min(start + block, size)), shape)
+        x = system._universe_clip(np.column_stack([axis[index] for axis, index in zip(axes, coords)]))
+        full = system._output_cuts(system._rule_strengths(system._memberships(x)))
+        compact = system._mamdani_cuts(x)
+        if not np.array_equal(full, compact):
+            differing += int((full != compact).any(axis=1).sum())
+            worst = max(worst, float(np.abs(full - compact).max()))
+
+    return {
+        'points': size,
+        'rules': len(system.rule_names),
+        'kept': len(rules),
+        'identical': differing == 0,
+        'differing_points': differing,
+        'max_cut_difference': worst,
+    }
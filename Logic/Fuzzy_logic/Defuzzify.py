@@ -0,0 +1,180 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+
+
+# Méthodes de défuzzification analytiques disponibles
+METHODS = ('centroid', 'bisector', 'mom')
+
+
+def shape_vertices(kind: str, params: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sommets (x, y) d'une fonction d'appartenance trimf / trapmf"""
+    if kind == 'trimf':
+        a, b, c = params
+        xs, ys = [a, b, c], [0., 1., 0.]
+    elif kind == 'trapmf':
+        a, b, c, d = params
+        xs, ys = [a, b, c, d], [0., 1., 1., 0.]
+    else:
+        raise ValueError(f"Forme non supportée: {kind}")
+
+    # Côtés verticaux (a == b, c == d): le sommet au même x est absorbé
+    vertices = []
+    for x, y in zip(xs, ys):
+        if vertices and vertices[-1][0] == x:
+            if y > vertices[-1][1]:
+                vertices[-1] = (x, y)
+            continue
+        vertices.append((x, y))
+    return np.array([v[0] for v in vertices], float), np.array([v[1] for v in vertices], float)
+
+
+class PiecewiseLinearSets:
+    """
+    Ensembles de sortie linéaires par morceaux et défuzzification exacte.
+
+    L'agrégation max_t min(coupe_t, mf_t(x)) reste linéaire par morceaux, ses
+    points de rupture sont connus: sommets des ensembles, intersections de
+    deux ensembles, et points où un ensemble atteint une des coupes. Entre
+    deux ruptures la fonction est un segment, centroïde, bissectrice et
+    moyenne des maxima s'intègrent donc exactement, sans univers
+    échantillonné, en O(nombre de ruptures) par patient.
+    """
+
+    def __init__(self, shapes: Dict[str, Tuple[np.ndarray, np.ndarray]], domain: Tuple[float, float]):
+        self.labels = list(shapes)
+        self.shapes = [shapes[label] for label in self.labels]
+        self.domain = (float(domain[0]), float(domain[1]))
+
+        # Segments non horizontaux (x0, y0, x1, y1) de tous les ensembles
+        self.segments = np.array([
+            (xs[i], ys[i], xs[i + 1], ys[i + 1])
+            for xs, ys in self.shapes for i in range(len(xs) - 1)
+            if ys[i] != ys[i + 1]
+        ], dtype=float).reshape(-1, 4)
+
+        self.static_points = np.unique(np.clip(np.concatenate(
+            [xs for xs, _ in self.shapes] + [np.array(self.domain), self._intersections()]
+        ), *self.domain))
+
+    def _intersections(self) -> np.ndarray:
+        """Abscisses où deux ensembles différents se croisent"""
+        points = []
+        for s, (xs_a, ys_a) in enumerate(self.shapes):
+            for xs_b, ys_b in self.shapes[s + 1:]:
+                for i in range(len(xs_a) - 1):
+                    for j in range(len(xs_b) - 1):
+                        x = self._segment_crossing(
+                            (xs_a[i], ys_a[i], xs_a[i + 1], ys_a[i + 1]),
+                            (xs_b[j], ys_b[j], xs_b[j + 1], ys_b[j + 1]))
+                        if x is not None:
+                            points.append(x)
+        return np.array(points, dtype=float)
+
+    @staticmethod
+    def _segment_crossing(a, b):
+        ax0, ay0, ax1, ay1 = a
+        bx0, by0, bx1, by1 = b
+        lo, hi = max(ax0, bx0), min(ax1, bx1)
+        if lo >= hi:
+            return None
+        slope_a = (ay1 - ay0) / (ax1 - ax0)
+        slope_b = (by1 - by0) / (bx1 - bx0)
+        if slope_a == slope_b:
+            return None
+        # ay0 + slope_a (x - ax0) == by0 + slope_b (x - bx0)
+        x = (by0 - ay0 + slope_a * ax0 - slope_b * bx0) / (slope_a - slope_b)
+        return x if lo < x < hi else None
+
+    # ==================== Agrégation ====================
+
+    def aggregate(self, cuts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points de rupture triés (N, K) et valeur de l'agrégation en ces points.
+        Les points absents valent le bord droit du domaine (segments de largeur nulle).
+        """
+        n = len(cuts)
+        lo, hi = self.domain
+
+        columns = [np.broadcast_to(self.static_points, (n, len(self.static_points)))]
+        if len(self.segments):
+            x0, y0, x1, y1 = (self.segments[:, k] for k in range(4))
+            for level in cuts.T:
+                c = level[:, None]
+                inside = (c >= np.minimum(y0, y1)) & (c <= np.maximum(y0, y1))
+                x = x0 + (c - y0) * (x1 - x0) / (y1 - y0)
+                columns.append(np.where(inside, np.clip(x, lo, hi), hi))
+        points = np.sort(np.concatenate(columns, axis=1), axis=1)
+
+        values = np.zeros_like(points)
+        for (xs, ys), cut in zip(self.shapes, cuts.T):
+            np.maximum(values, np.minimum(cut[:, None], np.interp(points, xs, ys)), out=values)
+        return points, values
+
+    # ==================== Défuzzification ====================
+
+    def defuzzify(self, cuts: np.ndarray, method: str = 'centroid') -> np.ndarray:
+        """Sortie nette de chaque ligne de cuts (N, ensembles), NaN si l'aire est vide"""
+        if method not in METHODS:
+            raise ValueError(f"Méthode de défuzzification inconnue: {method} (attendu: {METHODS})")
+        points, values = self.aggregate(np.asarray(cuts, dtype=float))
+        if method == 'centroid':
+            return self.centroid(points, values)
+        if method == 'bisector':
+            return self.bisector(points, values)
+        return self.mean_of_maximum(points, values)
+
+    @staticmethod
+    def _areas(points, values):
+        x1, x2 = points[:, :-1], points[:, 1:]
+        y1, y2 = values[:, :-1], values[:, 1:]
+        return x1, x2, y1, y2, 0.5 * (x2 - x1) * (y1 + y2)
+
+    def centroid(self, points, values) -> np.ndarray:
+        x1, x2, y1, y2, area = self._areas(points, values)
+        moment = (x2 - x1) * (y1 * (2 * x1 + x2) + y2 * (x1 + 2 * x2)) / 6.
+        total = area.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, moment.sum(axis=1) / total, np.nan)
+
+    def bisector(self, points, values) -> np.ndarray:
+        """Abscisse qui partage l'aire en deux moitiés égales"""
+        x1, x2, y1, y2, area = self._areas(points, values)
+        cumulative = np.cumsum(area, axis=1)
+        total = cumulative[:, -1]
+        half = 0.5 * total
+
+        # Premier segment où l'aire cumulée atteint la moitié
+        k = np.minimum((cumulative < half[:, None]).sum(axis=1), area.shape[1] - 1)[:, None]
+        take = lambda a: np.take_along_axis(a, k, axis=1)[:, 0]
+        start, width, left, right = take(x1), take(x2) - take(x1), take(y1), take(y2)
+        target = half - (take(cumulative) - take(area))
+
+        # Aire sur [start, start + t]: left t + slope t^2 / 2 = target,
+        # racine écrite sans soustraction (stable quand la pente est nulle)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(width > 0, (right - left) / width, 0.)
+            root = np.sqrt(np.maximum(left * left + 2 * slope * target, 0.))
+            t = 2 * target / (left + root)
+        t = np.clip(np.nan_to_num(t), 0., width)
+        return np.where(total > 0, start + t, np.nan)
+
+    def mean_of_maximum(self, points, values) -> np.ndarray:
+        """Moyenne de l'ensemble où l'agrégation est maximale (plateaux pondérés par leur longueur)"""
+        # Les points de coupe sont recalculés par interpolation: tolérance d'arrondi
+        height = values.max(axis=1, keepdims=True)
+        at_max = values >= height - 1e-12
+
+        x1, x2 = points[:, :-1], points[:, 1:]
+        plateau = at_max[:, :-1] & at_max[:, 1:] & (x2 > x1)
+        length = np.where(plateau, x2 - x1, 0.).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plateau_mean = np.where(plateau, (x2 - x1) * (x1 + x2) / 2, 0.).sum(axis=1) / length
+
+        # Sans plateau: moyenne des sommets (points distincts) au maximum
+        distinct = np.concatenate([np.ones((len(points), 1), bool), np.diff(points, axis=1) > 0], axis=1)
+        peaks = at_max & distinct
+        with np.errstate(divide='ignore', invalid='ignore'):
+            peak_mean = np.where(peaks, points, 0.).sum(axis=1) / peaks.sum(axis=1)
+
+        result = np.where(length > 0, plateau_mean, peak_mean)
+        return np.where(height[:, 0] > 0, result, np.nan)
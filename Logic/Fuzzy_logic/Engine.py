@@ -1,90 +1,530 @@
+import json
+import os
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
+from dataclasses import asdict, dataclass, field
 from typing import Dict, List
 from Knowledge.Hierarchy import Patient, RiskLevel
+from .Compaction import analyze_rules
+from .Defuzzify import METHODS, PiecewiseLinearSets, shape_vertices
+from .Snapshot import FuzzySnapshot, load_snapshot
+from .Sugeno import SugenoConsequents, default_consequents
 
-class FuzzyLungDiseaseSystem:
-    def __init__(self):
-        self.system = None
-        self.simulation = None
-        self.setup_fuzzy_system()
+
+# Ordre des entrées dans les tableaux du mode batch
+INPUT_NAMES = ['smoking', 'air_pollution', 'coughing_blood', 'chest_pain',
+               'shortness_breath', 'weight_loss', 'age']
+
+# Modes d'inférence disponibles par appel
+MODES = ('mamdani', 'sugeno')
+
+# Nombre de patients traités ensemble (borne la mémoire de la défuzzification)
+BATCH_BLOCK = 65536
+
+# ==================== VARIABLES D'ENTRÉE SIMPLIFIÉES ====================
+# Toutes les variables ont la même échelle pour simplifier
+SYMPTOM_SETS = {
+    'low': ('trimf', [0, 0, 3]),     # low: 0-3
+    'medium': ('trimf', [2, 5, 8]),  # medium: 2-8
+    'high': ('trimf', [6, 10, 10]),  # high: 6-10
+}
+
+# Âge
+AGE_SETS = {
+    'young': ('trapmf', [0, 0, 25, 35]),
+    'middle': ('trimf', [30, 45, 60]),
+    'senior': ('trapmf', [50, 65, 100, 100]),
+}
+
+# Univers (début, fin, pas) des entrées
+SYMPTOM_UNIVERSE = [0, 11, 1]
+AGE_UNIVERSE = [0, 101, 1]
+
+# ==================== VARIABLE DE SORTIE ====================
+# Ensembles de sortie (forme, paramètres), partagés par skfuzzy et la défuzzification analytique
+RISK_SETS = {
+    'low': ('trimf', [0, 0, 4]),
+    'medium': ('trimf', [3, 5, 7]),
+    'high': ('trimf', [6, 10, 10]),
+}
+RISK_UNIVERSE = [0, 11, 1]
+
+# Seuils de _crisp_to_risk_level: Low < 3 <= Medium < 6 <= High
+RISK_THRESHOLDS = [3.0, 6.0]
+
+# ==================== RÈGLES CORRIGÉES POUR ÊTRE PLUS SENSIBLES ====================
+# (conjonction de (entrée, terme), terme de sortie)
+# Règles HIGH - symptômes graves seuls peuvent donner HIGH
+RULES = [
+    # Règles HIGH (symptômes graves)
+    ([('coughing_blood', 'high')], 'high'),  # Coughing blood seul -> HIGH
+    ([('smoking', 'high'), ('age', 'senior')], 'high'),
+    ([('smoking', 'high'), ('air_pollution', 'high')], 'high'),
+    ([('coughing_blood', 'high'), ('chest_pain', 'high')], 'high'),
+    ([('shortness_breath', 'high'), ('weight_loss', 'high')], 'high'),
+
+    # Règles MEDIUM
+    ([('smoking', 'medium'), ('air_pollution', 'medium')], 'medium'),
+    ([('chest_pain', 'medium'), ('shortness_breath', 'medium')], 'medium'),
+    ([('age', 'middle'), ('smoking', 'medium')], 'medium'),
+    ([('coughing_blood', 'medium')], 'medium'),
+    ([('chest_pain', 'medium')], 'medium'),
+    ([('shortness_breath', 'medium'), ('weight_loss', 'medium')], 'medium'),
+
+    # Règles LOW
+    ([('smoking', 'low'), ('air_pollution', 'low')], 'low'),
+    ([('coughing_blood', 'low'), ('chest_pain', 'low')], 'low'),
+    ([('age', 'young'), ('smoking', 'low')], 'low'),
+
+    # Règles par défaut (atténuées)
+    ([('smoking', 'high')], 'medium'),
+    ([('age', 'senior')], 'medium'),
+    ([('age', 'young')], 'low'),
+
+    # Règle de base: si aucun symptôme -> LOW
+    ([('smoking', 'low'), ('coughing_blood', 'low'),
+      ('chest_pain', 'low'), ('shortness_breath', 'low')], 'low'),
+]
+
+
+
+def build_definition(symptom_sets: Dict = SYMPTOM_SETS, age_sets: Dict = AGE_SETS) -> Dict:
+    """Définition complète du système (clé du cache de snapshots)"""
+    inputs = {name: (SYMPTOM_UNIVERSE, symptom_sets) for name in INPUT_NAMES if name != 'age'}
+    inputs['age'] = (AGE_UNIVERSE, age_sets)
+    return {
+        'inputs': inputs,
+        'output': [RISK_UNIVERSE, RISK_SETS],
+        'rules': RULES,
+    }
+
+
+DEFINITION = build_definition()
+
+# Paramètres chargés au démarrage quand le fichier existe (voir Tuning.tune_fuzzy_system)
+TUNED_PARAMETERS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fuzzy_parameters.json')
+
+
+@dataclass
+class FuzzyParameters:
+    """
+    Points de rupture réglables du système: ensembles des symptômes
+    (partagés par les six entrées), ensembles de l'âge et seuils des
+    niveaux de risque. Par défaut, les valeurs choisies à la main.
+    """
+    symptom_sets: Dict[str, List] = field(default_factory=lambda: {
+        label: [kind, list(params)] for label, (kind, params) in SYMPTOM_SETS.items()
+    })
+    age_sets: Dict[str, List] = field(default_factory=lambda: {
+        label: [kind, list(params)] for label, (kind, params) in AGE_SETS.items()
+    })
+    risk_thresholds: List[float] = field(default_factory=lambda: list(RISK_THRESHOLDS))
+
+    def definition(self) -> Dict:
+        return build_definition(self.symptom_sets, self.age_sets)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FuzzyParameters":
+        return cls(**data)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "FuzzyParameters":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+class MamdaniInference:
+    """
+    Inférence Mamdani vectorisée d'un FuzzySnapshot (min des conjonctions,
+    max par terme de sortie, défuzzification). Attend les attributs
+    snapshot, defuzzification et compact, puis un appel à _compile_mamdani().
+    """
+
+    def _compile_mamdani(self):
+        """Ensembles de sortie et base compactée depuis self.snapshot"""
+        snapshot = self.snapshot
+        self._output_universe = snapshot.output_universe
+        self._output_terms = list(zip(snapshot.output_labels, snapshot.output_mfs))
+        output_sets = snapshot.definition['output'][1]
+        self._output_sets = PiecewiseLinearSets(
+            {label: shape_vertices(*output_sets[label]) for label in snapshot.output_labels},
+            (self._output_universe.min(), self._output_universe.max())
+        )
+
+        # Base compactée du mode mamdani et termes d'entrée qu'elle utilise
+        self.rule_report = analyze_rules(snapshot)
+        rules = self.rule_report.kept if self.compact else range(len(snapshot.rule_names))
+        self._mamdani_rules = np.array(rules, dtype=np.intp)
+        terms = np.unique(snapshot.rule_terms[self._mamdani_rules])
+        self._mamdani_terms = terms[terms < len(snapshot.term_mfs)]
+
+    def _memberships(self, x: np.ndarray, terms=None) -> np.ndarray:
+        """
+        Degrés d'appartenance (N, termes + 1) des termes d'entrée (tous, ou
+        seulement terms; les autres colonnes restent à 1), x (N, 7) déjà
+        dans les univers. Dernière colonne: constante 1.
+        """
+        snapshot = self.snapshot
+        memberships = np.ones((len(x), len(snapshot.term_mfs) + 1))
+        for k in range(len(snapshot.term_mfs)) if terms is None else terms:
+            column = snapshot.term_inputs[k]
+            memberships[:, k] = np.interp(x[:, column], snapshot.universes[column], snapshot.term_mfs[k])
+        return memberships
+
+    def _rule_strengths(self, memberships: np.ndarray, rules: np.ndarray = None) -> np.ndarray:
+        """Degré d'activation (N, règles): min des termes de chaque conjonction"""
+        terms = self.snapshot.rule_terms if rules is None else self.snapshot.rule_terms[rules]
+        strengths = memberships[:, terms[:, 0]]
+        for k in range(1, terms.shape[1]):
+            np.fmin(strengths, memberships[:, terms[:, k]], out=strengths)
+        return strengths
+
+    def _output_cuts(self, strengths: np.ndarray, rules: np.ndarray = None) -> np.ndarray:
+        """
+        Niveau de coupe de chaque terme de sortie (max des règles), forme
+        (N, termes). rules: règles des colonnes de strengths, toutes par défaut.
+        """
+        snapshot = self.snapshot
+        outputs, weights = snapshot.rule_outputs, snapshot.rule_weights
+        if rules is not None:
+            outputs, weights = outputs[rules], weights[rules]
+        weighted = strengths * weights
+        cuts = np.zeros((len(strengths), len(snapshot.output_labels)))
+        for k in range(cuts.shape[1]):
+            cuts[:, k] = np.fmax.reduce(weighted[:, outputs == k], axis=1, initial=0.)
+        return cuts
+
+    def _mamdani_cuts(self, x: np.ndarray) -> np.ndarray:
+        """Coupes de sortie calculées avec la seule base compactée"""
+        rules = self._mamdani_rules
+        return self._output_cuts(self._rule_strengths(self._memberships(x, self._mamdani_terms), rules), rules)
+
+    def _defuzzify_centroid(self, cuts: np.ndarray) -> np.ndarray:
+        """
+        Centroïde de l'agrégation des termes coupés, comme skfuzzy:
+        l'univers est complété par les points où chaque terme atteint sa
+        coupe, puis la fonction est intégrée linéairement entre les points.
+        NaN quand l'aire est vide (skfuzzy lève une erreur).
+        """
+        universe = self._output_universe
+        left, right = universe[:-1], universe[1:]
+
+        # Points absents remplacés par le bord droit: segments de largeur nulle
+        points = [np.broadcast_to(universe, (len(cuts), len(universe)))]
+        extra = 0
+        for k, (_, mf) in enumerate(self._output_terms):
+            y = cuts[:, k:k + 1]
+            a, b = mf[:-1], mf[1:]
+            crosses = np.where(y == 0, (a > 0) != (b > 0), (a >= y) != (b >= y))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = left + (y - a) * (right - left) / (b - a)
+            points.append(np.where(crosses, x, universe[-1]))
+            extra += crosses.sum(axis=1)
+        points = np.sort(np.concatenate(points, axis=1), axis=1)
+        points = points[:, :len(universe) + int(extra.max(initial=0))]
+
+        mfx = np.zeros_like(points)
+        for k, (_, mf) in enumerate(self._output_terms):
+            np.maximum(mfx, np.minimum(cuts[:, k:k + 1], np.interp(points, universe, mf)), out=mfx)
+
+        # Découpage de skfuzzy.defuzzify.centroid (rectangles, triangles, trapèzes),
+        # sommé de gauche à droite pour retrouver ses arrondis
+        x1, x2 = points[:, :-1], points[:, 1:]
+        y1, y2 = mfx[:, :-1], mfx[:, 1:]
+        width = x2 - x1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moment = np.where(
+                y1 == y2, 0.5 * (x1 + x2),
+                np.where(y1 == 0., 2.0 / 3.0 * width + x1,
+                         np.where(y2 == 0., 1.0 / 3.0 * width + x1,
+                                  (2.0 / 3.0 * width * (y2 + 0.5 * y1)) / (y1 + y2) + x1)))
+            area = np.where(y1 == y2, width * y1,
+                            np.where(y1 == 0., 0.5 * width * y2,
+                                     np.where(y2 == 0., 0.5 * width * y1, 0.5 * width * (y1 + y2))))
+        skip = ((y1 == 0.) & (y2 == 0.)) | (width == 0.)
+        moment_area = np.where(skip, 0., moment * area)
+        area = np.where(skip, 0., area)
+
+        total_moment = np.cumsum(moment_area, axis=1)[:, -1]
+        total_area = np.cumsum(area, axis=1)[:, -1]
+        crisp = total_moment / np.fmax(total_area, np.finfo(float).eps)
+
+        crisp[mfx.sum(axis=1) == 0] = np.nan
+        return crisp
+
+    def _defuzzify(self, cuts: np.ndarray) -> np.ndarray:
+        """Sortie nette des coupes (N, termes) avec la méthode choisie à la construction"""
+        if self.defuzzification == 'sampled':
+            return self._defuzzify_centroid(cuts)
+        return self._output_sets.defuzzify(cuts, self.defuzzification)
+
+    @property
+    def rule_names(self) -> List[str]:
+        """Nom de chaque règle, dans l'ordre des colonnes de rule_strengths"""
+        return self.snapshot.rule_names
+
+
+class FuzzyLungDiseaseSystem(MamdaniInference):
+    # Entrées du système, dans l'ordre des colonnes des tableaux
+    input_names = INPUT_NAMES
+
+    # MAPPING CORRIGÉ - correspond aux noms de colonnes CSV
+    symptom_mapping = {
+        'smoking': 'Smoking',
+        'air_pollution': 'Air Pollution',
+        'coughing_blood': 'Coughing of Blood',
+        'chest_pain': 'Chest Pain',
+        'shortness_breath': 'Shortness of Breath',
+        'weight_loss': 'Weight Loss'
+    }
+
+    def __init__(self, defuzzification: str = 'sampled', snapshot: FuzzySnapshot = None, parameters=None,
+                 surface=None, compact: bool = True, cache: bool = True):
+        """
+        defuzzification: 'sampled' (centroïde de skfuzzy sur l'univers échantillonné)
+        ou une méthode analytique exacte: 'centroid', 'bisector', 'mom'.
+        parameters: FuzzyParameters, dict ou chemin d'un fichier de paramètres;
+        par défaut TUNED_PARAMETERS s'il existe, sinon les valeurs d'origine.
+        snapshot: système compilé (Snapshot.FuzzySnapshot), par défaut celui
+        des paramètres, lu depuis le cache. Le ControlSystem skfuzzy n'est
+        construit qu'à la première utilisation de system / simulation.
+        surface: Surface.RiskSurface, ou True pour la lire depuis le cache: le
+        mode mamdani devient une lecture de la sortie précalculée, arrondie
+        en float16. True ne construit jamais la surface (plusieurs minutes):
+        absente du cache, le calcul reste exact (surface None). La
+        construire avant avec RiskSurface.build(système, n_jobs=...).
+        compact: le mode mamdani n'évalue que les règles gardées par
+        Compaction.analyze_rules (mêmes sorties, voir verify_compaction).
+        cache: False pour un moteur jetable, son snapshot n'est pas écrit
+        dans le cache.
+        """
+        if defuzzification != 'sampled' and defuzzification not in METHODS:
+            raise ValueError(f"Défuzzification inconnue: {defuzzification}")
+        if parameters is None:
+            parameters = TUNED_PARAMETERS if os.path.exists(TUNED_PARAMETERS) else FuzzyParameters()
+        if isinstance(parameters, dict):
+            parameters = FuzzyParameters.from_dict(parameters)
+        elif isinstance(parameters, str):
+            parameters = FuzzyParameters.load(parameters)
+        self.defuzzification = defuzzification
+        self.parameters = parameters
+        self.snapshot = snapshot or load_snapshot(parameters.definition(), cache=cache)
+        self.compact = compact
+        self._system = None
+        self._simulation = None
+        self._compile_batch()
+        self.surface = None
+        if surface is True:
+            from .Surface import load_surface
+            surface = load_surface(self, build=False)
+        self.surface = surface or None
+
+    @property
+    def system(self):
+        if self._system is None:
+            self.setup_fuzzy_system()
+        return self._system
+
+    @property
+    def simulation(self):
+        if self._simulation is None:
+            self.setup_fuzzy_system()
+        return self._simulation
     
     def setup_fuzzy_system(self):
-        """Configure le système flou simplifié mais efficace"""
-        
-        # ==================== VARIABLES D'ENTRÉE SIMPLIFIÉES ====================
-        # Variables principales basées sur vos règles
-        self.smoking = ctrl.Antecedent(np.arange(0, 11, 1), 'smoking')
-        self.air_pollution = ctrl.Antecedent(np.arange(0, 11, 1), 'air_pollution')
-        self.coughing_blood = ctrl.Antecedent(np.arange(0, 11, 1), 'coughing_blood')
-        self.chest_pain = ctrl.Antecedent(np.arange(0, 11, 1), 'chest_pain')
-        self.shortness_breath = ctrl.Antecedent(np.arange(0, 11, 1), 'shortness_breath')
-        self.weight_loss = ctrl.Antecedent(np.arange(0, 11, 1), 'weight_loss')
-        self.age = ctrl.Antecedent(np.arange(0, 101, 1), 'age')
-        
-        # ==================== VARIABLE DE SORTIE ====================
-        self.risk_level = ctrl.Consequent(np.arange(0, 11, 1), 'risk_level')
-        
-        # ==================== FONCTIONS D'APPARTENANCE SIMPLIFIÉES ====================
-        # Toutes les variables ont la même échelle pour simplifier
-        for var in [self.smoking, self.air_pollution, self.coughing_blood, 
-                    self.chest_pain, self.shortness_breath, self.weight_loss]:
-            var['low'] = fuzz.trimf(var.universe, [0, 0, 3])    # low: 0-3
-            var['medium'] = fuzz.trimf(var.universe, [2, 5, 8]) # medium: 2-8  
-            var['high'] = fuzz.trimf(var.universe, [6, 10, 10]) # high: 6-10
-        
-        # Âge
-        self.age['young'] = fuzz.trapmf(self.age.universe, [0, 0, 25, 35])
-        self.age['middle'] = fuzz.trimf(self.age.universe, [30, 45, 60])
-        self.age['senior'] = fuzz.trapmf(self.age.universe, [50, 65, 100, 100])
-        
-        # Risque
-        self.risk_level['low'] = fuzz.trimf(self.risk_level.universe, [0, 0, 4])
-        self.risk_level['medium'] = fuzz.trimf(self.risk_level.universe, [3, 5, 7])
-        self.risk_level['high'] = fuzz.trimf(self.risk_level.universe, [6, 10, 10])
+        """Construit le système skfuzzy équivalent au snapshot"""
+        import skfuzzy as fuzz
+        from skfuzzy import control as ctrl
+
+        definition = self.snapshot.definition
+        variables = {}
+        for name, (universe, sets) in definition['inputs'].items():
+            var = variables[name] = ctrl.Antecedent(np.arange(*universe), name)
+            for label, (kind, params) in sets.items():
+                var[label] = getattr(fuzz, kind)(var.universe, params)
+            setattr(self, name, var)
+
+        universe, sets = definition['output']
+        self.risk_level = ctrl.Consequent(np.arange(*universe), 'risk_level')
+        for label, (kind, params) in sets.items():
+            self.risk_level[label] = getattr(fuzz, kind)(self.risk_level.universe, params)
         self.risk_level.defuzzify_method = 'centroid'
-        
-        # ==================== RÈGLES CORRIGÉES POUR ÊTRE PLUS SENSIBLES ====================
-        # Règles HIGH - symptômes graves seuls peuvent donner HIGH
-        rules = [
-            # Règles HIGH (symptômes graves)
-            ctrl.Rule(self.coughing_blood['high'], self.risk_level['high']),  # Coughing blood seul -> HIGH
-            ctrl.Rule(self.smoking['high'] & self.age['senior'], self.risk_level['high']),
-            ctrl.Rule(self.smoking['high'] & self.air_pollution['high'], self.risk_level['high']),
-            ctrl.Rule(self.coughing_blood['high'] & self.chest_pain['high'], self.risk_level['high']),
-            ctrl.Rule(self.shortness_breath['high'] & self.weight_loss['high'], self.risk_level['high']),
-            
-            # Règles MEDIUM
-            ctrl.Rule(self.smoking['medium'] & self.air_pollution['medium'], self.risk_level['medium']),
-            ctrl.Rule(self.chest_pain['medium'] & self.shortness_breath['medium'], self.risk_level['medium']),
-            ctrl.Rule(self.age['middle'] & self.smoking['medium'], self.risk_level['medium']),
-            ctrl.Rule(self.coughing_blood['medium'], self.risk_level['medium']),
-            ctrl.Rule(self.chest_pain['medium'], self.risk_level['medium']),
-            ctrl.Rule(self.shortness_breath['medium'] & self.weight_loss['medium'], self.risk_level['medium']),
-            
-            # Règles LOW
-            ctrl.Rule(self.smoking['low'] & self.air_pollution['low'], self.risk_level['low']),
-            ctrl.Rule(self.coughing_blood['low'] & self.chest_pain['low'], self.risk_level['low']),
-            ctrl.Rule(self.age['young'] & self.smoking['low'], self.risk_level['low']),
-            
-            # Règles par défaut (atténuées)
-            ctrl.Rule(self.smoking['high'], self.risk_level['medium']),
-            ctrl.Rule(self.age['senior'], self.risk_level['medium']),
-            ctrl.Rule(self.age['young'], self.risk_level['low']),
-            
-            # Règle de base: si aucun symptôme -> LOW
-            ctrl.Rule(self.smoking['low'] & self.coughing_blood['low'] & 
-                     self.chest_pain['low'] & self.shortness_breath['low'], 
-                     self.risk_level['low']),
-        ]
-        
+
+        rules = []
+        for antecedent, output in definition['rules']:
+            condition = None
+            for name, label in antecedent:
+                term = variables[name][label]
+                condition = term if condition is None else condition & term
+            rules.append(ctrl.Rule(condition, self.risk_level[output]))
+
         # Création du système
-        self.system = ctrl.ControlSystem(rules)
-        self.simulation = ctrl.ControlSystemSimulation(self.system)
+        self.rules = rules
+        self._system = ctrl.ControlSystem(rules)
+        self._simulation = ctrl.ControlSystemSimulation(self._system)
+
+    # ==================== MODE BATCH ====================
+
+    def _compile_batch(self):
+        """Prépare les tableaux du calcul vectorisé depuis le snapshot"""
+        snapshot = self.snapshot
+        if snapshot.input_names != INPUT_NAMES:
+            raise ValueError(f"Entrées du snapshot inattendues: {snapshot.input_names}")
+
+        self._lower = np.array([universe.min() for universe in snapshot.universes])
+        self._upper = np.array([universe.max() for universe in snapshot.universes])
+
+        self._compile_mamdani()
+
+        # Règle -> terme de sortie en matrice (règles, termes), poids inclus
+        self._rule_outputs = np.zeros((len(snapshot.rule_outputs), len(snapshot.output_labels)))
+        self._rule_outputs[np.arange(len(snapshot.rule_outputs)), snapshot.rule_outputs] = snapshot.rule_weights
+
+        # Conséquents du mode Sugeno (remplaçables, voir Sugeno.fit_sugeno)
+        self.sugeno = default_consequents(self)
+
+    def _sugeno_weights(self, strengths: np.ndarray):
+        """Somme des activations par terme de sortie (N, termes) et somme totale"""
+        weights = strengths @ self._rule_outputs
+        return weights, weights.sum(axis=1)
+
+    def _sugeno_output(self, x: np.ndarray, strengths: np.ndarray,
+                       consequents: SugenoConsequents) -> np.ndarray:
+        """Moyenne des sorties de termes pondérée par les activations des règles"""
+        weights, total = self._sugeno_weights(strengths)
+        values = consequents.values(x)
+        numerator = sum(weights[:, k] * values[label] for k, (label, _) in enumerate(self._output_terms))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, numerator / total, np.nan)
+
+    def compute_batch(self, x, mode: str = 'mamdani', consequents: SugenoConsequents = None) -> np.ndarray:
+        """
+        Sortie nette du système pour N patients.
+        x: tableau (N, entrées) dans l'ordre input_names, ou dict nom -> tableau.
+        mode 'sugeno' remplace agrégation et défuzzification par la moyenne
+        pondérée des conséquents (self.sugeno, ou consequents).
+        NaN pour les patients qu'aucune règle n'active.
+        """
+        return self._infer(x, mode, consequents)[0]
+
+    def _infer(self, x, mode: str = 'mamdani', consequents: SugenoConsequents = None,
+               keep_strengths: bool = False):
+        """
+        compute_batch(), et si keep_strengths le degré d'activation de chaque
+        règle (N, règles) en float32, celui utilisé par l'inférence.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Mode inconnu: {mode} (attendu: {MODES})")
+        x = self._as_matrix(x)
+        crisp = np.empty(len(x))
+        kept = np.empty((len(x), len(self.rule_names)), dtype=np.float32) if keep_strengths else None
+        for start in range(0, len(x), BATCH_BLOCK):
+            block = self._universe_clip(x[start:start + BATCH_BLOCK])
+            if mode == 'mamdani' and self.surface is not None:
+                crisp[start:start + BATCH_BLOCK] = self._surface_output(
+                    block, kept[start:start + BATCH_BLOCK] if keep_strengths else None)
+                continue
+            if mode == 'mamdani' and not keep_strengths:
+                crisp[start:start + BATCH_BLOCK] = self._defuzzify(self._mamdani_cuts(block))
+                continue
+            # Sugeno somme les activations: toutes les règles comptent
+            strengths = self._rule_strengths(self._memberships(block))
+            if keep_strengths:
+                kept[start:start + BATCH_BLOCK] = strengths
+            if mode == 'sugeno':
+                crisp[start:start + BATCH_BLOCK] = self._sugeno_output(block, strengths, consequents or self.sugeno)
+                continue
+            crisp[start:start + BATCH_BLOCK] = self._defuzzify(self._output_cuts(strengths))
+        return crisp, kept
+
+    def _surface_output(self, block: np.ndarray, kept: np.ndarray = None) -> np.ndarray:
+        """
+        Sortie lue sur la surface; les lignes sans valeur (cellule sans
+        règle active, entrée non finie) sont calculées normalement.
+        Les activations ne sont calculées que si kept les demande.
+        """
+        crisp = self.surface.lookup(block)
+        missing = np.isnan(crisp)
+        if kept is not None:
+            strengths = self._rule_strengths(self._memberships(block))
+            kept[:] = strengths
+            if missing.any():
+                crisp[missing] = self._defuzzify(self._output_cuts(strengths[missing]))
+        elif missing.any():
+            crisp[missing] = self._defuzzify(self._mamdani_cuts(block[missing]))
+        return crisp
+
+    def evaluate_batch(self, inputs, mode: str = 'mamdani') -> Dict:
+        """
+        evaluate_patient() sur N patients, sans skfuzzy ni affichage.
+        inputs: dict nom -> tableau (valeurs de _prepare_inputs) ou tableau (N, 7).
+        Retourne des tableaux: risk_value, risk_level, confidence, fallback,
+        rule_strengths (N, règles) float32, colonnes dans l'ordre rule_names.
+        """
+        raw = self._as_matrix(inputs)
+        clipped = self._clip_inputs(raw)
+
+        risk_value, rule_strengths = self._infer(clipped, mode, keep_strengths=True)
+        fallback = np.isnan(risk_value)
+
+        clipped_inputs = dict(zip(self.input_names, clipped.T))
+        confidence = self._calculate_confidence(clipped_inputs, risk_value)
+
+        if fallback.any():
+            raw_inputs = dict(zip(self.input_names, raw[fallback].T))
+            risk_value[fallback] = self._fallback_scores(raw_inputs)
+            confidence = np.where(fallback, 60.0, confidence)
+
+        return {
+            'risk_value': risk_value,
+            'risk_level': self._crisp_to_risk_levels(risk_value),
+            'confidence': confidence,
+            'fallback': fallback,
+            'rule_strengths': rule_strengths,
+            'inputs': np.where(fallback[:, None], raw, clipped)
+        }
+
+    def applied_rules_batch(self, rule_strengths: np.ndarray) -> List[List[str]]:
+        """
+        Règles activées (degré > 0) de chaque patient, de la plus forte à la
+        plus faible, depuis la matrice rule_strengths d'evaluate_batch().
+        Chaque ordre distinct n'est converti en noms qu'une fois.
+        """
+        rule_strengths = np.atleast_2d(rule_strengths)
+        order = np.argsort(-rule_strengths, axis=1, kind='stable')
+        fired = np.take_along_axis(rule_strengths, order, axis=1) > 0
+        keys = np.ascontiguousarray(np.where(fired, order, -1).astype(np.int16))
+
+        # Une ligne = un scalaire opaque: unique 1-D, bien plus rapide que axis=0
+        rows = keys.view(np.dtype((np.void, keys.itemsize * keys.shape[1]))).reshape(-1)
+        distinct, inverse = np.unique(rows, return_inverse=True)
+        distinct = distinct.view(np.int16).reshape(-1, keys.shape[1])
+        rule_names = self.rule_names
+        names = [[rule_names[r] for r in key if r >= 0] for key in distinct.tolist()]
+        return [names[k][:] for k in inverse.reshape(-1).tolist()]
+
+    def _as_matrix(self, inputs) -> np.ndarray:
+        if isinstance(inputs, dict):
+            return np.column_stack([np.asarray(inputs[name], dtype=float) for name in self.input_names])
+        return np.atleast_2d(np.asarray(inputs, dtype=float))
+
+    def _universe_clip(self, x: np.ndarray) -> np.ndarray:
+        """Entrées ramenées dans l'univers de chaque variable (comme skfuzzy)"""
+        return np.clip(x, self._lower, self._upper)
+
+    def _clip_inputs(self, x: np.ndarray) -> np.ndarray:
+        """Bornes de evaluate_patient (max(0, min(borne, v)), NaN -> borne)"""
+        upper = np.array([100. if name == 'age' else 10. for name in self.input_names])
+        return np.where(np.isnan(x), upper, np.clip(x, 0, upper))
     
-    def evaluate_patient(self, patient: Patient) -> Dict:
-        """Évalue un patient avec le système flou"""
+    def evaluate_patient(self, patient: Patient, mode: str = 'mamdani') -> Dict:
+        """Évalue un patient avec le système flou (mode 'mamdani' ou 'sugeno')"""
         try:
             # Préparer les entrées
             inputs = self._prepare_inputs(patient)
@@ -96,10 +536,6 @@ class FuzzyLungDiseaseSystem:
                 else:
                     inputs[key] = max(0, min(10, float(value)))
             
-            # Vérifier si la simulation existe
-            if not self.simulation:
-                self.setup_fuzzy_system()
-            
             # Afficher les valeurs importantes
             print(f"\n[ENGINE] Patient {patient.id}:")
             print(f"  Age: {inputs['age']}")
@@ -107,20 +543,13 @@ class FuzzyLungDiseaseSystem:
             print(f"  Coughing blood: {inputs['coughing_blood']:.1f} {'(HIGH)' if inputs['coughing_blood'] > 6 else '(MEDIUM)' if inputs['coughing_blood'] > 2 else '(LOW)'}")
             print(f"  Chest pain: {inputs['chest_pain']:.1f} {'(HIGH)' if inputs['chest_pain'] > 6 else '(MEDIUM)' if inputs['chest_pain'] > 2 else '(LOW)'}")
             
-            # Définir les entrées
-            self.simulation.input['smoking'] = inputs['smoking']
-            self.simulation.input['air_pollution'] = inputs['air_pollution']
-            self.simulation.input['coughing_blood'] = inputs['coughing_blood']
-            self.simulation.input['chest_pain'] = inputs['chest_pain']
-            self.simulation.input['shortness_breath'] = inputs['shortness_breath']
-            self.simulation.input['weight_loss'] = inputs['weight_loss']
-            self.simulation.input['age'] = inputs['age']
-            
-            # Exécuter le calcul
-            self.simulation.compute()
+            # Exécuter le calcul (lot d'un seul patient)
+            crisp, strengths = self._infer([[inputs[name] for name in self.input_names]], mode, keep_strengths=True)
+            risk_value = float(crisp[0])
+            if np.isnan(risk_value):
+                raise ValueError("Crisp output cannot be calculated, likely because the system is too sparse.")
             
             # Obtenir le résultat
-            risk_value = float(self.simulation.output['risk_level'])
             risk_category = self._crisp_to_risk_level(risk_value)
             
             # Calculer la confiance
@@ -134,7 +563,8 @@ class FuzzyLungDiseaseSystem:
                 'risk_level': risk_category,
                 'confidence': confidence,
                 'details': inputs,
-                'rules_applied': self._get_applied_rules(inputs),
+                'rules_applied': self.applied_rules_batch(strengths)[0],
+                'rule_strengths': strengths[0],
                 'fallback': False
             }
             
@@ -145,19 +575,9 @@ class FuzzyLungDiseaseSystem:
     
     def _prepare_inputs(self, patient: Patient) -> Dict[str, float]:
         """Prépare les entrées depuis le patient"""
-        # MAPPING CORRIGÉ - correspond aux noms de colonnes CSV
-        symptom_mapping = {
-            'smoking': 'Smoking',
-            'air_pollution': 'Air Pollution',
-            'coughing_blood': 'Coughing of Blood',
-            'chest_pain': 'Chest Pain',
-            'shortness_breath': 'Shortness of Breath',
-            'weight_loss': 'Weight Loss'
-        }
-        
         inputs = {'age': float(patient.age)}
         
-        for fuzzy_name, symptom_name in symptom_mapping.items():
+        for fuzzy_name, symptom_name in self.symptom_mapping.items():
             value = 0.0
             for symptom in patient.symptoms:
                 # Recherche exacte du nom du symptôme
@@ -168,77 +588,46 @@ class FuzzyLungDiseaseSystem:
         
         return inputs
     
-    def _calculate_confidence(self, inputs: Dict, risk_value: float) -> float:
-        """Calcule la confiance de la prédiction"""
+    def _calculate_confidence(self, inputs: Dict, risk_value):
+        """Calcule la confiance de la prédiction (valeurs seules ou tableaux)"""
         confidence = 70.0
         
         # Facteurs de cohérence - PLUS SENSIBLE
-        high_indicators = sum(1 for k in ['smoking', 'coughing_blood', 'chest_pain'] 
-                             if inputs.get(k, 0) > 6)  # Seuil abaissé à 6
+        high_indicators = sum((np.asarray(inputs.get(k, 0)) > 6).astype(int)
+                              for k in ['smoking', 'coughing_blood', 'chest_pain'])  # Seuil abaissé à 6
         
-        if high_indicators >= 2:
-            confidence += 25
-        elif high_indicators == 1:
-            confidence += 15
+        confidence += np.where(high_indicators >= 2, 25, np.where(high_indicators == 1, 15, 0))
         
         # Cohérence âge-risque
-        age = inputs.get('age', 45)
-        if age > 60 and risk_value < 5:
-            confidence -= 10
-        elif age < 30 and risk_value > 7:
-            confidence -= 5
+        age = np.asarray(inputs.get('age', 45))
+        confidence -= np.where((age > 60) & (risk_value < 5), 10,
+                               np.where((age < 30) & (risk_value > 7), 5, 0))
         
-        return max(50, min(95, confidence))
+        confidence = np.clip(confidence, 50, 95)
+        return float(confidence) if confidence.ndim == 0 else confidence
     
-    def _get_applied_rules(self, inputs: Dict) -> List[str]:
-        """Détecte quelles règles pourraient s'appliquer"""
-        applied = []
-        
-        # Règles HIGH
-        if inputs.get('coughing_blood', 0) > 6:
-            applied.append("Coughing blood (HIGH)")
-        elif inputs.get('coughing_blood', 0) > 3:
-            applied.append("Coughing blood (MEDIUM)")
-        
-        if inputs.get('smoking', 0) > 6:
-            applied.append("Smoking (HIGH)")
-        elif inputs.get('smoking', 0) > 3:
-            applied.append("Smoking (MEDIUM)")
-        
-        if inputs.get('chest_pain', 0) > 6:
-            applied.append("Chest pain (HIGH)")
+    def _fallback_scores(self, inputs: Dict):
+        """Scoring simple avec pondérations réalistes (valeurs seules ou tableaux)"""
+        score = 0
+        score += np.asarray(inputs.get('smoking', 0)) * 0.3  # Augmenté
+        score += np.asarray(inputs.get('air_pollution', 0)) * 0.15
+        score += np.asarray(inputs.get('coughing_blood', 0)) * 0.25  # Augmenté
+        score += np.asarray(inputs.get('chest_pain', 0)) * 0.15
+        score += np.asarray(inputs.get('shortness_breath', 0)) * 0.10
+        score += np.asarray(inputs.get('weight_loss', 0)) * 0.05
         
-        if inputs.get('age', 0) > 50:
-            applied.append("Senior age")
-        elif inputs.get('age', 0) < 30:
-            applied.append("Young age")
+        # Ajustement par âge
+        age = np.asarray(inputs.get('age', 45))
+        score = score * np.where(age > 60, 1.3, np.where(age > 45, 1.1, np.where(age < 30, 0.8, 1.0)))
         
-        return applied[:3]
+        # Normaliser à 10 (min(10, NaN) vaut 10)
+        return np.where(np.isnan(score), 10, np.minimum(10, score))
     
     def _fallback_evaluation(self, patient: Patient) -> Dict:
         """Évaluation de secours basée sur un scoring simple"""
         inputs = self._prepare_inputs(patient)
         
-        # Scoring simple avec pondérations réalistes
-        score = 0
-        score += inputs.get('smoking', 0) * 0.3  # Augmenté
-        score += inputs.get('air_pollution', 0) * 0.15
-        score += inputs.get('coughing_blood', 0) * 0.25  # Augmenté
-        score += inputs.get('chest_pain', 0) * 0.15
-        score += inputs.get('shortness_breath', 0) * 0.10
-        score += inputs.get('weight_loss', 0) * 0.05
-        
-        # Ajustement par âge
-        age = inputs.get('age', 45)
-        if age > 60:
-            score *= 1.3  # Augmenté
-        elif age > 45:
-            score *= 1.1
-        elif age < 30:
-            score *= 0.8
-        
-        # Normaliser à 10
-        risk_value = min(10, score)
+        risk_value = float(self._fallback_scores(inputs))
         risk_category = self._crisp_to_risk_level(risk_value)
         
         return {
@@ -248,15 +637,23 @@ class FuzzyLungDiseaseSystem:
             'confidence': 60.0,
             'details': inputs,
             'rules_applied': ["Fallback scoring system"],
+            'rule_strengths': np.zeros(len(self.rule_names), dtype=np.float32),
             'fallback': True
         }
     
     def _crisp_to_risk_level(self, risk_value: float) -> RiskLevel:
         """Convertit une valeur numérique en niveau de risque"""
-        # Seuils ajustés pour être plus sensibles
-        if risk_value < 3:  # Low: 0-3.0
+        # Seuils ajustés pour être plus sensibles (RISK_THRESHOLDS par défaut)
+        low_cut, high_cut = self.parameters.risk_thresholds
+        if risk_value < low_cut:  # Low: 0-3.0
             return RiskLevel.LOW
-        elif risk_value < 6:  # Medium: 3.0-6.5
+        elif risk_value < high_cut:  # Medium: 3.0-6.5
             return RiskLevel.MEDIUM
         else:  # High: 6.5-10
-            return RiskLevel.HIGH
\ No newline at end of file
+            return RiskLevel.HIGH
+    
+    def _crisp_to_risk_levels(self, risk_values: np.ndarray) -> np.ndarray:
+        """_crisp_to_risk_level sur un tableau (tableau d'objets RiskLevel)"""
+        levels = np.array([RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH], dtype=object)
+        low_cut, high_cut = self.parameters.risk_thresholds
+        return levels[np.where(risk_values < low_cut, 0, np.where(risk_values < high_cut, 1, 2))]
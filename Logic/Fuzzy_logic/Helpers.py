@@ -1,28 +1,29 @@
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict
 from .Engine import FuzzyLungDiseaseSystem
+from .Hierarchical import HierarchicalFuzzySystem
 from Knowledge.Hierarchy import RiskLevel
 
 from Knowledge.Hierarchy import Patient, Symptom
 
-def create_patient_from_csv_row(row):
-    """Crée un objet Patient à partir d'une ligne CSV"""
+def create_patient_from_csv_row(row, symptom_mapping: Dict[str, str] = None):
+    """
+    Crée un objet Patient à partir d'une ligne CSV. symptom_mapping:
+    entrée -> colonne CSV du système qui évaluera le patient (par défaut
+    celui du système plat); chaque colonne devient un symptôme du même nom.
+    """
     patient_id = str(row.get('Patient Id', row.get('index', 'Unknown')))
     age = int(row.get('Age', 50))
     
     # Créer le patient
     patient = Patient(id=patient_id, age=age, gender="unknown", symptoms=[])
     
-    # Ajouter seulement les 7 symptômes utilisés par le moteur flou
+    # Ajouter seulement les symptômes utilisés par le moteur flou
     # Noms exacts des colonnes CSV
-    important_symptoms = [
-        ('Smoking', 'Smoking'),
-        ('Air Pollution', 'Air Pollution'),
-        ('Coughing of Blood', 'Coughing of Blood'),
-        ('Chest Pain', 'Chest Pain'),
-        ('Shortness of Breath', 'Shortness of Breath'),
-        ('Weight Loss', 'Weight Loss')
-    ]
+    symptom_mapping = symptom_mapping or FuzzyLungDiseaseSystem.symptom_mapping
+    important_symptoms = [(csv_col, csv_col) for csv_col in symptom_mapping.values()]
     
     for csv_col, symptom_name in important_symptoms:
         if csv_col in row:
@@ -46,9 +47,99 @@ def create_patient_from_csv_row(row):
         print(f"  {symptom.name}: {symptom.severity:.2f} (original: {row.get(symptom.name, 'N/A')})")
     
     return patient
-def analyze_dataset_with_fuzzy(df: pd.DataFrame, verbose: bool = True) -> List[Dict]:
-    """Analyse le dataset avec la logique floue"""
-    fuzzy_system = FuzzyLungDiseaseSystem()
+
+
+# Colonnes CSV des entrées du moteur flou (l'âge est traité à part)
+CSV_INPUTS = {
+    'smoking': 'Smoking',
+    'air_pollution': 'Air Pollution',
+    'coughing_blood': 'Coughing of Blood',
+    'chest_pain': 'Chest Pain',
+    'shortness_breath': 'Shortness of Breath',
+    'weight_loss': 'Weight Loss'
+}
+
+
+def _column_values(column, convert) -> np.ndarray:
+    """Conversion d'une colonne entière, élément par élément seulement si elle n'est pas numérique"""
+    values = column.to_numpy()
+    if values.dtype.kind in "iufb":
+        if convert is int and not np.isfinite(values.astype(float)).all():
+            raise ValueError("cannot convert float NaN to integer")
+        return values.astype(float if convert is float else np.int64)
+    return np.array([convert(v) for v in values], dtype=float if convert is float else np.int64)
+
+
+def prepare_inputs_from_dataframe(df: pd.DataFrame, columns: Dict[str, str] = CSV_INPUTS) -> Dict[str, np.ndarray]:
+    """
+    Entrées du moteur flou pour tout le DataFrame, identiques à
+    _prepare_inputs(create_patient_from_csv_row(row)) ligne par ligne.
+    columns: entrée -> colonne CSV (symptom_mapping du système utilisé).
+    """
+    n = len(df)
+    ages = _column_values(df['Age'], int) if 'Age' in df.columns else np.full(n, 50, dtype=np.int64)
+    inputs = {'age': ages.astype(float)}
+
+    for name, csv_col in columns.items():
+        if csv_col not in df.columns:
+            inputs[name] = np.zeros(n)
+            continue
+        # Conversion de l'échelle 1-9 à 0-10, valeurs hors plage gardées telles quelles
+        values = _column_values(df[csv_col], float)
+        inputs[name] = np.where((values >= 1) & (values <= 9), (values - 1) * (10.0 / 8.0), values)
+
+    return inputs
+
+
+# ==================== ÉVALUATION PARALLÈLE ====================
+
+_WORKER_SYSTEM = None
+
+
+def _init_worker(snapshot, parameters, defuzzification, sugeno, surface):
+    """Moteur du processus, reconstruit depuis le snapshot (sans skfuzzy), surface partagée"""
+    global _WORKER_SYSTEM
+    _WORKER_SYSTEM = FuzzyLungDiseaseSystem(defuzzification, snapshot=snapshot, parameters=parameters,
+                                            surface=surface)
+    _WORKER_SYSTEM.sugeno = sugeno
+
+
+def _init_hierarchical_worker(parameters, defuzzification, compact):
+    global _WORKER_SYSTEM
+    _WORKER_SYSTEM = HierarchicalFuzzySystem(defuzzification, parameters=parameters, compact=compact)
+
+
+def _evaluate_in_worker(args) -> Dict:
+    block, mode = args
+    return _WORKER_SYSTEM.evaluate_batch(block, mode)
+
+
+def evaluate_batch_parallel(fuzzy_system: FuzzyLungDiseaseSystem, inputs, n_jobs: int = 2,
+                            mode: str = 'mamdani') -> Dict:
+    """evaluate_batch() réparti sur n_jobs processus, mêmes résultats"""
+    x = fuzzy_system._as_matrix(inputs)
+    if n_jobs <= 1 or len(x) < n_jobs:
+        return fuzzy_system.evaluate_batch(x, mode)
+
+    if isinstance(fuzzy_system, HierarchicalFuzzySystem):
+        initializer = _init_hierarchical_worker
+        initargs = (fuzzy_system.parameters, fuzzy_system.defuzzification, fuzzy_system.compact)
+    else:
+        initializer = _init_worker
+        initargs = (fuzzy_system.snapshot, fuzzy_system.parameters, fuzzy_system.defuzzification,
+                    fuzzy_system.sugeno, fuzzy_system.surface)
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=initargs) as pool:
+        parts = list(pool.map(_evaluate_in_worker, [(block, mode) for block in np.array_split(x, n_jobs)]))
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+def analyze_dataset_with_fuzzy(df: pd.DataFrame, verbose: bool = True, n_jobs: int = 1,
+                               hierarchical: bool = False) -> List[Dict]:
+    """
+    Analyse le dataset avec la logique floue (n_jobs processus pour
+    l'inférence). hierarchical: système en cascade sur les 15 symptômes.
+    """
+    fuzzy_system = HierarchicalFuzzySystem() if hierarchical else FuzzyLungDiseaseSystem()
     results = []
     
     if verbose:
@@ -57,51 +148,62 @@ def analyze_dataset_with_fuzzy(df: pd.DataFrame, verbose: bool = True) -> List[D
         print("=" * 70)
         print("\nAnalyzing patients...")
     
-    fallback_count = 0
+    # Tous les patients en un seul passage vectorisé
+    inputs = prepare_inputs_from_dataframe(df, fuzzy_system.symptom_mapping)
+    evaluation = evaluate_batch_parallel(fuzzy_system, inputs, n_jobs)
+    fallback = evaluation['fallback']
+    fallback_count = int(fallback.sum())
     
-    for idx, row in df.iterrows():
-        patient = create_patient_from_csv_row(row)
-        evaluation = fuzzy_system.evaluate_patient(patient)
-        
-        # Compter les fallbacks
-        if evaluation.get('fallback', False):
-            fallback_count += 1
-        
-        # Récupérer le risque réel
-        try:
-            actual_risk_str = str(row['Level']).strip().capitalize()
-            actual_risk = RiskLevel(actual_risk_str) if actual_risk_str in ['Low','Medium','High'] else None
-        except:
-            actual_risk = None
+    details = evaluation['inputs']
+    rule_strengths = evaluation['rule_strengths']
+    rules_applied = fuzzy_system.applied_rules_batch(rule_strengths)
+    
+    if 'Patient Id' in df.columns:
+        ids = df['Patient Id']
+    elif 'index' in df.columns:
+        ids = df['index']
+    else:
+        ids = ['Unknown'] * len(df)
+    ages = inputs['age'].astype(np.int64)
+    
+    # Récupérer le risque réel
+    if 'Level' in df.columns:
+        levels = [str(level).strip().capitalize() for level in df['Level']]
+    else:
+        levels = [None] * len(df)
+    
+    for i, (idx, patient_id) in enumerate(zip(df.index, ids)):
+        actual_risk = RiskLevel(levels[i]) if levels[i] in ['Low', 'Medium', 'High'] else None
         
-        predicted_risk = evaluation['risk_level']
+        predicted_risk = evaluation['risk_level'][i]
         correct = (predicted_risk == actual_risk) if actual_risk else False
         
         result = {
-            'patient_id': patient.id,
-            'age': patient.age,
+            'patient_id': str(patient_id),
+            'age': int(ages[i]),
             'predicted_risk': predicted_risk,
             'actual_risk': actual_risk,
             'correct': correct,
-            'risk_value': evaluation['risk_value'],
-            'confidence': evaluation['confidence'],
-            'fallback': evaluation.get('fallback', False),
-            'rules_applied': evaluation.get('rules_applied', [])
+            'risk_value': float(evaluation['risk_value'][i]),
+            'confidence': float(evaluation['confidence'][i]),
+            'fallback': bool(fallback[i]),
+            'rules_applied': ["Fallback scoring system"] if fallback[i] else rules_applied[i],
+            'rule_strengths': rule_strengths[i]
         }
         
         results.append(result)
         
         if verbose and idx < 3:
-            print(f"\nPatient {patient.id}:")
-            print(f"  Age: {patient.age}")
-            print(f"  Smoking: {evaluation['details'].get('smoking', 0):.1f}")
-            print(f"  Coughing blood: {evaluation['details'].get('coughing_blood', 0):.1f}")
-            print(f"  Predicted: {predicted_risk.value} ({evaluation['risk_value']:.2f}/10)")
-            print(f"  Confidence: {evaluation['confidence']:.1f}%")
+            print(f"\nPatient {result['patient_id']}:")
+            print(f"  Age: {result['age']}")
+            print(f"  Smoking: {details[i, fuzzy_system.input_names.index('smoking')]:.1f}")
+            print(f"  Coughing blood: {details[i, fuzzy_system.input_names.index('coughing_blood')]:.1f}")
+            print(f"  Predicted: {predicted_risk.value} ({result['risk_value']:.2f}/10)")
+            print(f"  Confidence: {result['confidence']:.1f}%")
             if actual_risk:
                 print(f"  Actual: {actual_risk.value}")
                 print(f"  Correct: {'✓' if correct else '✗'}")
-            if evaluation.get('fallback', False):
+            if result['fallback']:
                 print(f"  ⚠️  Fallback system used")
     
     if verbose:
@@ -0,0 +1,210 @@
+import numpy as np
+from typing import Dict, List
+from .Engine import (AGE_UNIVERSE, BATCH_BLOCK, INPUT_NAMES, RISK_SETS, RISK_UNIVERSE, SYMPTOM_SETS,
+                     SYMPTOM_UNIVERSE, FuzzyLungDiseaseSystem, FuzzyParameters, MamdaniInference)
+from .Defuzzify import METHODS
+from .Snapshot import load_snapshot
+
+
+# Symptômes ajoutés aux 7 entrées du système plat (les 15 de l'interface)
+EXTRA_SYMPTOMS = {
+    'alcohol_use': 'Alcohol use',
+    'dust_allergy': 'Dust Allergy',
+    'occupational_hazards': 'OccuPational Hazards',
+    'fatigue': 'Fatigue',
+    'wheezing': 'Wheezing',
+    'swallowing_difficulty': 'Swallowing Difficulty',
+    'frequent_cold': 'Frequent Cold',
+    'dry_cough': 'Dry Cough',
+    'snoring': 'Snoring',
+}
+
+HIERARCHY_INPUTS = INPUT_NAMES + list(EXTRA_SYMPTOMS)
+
+# ==================== SOUS-SYSTÈMES ====================
+# Entrée -> {terme: terme de sortie}. Une règle par paire, plus une règle
+# "tout bas" par sous-système: le nombre de règles croît linéairement avec
+# les entrées. Chaque entrée conclut sur tous ses termes sauf 'low' (ou
+# 'young'), la règle "tout bas" couvre le reste: une règle s'active toujours.
+STAGES = {
+    'exposure': {
+        'smoking': {'medium': 'medium', 'high': 'high'},
+        'air_pollution': {'medium': 'medium', 'high': 'high'},
+        'occupational_hazards': {'medium': 'low', 'high': 'medium'},
+        'alcohol_use': {'medium': 'low', 'high': 'medium'},
+        'dust_allergy': {'medium': 'low', 'high': 'medium'},
+    },
+    'respiratory': {
+        'coughing_blood': {'medium': 'medium', 'high': 'high'},
+        'chest_pain': {'medium': 'medium', 'high': 'high'},
+        'shortness_breath': {'medium': 'medium', 'high': 'high'},
+        'swallowing_difficulty': {'medium': 'medium', 'high': 'high'},
+        'wheezing': {'medium': 'low', 'high': 'medium'},
+        'dry_cough': {'medium': 'low', 'high': 'medium'},
+        'frequent_cold': {'medium': 'low', 'high': 'medium'},
+        'snoring': {'medium': 'low', 'high': 'medium'},
+    },
+    'systemic': {
+        'weight_loss': {'medium': 'medium', 'high': 'high'},
+        'fatigue': {'medium': 'low', 'high': 'medium'},
+        'age': {'middle': 'low', 'senior': 'medium'},
+    },
+}
+
+# Scores intermédiaires (sortie défuzzifiée des sous-systèmes, 0-10)
+SCORE_SETS = SYMPTOM_SETS
+
+# Système final: mêmes principes que les règles du système plat
+TOP_RULES = [
+    # Règles HIGH
+    ([('respiratory', 'high')], 'high'),
+    ([('exposure', 'high'), ('respiratory', 'medium')], 'high'),
+    ([('exposure', 'high'), ('systemic', 'high')], 'high'),
+
+    # Règles MEDIUM
+    ([('respiratory', 'medium')], 'medium'),
+    ([('exposure', 'high')], 'medium'),
+    ([('systemic', 'high')], 'medium'),
+    ([('exposure', 'medium'), ('systemic', 'medium')], 'medium'),
+
+    # Règles LOW
+    ([('respiratory', 'low'), ('exposure', 'low')], 'low'),
+    ([('respiratory', 'low'), ('systemic', 'low')], 'low'),
+]
+
+
+def stage_rules(spec: Dict) -> List:
+    """Règles d'un sous-système depuis sa table entrée -> {terme: sortie}"""
+    rules = [([(name, term)], output) for name, terms in spec.items() for term, output in terms.items()]
+    rules.append(([(name, 'young' if name == 'age' else 'low') for name in spec], 'low'))
+    return rules
+
+
+def build_hierarchy(parameters: FuzzyParameters = None) -> Dict[str, Dict]:
+    """Définition (comme Engine.build_definition) de chaque sous-système, puis du système final 'risk'"""
+    parameters = parameters or FuzzyParameters()
+    definitions = {}
+    for stage, spec in STAGES.items():
+        definitions[stage] = {
+            'inputs': {
+                name: (AGE_UNIVERSE, parameters.age_sets) if name == 'age'
+                else (SYMPTOM_UNIVERSE, parameters.symptom_sets)
+                for name in spec
+            },
+            'output': [RISK_UNIVERSE, RISK_SETS],
+            'rules': stage_rules(spec),
+        }
+    definitions['risk'] = {
+        'inputs': {stage: (SYMPTOM_UNIVERSE, SCORE_SETS) for stage in STAGES},
+        'output': [RISK_UNIVERSE, RISK_SETS],
+        'rules': TOP_RULES,
+    }
+    return definitions
+
+
+class FuzzyStage(MamdaniInference):
+    """Un niveau de la hiérarchie: sous-système Mamdani sur quelques colonnes"""
+
+    def __init__(self, name: str, definition: Dict, columns: List[int], defuzzification: str = 'sampled',
+                 compact: bool = True):
+        self.name = name
+        self.columns = np.array(columns)
+        self.defuzzification = defuzzification
+        self.compact = compact
+        self.snapshot = load_snapshot(definition)
+        self._compile_mamdani()
+
+    @property
+    def rule_names(self) -> List[str]:
+        return [f"{self.name}: {rule}" for rule in self.snapshot.rule_names]
+
+    def infer(self, x: np.ndarray, keep_strengths: bool = False):
+        """Sortie nette (N,) de x (N, toutes les entrées), et les activations si demandées"""
+        x = x[:, self.columns]
+        if not keep_strengths:
+            return self._defuzzify(self._mamdani_cuts(x)), None
+        strengths = self._rule_strengths(self._memberships(x))
+        return self._defuzzify(self._output_cuts(strengths)), strengths
+
+
+class HierarchicalFuzzySystem(FuzzyLungDiseaseSystem):
+    """
+    Système flou en cascade: les sous-systèmes exposure, respiratory et
+    systemic réduisent chacun leur groupe d'entrées à un score 0-10, puis
+    un petit système final combine les trois scores. Utilise les 15
+    symptômes et l'âge avec quelques dizaines de règles au lieu des 3^16
+    combinaisons d'une base plate. evaluate_patient() et evaluate_batch()
+    rendent le même format que le système plat (pas les mêmes valeurs);
+    rule_strengths contient les règles de tous les niveaux (noms préfixés
+    par le niveau). Mode mamdani seulement: pas de conséquents Sugeno
+    (sugeno vaut None) ni de ControlSystem skfuzzy.
+    """
+    input_names = HIERARCHY_INPUTS
+    symptom_mapping = {**FuzzyLungDiseaseSystem.symptom_mapping, **EXTRA_SYMPTOMS}
+
+    def __init__(self, defuzzification: str = 'sampled', parameters=None, compact: bool = True):
+        """
+        parameters: FuzzyParameters, dict ou chemin; ensembles des symptômes
+        et de l'âge partagés par les sous-systèmes, seuils du niveau de risque.
+        Par défaut les valeurs d'origine (les paramètres réglés le sont pour
+        le système plat).
+        """
+        if defuzzification != 'sampled' and defuzzification not in METHODS:
+            raise ValueError(f"Défuzzification inconnue: {defuzzification}")
+        if isinstance(parameters, dict):
+            parameters = FuzzyParameters.from_dict(parameters)
+        elif isinstance(parameters, str):
+            parameters = FuzzyParameters.load(parameters)
+        self.defuzzification = defuzzification
+        self.parameters = parameters or FuzzyParameters()
+        self.compact = compact
+        self.sugeno = None
+        self.surface = None
+        self._system = None
+        self._simulation = None
+
+        definitions = build_hierarchy(self.parameters)
+        self.stages = [
+            FuzzyStage(stage, definitions[stage], [self.input_names.index(name) for name in spec],
+                       defuzzification, compact)
+            for stage, spec in STAGES.items()
+        ]
+        self.top = FuzzyStage('risk', definitions['risk'], list(range(len(self.stages))), defuzzification, compact)
+
+        self._lower = np.array([0.] * len(self.input_names))
+        self._upper = np.array([AGE_UNIVERSE[1] - 1. if name == 'age' else SYMPTOM_UNIVERSE[1] - 1.
+                                for name in self.input_names])
+        self._rule_counts = [len(stage.snapshot.rule_names) for stage in self.stages + [self.top]]
+
+    @property
+    def rule_names(self) -> List[str]:
+        return [rule for stage in self.stages + [self.top] for rule in stage.rule_names]
+
+    def setup_fuzzy_system(self):
+        raise ValueError("Pas de ControlSystem skfuzzy pour le système hiérarchique")
+
+    def scores_batch(self, x) -> Dict[str, np.ndarray]:
+        """Score intermédiaire de chaque sous-système pour N patients"""
+        x = self._universe_clip(self._as_matrix(x))
+        return {stage.name: stage.infer(x)[0] for stage in self.stages}
+
+    def _infer(self, x, mode: str = 'mamdani', consequents=None, keep_strengths: bool = False):
+        """Cascade par bloc: sous-systèmes, puis système final sur leurs scores"""
+        if mode != 'mamdani':
+            raise ValueError(f"Mode indisponible pour le système hiérarchique: {mode} (attendu: mamdani)")
+        x = self._as_matrix(x)
+        crisp = np.empty(len(x))
+        kept = np.empty((len(x), sum(self._rule_counts)), dtype=np.float32) if keep_strengths else None
+        bounds = np.cumsum([0] + self._rule_counts)
+        for start in range(0, len(x), BATCH_BLOCK):
+            block = self._universe_clip(x[start:start + BATCH_BLOCK])
+            rows = slice(start, start + BATCH_BLOCK)
+            scores = np.empty((len(block), len(self.stages)))
+            for k, stage in enumerate(self.stages):
+                scores[:, k], strengths = stage.infer(block, keep_strengths)
+                if keep_strengths:
+                    kept[rows, bounds[k]:bounds[k + 1]] = strengths
+            crisp[rows], strengths = self.top.infer(scores, keep_strengths)
+            if keep_strengths:
+                kept[rows, bounds[-2]:] = strengths
+        return crisp, kept
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+# Version du format: changer invalide tous les fichiers de cache existants
+SNAPSHOT_VERSION = 1
+
+# Répertoire de cache par défaut (ignoré par git)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+
+
+def definition_key(definition: Dict) -> str:
+    """Empreinte sha256 de la définition (variables, ensembles, règles)"""
+    canonical = json.dumps({'version': SNAPSHOT_VERSION, **definition}, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def rule_name(antecedent, output: str) -> str:
+    """Nom lisible d'une règle: 'smoking[high] & age[senior] -> high'"""
+    return ' & '.join(f"{name}[{label}]" for name, label in antecedent) + f" -> {output}"
+
+
+@dataclass
+class FuzzySnapshot:
+    """
+    Système flou compilé en tableaux simples, sans objets skfuzzy.
+
+    Les termes d'entrée sont numérotés (term_inputs: colonne de l'entrée,
+    term_mfs: fonction d'appartenance sur son univers). Chaque règle est
+    une ligne de rule_terms (conjonction d'indices de termes, complétée par
+    l'indice len(term_mfs), colonne constante à 1) et conclut le terme de
+    sortie rule_outputs avec le poids rule_weights.
+    """
+    key: str
+    definition: Dict
+    input_names: List[str]
+    universes: List[np.ndarray]
+    term_names: List[str]
+    term_inputs: np.ndarray
+    term_mfs: List[np.ndarray]
+    rule_names: List[str]
+    rule_terms: np.ndarray
+    rule_outputs: np.ndarray
+    rule_weights: np.ndarray
+    output_labels: List[str]
+    output_universe: np.ndarray
+    output_mfs: np.ndarray
+
+    @classmethod
+    def compile(cls, definition: Dict) -> "FuzzySnapshot":
+        """Compile la définition (fonctions d'appartenance calculées par skfuzzy)"""
+        import skfuzzy as fuzz
+
+        input_names = list(definition['inputs'])
+        universes, term_names, term_inputs, term_mfs = [], [], [], []
+        index = {}
+        for column, name in enumerate(input_names):
+            universe_range, sets = definition['inputs'][name]
+            universe = np.arange(*universe_range)
+            universes.append(universe.astype(float))
+            for label, (kind, params) in sets.items():
+                index[(name, label)] = len(term_names)
+                term_names.append(f"{name}[{label}]")
+                term_inputs.append(column)
+                term_mfs.append(getattr(fuzz, kind)(universe, params).astype(float))
+
+        output_range, output_sets = definition['output']
+        output_universe = np.arange(*output_range)
+        rules = definition['rules']
+
+        # Termes de sortie réellement utilisés par au moins une règle
+        used = {output for _, output in rules}
+        output_labels = [label for label in output_sets if label in used]
+
+        width = max(len(antecedent) for antecedent, _ in rules)
+        rule_terms = np.full((len(rules), width), len(term_names), dtype=np.int32)
+        for r, (antecedent, _) in enumerate(rules):
+            for k, (name, label) in enumerate(antecedent):
+                if (name, label) not in index:
+                    raise ValueError(f"Terme inconnu dans la règle {r}: {name}[{label}]")
+                rule_terms[r, k] = index[(name, label)]
+
+        return cls(
+            key=definition_key(definition),
+            definition=definition,
+            input_names=input_names,
+            universes=universes,
+            term_names=term_names,
+            term_inputs=np.array(term_inputs, dtype=np.int32),
+            term_mfs=term_mfs,
+            rule_names=[rule_name(antecedent, output) for antecedent, output in rules],
+            rule_terms=rule_terms,
+            rule_outputs=np.array([output_labels.index(output) for _, output in rules], dtype=np.int32),
+            rule_weights=np.ones(len(rules)),
+            output_labels=output_labels,
+            output_universe=output_universe.astype(float),
+            output_mfs=np.array([
+                getattr(fuzz, output_sets[label][0])(output_universe, output_sets[label][1])
+                for label in output_labels
+            ], dtype=float),
+        )
+
+    # ==================== Fichier ====================
+
+    def save(self, path: str):
+        """Écrit le snapshot (.npz) de façon atomique"""
+        meta = {
+            'key': self.key, 'definition': self.definition, 'input_names': self.input_names,
+            'term_names': self.term_names, 'rule_names': self.rule_names,
+            'output_labels': self.output_labels,
+        }
+        # Tableaux de longueurs variables mis bout à bout (peu d'entrées dans l'archive)
+        arrays = {
+            'universes': np.concatenate(self.universes),
+            'universe_ends': np.cumsum([len(universe) for universe in self.universes]),
+            'mfs': np.concatenate(self.term_mfs),
+            'mf_ends': np.cumsum([len(mf) for mf in self.term_mfs]),
+        }
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix='.npz', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f, meta=np.array(json.dumps(meta)), term_inputs=self.term_inputs,
+                    rule_terms=self.rule_terms, rule_outputs=self.rule_outputs,
+                    rule_weights=self.rule_weights, output_universe=self.output_universe,
+                    output_mfs=self.output_mfs, **arrays
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "FuzzySnapshot":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(
+                key=meta['key'],
+                definition=meta['definition'],
+                input_names=meta['input_names'],
+                universes=np.split(data['universes'], data['universe_ends'][:-1]),
+                term_names=meta['term_names'],
+                term_inputs=data['term_inputs'],
+                term_mfs=np.split(data['mfs'], data['mf_ends'][:-1]),
+                rule_names=meta['rule_names'],
+                rule_terms=data['rule_terms'],
+                rule_outputs=data['rule_outputs'],
+                rule_weights=data['rule_weights'],
+                output_labels=meta['output_labels'],
+                output_universe=data['output_universe'],
+                output_mfs=data['output_mfs'],
+            )
+
+
+def snapshot_path(definition: Dict, cache_dir: str = None) -> str:
+    key = definition_key(definition)
+    return os.path.join(cache_dir or CACHE_DIR, f"fuzzy_snapshot_{key[:16]}.npz")
+
+
+def load_snapshot(definition: Dict, cache_dir: str = None, cache: bool = True) -> FuzzySnapshot:
+    """
+    Snapshot de la définition depuis le cache, compilé et mis en cache s'il
+    est absent, illisible ou d'une autre définition. Un cache non
+    inscriptible n'empêche pas la compilation. cache=False: compilé sans
+    être écrit (définitions jetables, ex. candidats du réglage).
+    """
+    path = snapshot_path(definition, cache_dir)
+    key = definition_key(definition)
+    try:
+        snapshot = FuzzySnapshot.load(path)
+        if snapshot.key == key:
+            return snapshot
+    except (OSError, ValueError, KeyError):
+        pass
+
+    snapshot = FuzzySnapshot.compile(definition)
+    if not cache:
+        return snapshot
+    try:
+        snapshot.save(path)
+    except OSError:
+        pass
+    return snapshot
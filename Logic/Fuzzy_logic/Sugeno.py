@@ -0,0 +1,131 @@
+import json
+import numpy as np
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Tuple
+
+
+# Ordres de conséquents Sugeno: 0 = constante, 1 = linéaire en les entrées
+ORDERS = (0, 1)
+
+# Points par entrée de la grille de référence (7 entrées: 6^7 = 279 936 points)
+GRID_LEVELS = 6
+
+
+@dataclass
+class SugenoConsequents:
+    """
+    Conséquents Takagi-Sugeno par terme de sortie (low / medium / high).
+    Ordre 0: [c0], ordre 1: [c0, c_smoking, ..., c_age] dans l'ordre INPUT_NAMES.
+    """
+    order: int = 0
+    coefficients: Dict[str, List[float]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.order not in ORDERS:
+            raise ValueError(f"Ordre Sugeno inconnu: {self.order}")
+
+    def values(self, x: np.ndarray) -> Dict[str, np.ndarray]:
+        """Sortie de chaque terme pour les entrées x (N, 7)"""
+        result = {}
+        for label, c in self.coefficients.items():
+            if self.order == 0:
+                result[label] = np.full(len(x), c[0])
+            else:
+                result[label] = c[0] + x @ np.asarray(c[1:])
+        return result
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SugenoConsequents":
+        return cls(**data)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "SugenoConsequents":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def default_consequents(system) -> SugenoConsequents:
+    """Constante de chaque terme = centroïde exact de son ensemble de sortie Mamdani"""
+    sets = system._output_sets
+    coefficients = {}
+    for label, (xs, ys) in zip(sets.labels, sets.shapes):
+        points = np.concatenate([[sets.domain[0]], xs, [sets.domain[1]]])
+        values = np.interp(points, xs, ys)
+        centroid = sets.centroid(points[None, :], values[None, :])[0]
+        coefficients[label] = [float(centroid)]
+    return SugenoConsequents(order=0, coefficients=coefficients)
+
+
+def reference_grid(system, levels: int = GRID_LEVELS) -> np.ndarray:
+    """Grille régulière (levels^7, 7) couvrant l'univers de chaque entrée"""
+    axes = [np.linspace(lower, upper, levels) for lower, upper in zip(system._lower, system._upper)]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+
+
+def _design(system, x: np.ndarray, order: int) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Matrice des poids normalisés par terme (colonnes par terme, puis par
+    coefficient en ordre 1) et masque des points où une règle s'active.
+    """
+    x = system._universe_clip(x)
+    weights, total = system._sugeno_weights(system._rule_strengths(system._memberships(x)))
+    active = total > 0
+    labels = [label for label, _ in system._output_terms]
+
+    normalized = weights[active] / total[active, None]
+    if order == 0:
+        return normalized, active, labels
+
+    regressors = np.column_stack([np.ones(active.sum()), x[active]])
+    design = (normalized[:, :, None] * regressors[:, None, :]).reshape(active.sum(), -1)
+    return design, active, labels
+
+
+def fit_sugeno(system, order: int = 0, grid: np.ndarray = None, levels: int = GRID_LEVELS) -> Tuple[SugenoConsequents, Dict]:
+    """
+    Ajuste les conséquents Sugeno (moindres carrés) pour reproduire la
+    sortie Mamdani de system sur une grille de référence.
+    Retourne les conséquents et un rapport d'erreur sur cette grille.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Ordre Sugeno inconnu: {order}")
+
+    x = reference_grid(system, levels) if grid is None else np.asarray(grid, dtype=float)
+    target = system.compute_batch(x, mode="mamdani")
+
+    design, active, labels = _design(system, x, order)
+    valid = ~np.isnan(target[active])
+    solution, *_ = np.linalg.lstsq(design[valid], target[active][valid], rcond=None)
+
+    per_term = solution.reshape(len(labels), -1)
+    consequents = SugenoConsequents(
+        order=order,
+        coefficients={label: [float(c) for c in per_term[k]] for k, label in enumerate(labels)}
+    )
+    return consequents, approximation_report(system, consequents, x, target)
+
+
+def approximation_report(system, consequents: SugenoConsequents, x: np.ndarray, target: np.ndarray = None) -> Dict:
+    """Écart entre la sortie Sugeno et la sortie Mamdani sur les points x"""
+    if target is None:
+        target = system.compute_batch(x, mode="mamdani")
+    approximation = system.compute_batch(x, mode="sugeno", consequents=consequents)
+
+    both = ~np.isnan(target) & ~np.isnan(approximation)
+    error = approximation[both] - target[both]
+    same_level = system._crisp_to_risk_levels(approximation[both]) == system._crisp_to_risk_levels(target[both])
+
+    return {
+        'points': int(both.sum()),
+        'rmse': float(np.sqrt(np.mean(error ** 2))) if both.any() else 0.0,
+        'mean_abs_error': float(np.mean(np.abs(error))) if both.any() else 0.0,
+        'max_abs_error': float(np.max(np.abs(error))) if both.any() else 0.0,
+        'risk_level_agreement': float(np.mean(same_level)) if both.any() else 1.0,
+    }
@@ -0,0 +1,270 @@
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from .Snapshot import CACHE_DIR
+
+
+# Version du format: changer invalide toutes les surfaces existantes
+SURFACE_VERSION = 1
+
+# Niveaux atteignables des symptômes depuis le CSV: 1-9 -> (v - 1) * 1.25
+SYMPTOM_LEVELS = np.arange(9) * 1.25
+
+# Points de grille calculés par bloc pendant la construction
+BUILD_BLOCK = 262_144
+
+# Classe des cellules sans sortie (aucune règle active: secours du moteur)
+NO_LEVEL = 255
+
+
+def surface_axes(system) -> List[np.ndarray]:
+    """
+    Points de la grille par entrée. Symptômes: SYMPTOM_LEVELS. Âge: les
+    entiers de son univers entre le premier et le dernier changement de ses
+    fonctions d'appartenance; en dehors, la sortie est constante et la
+    borne de l'axe donne la valeur exacte.
+    """
+    snapshot = system.snapshot
+    axes = []
+    for column, name in enumerate(snapshot.input_names):
+        if name != 'age':
+            axes.append(SYMPTOM_LEVELS.copy())
+            continue
+        universe = snapshot.universes[column]
+        mfs = np.array([mf for mf, owner in zip(snapshot.term_mfs, snapshot.term_inputs) if owner == column])
+        changes = np.flatnonzero(np.any(np.diff(mfs, axis=1) != 0, axis=0))
+        first, last = (changes[0], changes[-1] + 1) if len(changes) else (0, 0)
+        axes.append(universe[first:last + 1].copy())
+    return axes
+
+
+def surface_key(system, axes: List[np.ndarray]) -> str:
+    """Empreinte de tout ce dont dépend la surface (règles et ensembles via le snapshot)"""
+    payload = {
+        'version': SURFACE_VERSION,
+        'snapshot': system.snapshot.key,
+        'defuzzification': system.defuzzification,
+        'thresholds': [float(t) for t in system.parameters.risk_thresholds],
+        'axes': [axis.tolist() for axis in axes],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _risk_ranks(values: np.ndarray, thresholds) -> np.ndarray:
+    """Rang 0/1/2 de _crisp_to_risk_level, NO_LEVEL pour NaN"""
+    low_cut, high_cut = thresholds
+    ranks = (values >= low_cut).astype(np.uint8) + (values >= high_cut)
+    return np.where(np.isnan(values), NO_LEVEL, ranks).astype(np.uint8)
+
+
+def _to_float16(crisp: np.ndarray, thresholds) -> np.ndarray:
+    """Arrondi float16 décalé d'un ulp quand il ferait changer de classe"""
+    values = crisp.astype(np.float16)
+    target = _risk_ranks(crisp, thresholds)
+    for _ in range(16):
+        wrong = _risk_ranks(values.astype(float), thresholds) != target
+        if not wrong.any():
+            break
+        direction = np.where(values[wrong] > crisp[wrong], -np.inf, np.inf).astype(np.float16)
+        values[wrong] = np.nextafter(values[wrong], direction)
+    return values
+
+
+# Moteur des processus de construction
+_WORKER_SYSTEM = None
+
+
+def _init_worker(system):
+    global _WORKER_SYSTEM
+    _WORKER_SYSTEM = system
+
+
+def _compute_block(args) -> np.ndarray:
+    start, stop, axes, shape = args
+    coords = np.unravel_index(np.arange(start, stop), shape)
+    x = np.column_stack([axis[index] for axis, index in zip(axes, coords)])
+    return _WORKER_SYSTEM.compute_batch(x)
+
+
+class RiskSurface:
+    """
+    Sortie nette du système précalculée sur toute la grille atteignable,
+    dans des fichiers .npy ouverts en lecture seule par np.memmap: tous les
+    processus partagent les mêmes pages. values: float16 (N-linéaire hors
+    grille), levels: uint8 (classe exacte de chaque cellule, l'arrondi
+    float16 ne la change jamais).
+    """
+
+    def __init__(self, prefix: str):
+        with open(prefix + '.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.prefix = prefix
+        self.key = meta['key']
+        self.axes = [np.array(axis, dtype=float) for axis in meta['axes']]
+        self.values = np.load(prefix + '.values.npy', mmap_mode='r')
+        self.levels = np.load(prefix + '.levels.npy', mmap_mode='r')
+        if self.values.shape != tuple(len(axis) for axis in self.axes):
+            raise ValueError(f"Surface incohérente: {prefix}")
+        self.strides = np.array([int(np.prod(self.values.shape[k + 1:])) for k in range(len(self.axes))])
+        self._flat_values = self.values.reshape(-1)
+        self._flat_levels = self.levels.reshape(-1)
+
+    # Les processus rouvrent les fichiers au lieu de copier les tableaux
+    def __getstate__(self):
+        return {'prefix': self.prefix}
+
+    def __setstate__(self, state):
+        self.__init__(state['prefix'])
+
+    # ==================== Construction ====================
+
+    @classmethod
+    def build(cls, system, cache_dir: str = None, n_jobs: int = 1, axes: List[np.ndarray] = None) -> "RiskSurface":
+        """
+        Évalue le système sur toute la grille (une fois) et écrit la surface.
+        axes: points de grille par entrée, surface_axes(system) par défaut.
+        """
+        # Calcul exact même si le système consulte déjà une surface
+        system = copy.copy(system)
+        system.surface = None
+        if axes is None:
+            axes = surface_axes(system)
+        axes = [np.asarray(axis, dtype=float) for axis in axes]
+        key = surface_key(system, axes)
+        prefix = surface_prefix(key, cache_dir)
+        shape = tuple(len(axis) for axis in axes)
+        size = int(np.prod(shape))
+        thresholds = system.parameters.risk_thresholds
+
+        directory = os.path.dirname(prefix)
+        os.makedirs(directory, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=directory)
+        try:
+            values = np.lib.format.open_memmap(os.path.join(tmp, 'values.npy'), mode='w+', dtype=np.float16, shape=shape)
+            levels = np.lib.format.open_memmap(os.path.join(tmp, 'levels.npy'), mode='w+', dtype=np.uint8, shape=shape)
+            flat_values, flat_levels = values.reshape(-1), levels.reshape(-1)
+
+            blocks = [(start, min(start + BUILD_BLOCK, size), axes, shape) for start in range(0, size, BUILD_BLOCK)]
+            if n_jobs > 1:
+                with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(system,)) as pool:
+                    results = pool.map(_compute_block, blocks)
+                    for (start, stop, _, _), crisp in zip(blocks, results):
+                        flat_values[start:stop] = _to_float16(crisp, thresholds)
+                        flat_levels[start:stop] = _risk_ranks(crisp, thresholds)
+            else:
+                _init_worker(system)
+                for block in blocks:
+                    crisp = _compute_block(block)
+                    flat_values[block[0]:block[1]] = _to_float16(crisp, thresholds)
+                    flat_levels[block[0]:block[1]] = _risk_ranks(crisp, thresholds)
+            values.flush()
+            levels.flush()
+            del values, levels, flat_values, flat_levels
+
+            # Le fichier .json est écrit en dernier: sa présence valide la surface
+            os.replace(os.path.join(tmp, 'values.npy'), prefix + '.values.npy')
+            os.replace(os.path.join(tmp, 'levels.npy'), prefix + '.levels.npy')
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'axes': [axis.tolist() for axis in axes]}, f)
+            os.replace(os.path.join(tmp, 'meta.json'), prefix + '.json')
+        finally:
+            for name in os.listdir(tmp):
+                os.remove(os.path.join(tmp, name))
+            os.rmdir(tmp)
+        return cls(prefix)
+
+    # ==================== Consultation ====================
+
+    def _locate(self, x: np.ndarray):
+        """Cellule inférieure (N, d) et position dans la cellule (N, d) de chaque ligne"""
+        lower = np.empty(x.shape, dtype=np.int64)
+        t = np.empty(x.shape)
+        for k, axis in enumerate(self.axes):
+            if len(axis) == 1:
+                lower[:, k], t[:, k] = 0, 0.
+                continue
+            v = np.clip(x[:, k], axis[0], axis[-1])
+            i = np.clip(np.searchsorted(axis, v, side='right') - 1, 0, len(axis) - 2)
+            lower[:, k] = i
+            t[:, k] = (v - axis[i]) / (axis[i + 1] - axis[i])
+        return lower, t
+
+    def lookup(self, x: np.ndarray) -> np.ndarray:
+        """
+        Sortie nette pour x (N, d): lecture directe sur la grille,
+        interpolation N-linéaire ailleurs. NaN si une cellule utilisée n'a
+        pas de sortie ou si une entrée n'est pas finie.
+        """
+        x = np.asarray(x, dtype=float)
+        lower, t = self._locate(x)
+        exact = np.all((t == 0.) | (t == 1.), axis=1)
+
+        result = np.full(len(x), np.nan)
+        index = (lower + (t == 1.)) @ self.strides
+        result[exact] = self._flat_values[index[exact]]
+
+        off = np.flatnonzero(~exact)
+        if len(off):
+            result[off] = self._interpolate(lower[off], t[off])
+
+        result[~np.isfinite(x).all(axis=1)] = np.nan
+        return result
+
+    def _interpolate(self, lower: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """Somme pondérée des 2^d sommets de la cellule (seuls les axes hors grille comptent)"""
+        moving = np.flatnonzero((t > 0.).any(axis=0))
+        base = lower @ self.strides
+        total = np.zeros(len(lower))
+        missing = np.zeros(len(lower), dtype=bool)
+        for corner in range(1 << len(moving)):
+            weight = np.ones(len(lower))
+            offset = np.zeros(len(lower), dtype=np.int64)
+            for bit, k in enumerate(moving):
+                if (corner >> bit) & 1:
+                    weight = weight * t[:, k]
+                    offset += self.strides[k]
+                else:
+                    weight = weight * (1. - t[:, k])
+            value = self._flat_values[base + offset].astype(float)
+            used = weight > 0
+            missing |= used & np.isnan(value)
+            total += np.where(used, weight * np.nan_to_num(value), 0.)
+        return np.where(missing, np.nan, total)
+
+    def level_ranks(self, x: np.ndarray) -> np.ndarray:
+        """Classe 0/1/2 stockée des lignes sur la grille, NO_LEVEL ailleurs"""
+        x = np.asarray(x, dtype=float)
+        lower, t = self._locate(x)
+        exact = np.all((t == 0.) | (t == 1.), axis=1) & np.isfinite(x).all(axis=1)
+        ranks = np.full(len(x), NO_LEVEL, dtype=np.uint8)
+        ranks[exact] = self._flat_levels[((lower + (t == 1.)) @ self.strides)[exact]]
+        return ranks
+
+
+def surface_prefix(key: str, cache_dir: str = None) -> str:
+    return os.path.join(cache_dir or CACHE_DIR, f"fuzzy_surface_{key[:16]}")
+
+
+def load_surface(system, cache_dir: str = None, build: bool = False, n_jobs: int = 1) -> Optional[RiskSurface]:
+    """
+    Surface du système depuis le cache, None si elle manque ou si les
+    règles, ensembles, seuils ou la défuzzification ont changé (la clé
+    change avec eux). build=True la construit alors (long: toute la
+    grille, répartie sur n_jobs processus).
+    """
+    axes = surface_axes(system)
+    key = surface_key(system, axes)
+    try:
+        surface = RiskSurface(surface_prefix(key, cache_dir))
+        if surface.key == key:
+            return surface
+    except (OSError, ValueError, KeyError):
+        pass
+    if not build:
+        return None
+    return RiskSurface.build(system, cache_dir, n_jobs)
@@ -0,0 +1,291 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from scipy.optimize import differential_evolution
+from typing import List, Tuple
+from .Engine import FuzzyLungDiseaseSystem, FuzzyParameters, INPUT_NAMES
+from .Helpers import prepare_inputs_from_dataframe
+
+
+# Chaînes de points de rupture libres, ordonnées de gauche à droite sur leur
+# univers: (attribut de FuzzyParameters, [(ensemble, indice du paramètre)], bornes).
+# low [0,0,c] medium [a,b,c] high [a,10,10]: medium.a <= low.c <= medium.b <= high.a <= medium.c,
+# chaque ensemble reste ordonné et chevauche son voisin comme à l'origine.
+CHAINS = [
+    ('symptom_sets', [('medium', 0), ('low', 2), ('medium', 1), ('high', 0), ('medium', 2)], (0.0, 10.0)),
+    ('age_sets', [('young', 2), ('middle', 0), ('young', 3), ('middle', 1),
+                  ('senior', 0), ('middle', 2), ('senior', 1)], (0.0, 100.0)),
+    ('risk_thresholds', [(None, 0), (None, 1)], (0.0, 10.0)),
+]
+
+# Lignes (patients x candidats) évaluées par bloc vectorisé, borne la mémoire
+BLOCK_ROWS = 262_144
+
+RISK_RANKS = {'Low': 0, 'Medium': 1, 'High': 2}
+
+
+@dataclass
+class TuningResult:
+    parameters: FuzzyParameters
+    score: float
+    baseline_score: float
+    evaluated: int
+
+
+class ParameterSpace:
+    """
+    Vecteur plat des points de rupture libres d'un FuzzyParameters.
+    Les candidats sont les lignes d'une matrice (C, dim); repair() trie
+    chaque chaîne, ce qui rend tout point des bornes admissible.
+    """
+
+    def __init__(self, template: FuzzyParameters):
+        self.template = template
+        self.slots: List[Tuple[str, str, int]] = []
+        self.chains: List[slice] = []
+        bounds = []
+        for attr, chain, bound in CHAINS:
+            start = len(self.slots)
+            for label, index in chain:
+                self.slots.append((attr, label, index))
+                bounds.append(bound)
+            self.chains.append(slice(start, len(self.slots)))
+        self.bounds = np.array(bounds, dtype=float)
+        self.position = {slot: i for i, slot in enumerate(self.slots)}
+
+    @property
+    def dim(self) -> int:
+        return len(self.slots)
+
+    def _value(self, params: FuzzyParameters, attr: str, label: str, index: int) -> float:
+        group = getattr(params, attr)
+        return group[index] if label is None else group[label][1][index]
+
+    def to_vector(self, params: FuzzyParameters) -> np.ndarray:
+        return np.array([self._value(params, *slot) for slot in self.slots], dtype=float)
+
+    def repair(self, candidates: np.ndarray) -> np.ndarray:
+        candidates = np.clip(np.atleast_2d(candidates), self.bounds[:, 0], self.bounds[:, 1])
+        for chain in self.chains:
+            candidates[:, chain] = np.sort(candidates[:, chain], axis=1)
+        return candidates
+
+    def to_parameters(self, vector: np.ndarray) -> FuzzyParameters:
+        data = self.template.to_dict()
+        for (attr, label, index), value in zip(self.slots, self.repair(vector)[0]):
+            if label is None:
+                data[attr][index] = float(value)
+            else:
+                data[attr][label][1][index] = float(value)
+        return FuzzyParameters.from_dict(data)
+
+    def shape_parameters(self, candidates: np.ndarray, attr: str, label: str) -> Tuple[str, np.ndarray]:
+        """Forme et paramètres (C, k) d'un ensemble pour chaque candidat"""
+        kind, params = getattr(self.template, attr)[label]
+        columns = [
+            candidates[:, self.position[(attr, label, i)]] if (attr, label, i) in self.position
+            else np.full(len(candidates), float(value))
+            for i, value in enumerate(params)
+        ]
+        return kind, np.column_stack(columns)
+
+
+def sampled_shapes(kind: str, params: np.ndarray, universe: np.ndarray) -> np.ndarray:
+    """trimf / trapmf de skfuzzy sur l'univers, pour C jeux de paramètres (C, k) -> (C, U)"""
+    if kind == 'trimf':
+        a, b, d = (params[:, i:i + 1] for i in range(3))
+        c = b
+    elif kind == 'trapmf':
+        a, b, c, d = (params[:, i:i + 1] for i in range(4))
+    else:
+        raise ValueError(f"Forme non supportée: {kind}")
+
+    x = universe[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rising = np.where(b > a, (x - a) / (b - a), (x >= a).astype(float))
+        falling = np.where(d > c, (d - x) / (d - c), (x <= d).astype(float))
+    return np.clip(np.minimum(rising, falling), 0., 1.)
+
+
+class _Objective:
+    """
+    Exactitude de nombreux candidats à la fois sur des données fixes.
+    Seules les fonctions d'appartenance changent d'un candidat à l'autre:
+    règles, agrégation et défuzzification sont celles du moteur, appliquées
+    aux (candidats x patients) lignes d'un bloc.
+    """
+
+    def __init__(self, space: ParameterSpace, engine: FuzzyLungDiseaseSystem,
+                 raw: np.ndarray, labels: np.ndarray):
+        self.space = space
+        self.engine = engine
+        self.labels = labels
+
+        x = engine._universe_clip(engine._clip_inputs(raw))
+        self.fallback = engine._fallback_scores(dict(zip(INPUT_NAMES, raw.T)))
+
+        # Interpolation sur l'univers échantillonné: indice gauche et poids par entrée
+        snapshot = engine.snapshot
+        self.left, self.weight = [], []
+        for column, universe in enumerate(snapshot.universes):
+            left = np.clip(np.searchsorted(universe, x[:, column], side='right') - 1, 0, len(universe) - 2)
+            self.left.append(left)
+            self.weight.append((x[:, column] - universe[left]) / (universe[left + 1] - universe[left]))
+
+        # Terme d'entrée k du snapshot -> (colonne, attribut, ensemble)
+        self.terms = []
+        for k, column in enumerate(snapshot.term_inputs):
+            name = snapshot.input_names[column]
+            label = snapshot.term_names[k][len(name) + 1:-1]
+            self.terms.append((column, 'age_sets' if name == 'age' else 'symptom_sets', label))
+
+        self.thresholds = [self.space.position[('risk_thresholds', None, i)] for i in range(2)]
+
+    def __call__(self, candidates: np.ndarray) -> np.ndarray:
+        block = max(1, BLOCK_ROWS // max(len(self.labels), 1))
+        return np.concatenate([
+            self._score(candidates[start:start + block])
+            for start in range(0, len(candidates), block)
+        ]) if len(candidates) else np.empty(0)
+
+    def _score(self, c: np.ndarray) -> np.ndarray:
+        engine, snapshot = self.engine, self.engine.snapshot
+        n = len(self.labels)
+
+        memberships = np.ones((len(c), n, len(snapshot.term_mfs) + 1))
+        for k, (column, attr, label) in enumerate(self.terms):
+            kind, params = self.space.shape_parameters(c, attr, label)
+            mf = sampled_shapes(kind, params, snapshot.universes[column])
+            left, weight = self.left[column], self.weight[column]
+            memberships[:, :, k] = mf[:, left] * (1 - weight) + mf[:, left + 1] * weight
+
+        strengths = engine._rule_strengths(memberships.reshape(len(c) * n, -1))
+        crisp = engine._defuzzify(engine._output_cuts(strengths)).reshape(len(c), n)
+        crisp = np.where(np.isnan(crisp), self.fallback, crisp)
+
+        low_cut, high_cut = (c[:, i:i + 1] for i in self.thresholds)
+        predicted = (crisp >= low_cut).astype(np.int64) + (crisp >= high_cut)
+        return (predicted == self.labels).mean(axis=1)
+
+
+# État des processus de calcul, fixé une fois par l'initialiseur du pool
+_WORKER_OBJECTIVE = None
+
+
+def _init_worker(objective: _Objective):
+    global _WORKER_OBJECTIVE
+    _WORKER_OBJECTIVE = objective
+
+
+def _score_in_worker(candidates: np.ndarray) -> np.ndarray:
+    return _WORKER_OBJECTIVE(candidates)
+
+
+class FuzzyTuner:
+    """
+    Ajuste les points de rupture des fonctions d'appartenance et les seuils
+    de risque sur un DataFrame étiqueté (colonne "Level"). Les candidats sont
+    évalués par blocs vectorisés, répartis sur des processus.
+    """
+
+    def __init__(self, df: pd.DataFrame, parameters=None,
+                 defuzzification: str = 'sampled', n_jobs: int = None):
+        # Par défaut, les paramètres que charge le moteur (réglage précédent compris)
+        engine = FuzzyLungDiseaseSystem(defuzzification, parameters=parameters, cache=False)
+        self.parameters = engine.parameters
+        self.defuzzification = defuzzification
+        self.space = ParameterSpace(self.parameters)
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+
+        self.raw, self.labels = self._prepare(engine, df)
+        self.objective = _Objective(self.space, engine, self.raw, self.labels)
+        self.evaluated = 0
+        self._pool = None
+
+    def _prepare(self, engine: FuzzyLungDiseaseSystem, df: pd.DataFrame):
+        if 'Level' not in df:
+            raise ValueError("Le réglage demande un DataFrame étiqueté (colonne 'Level')")
+        labels = df['Level'].astype(str).str.strip().str.capitalize().map(RISK_RANKS)
+        known = labels.notna().to_numpy()
+        raw = engine._as_matrix(prepare_inputs_from_dataframe(df))
+        return raw[known], labels[known].to_numpy(dtype=np.int64)
+
+    # ==================== Évaluation ====================
+
+    def score(self, candidates: np.ndarray) -> np.ndarray:
+        """Exactitude de chaque candidat (lignes de candidates, chaînes triées)"""
+        candidates = self.space.repair(candidates)
+        self.evaluated += len(candidates)
+
+        if self.n_jobs <= 1 or len(candidates) < 2 * self.n_jobs:
+            return self.objective(candidates)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_jobs, initializer=_init_worker, initargs=(self.objective,)
+            )
+        chunks = np.array_split(candidates, self.n_jobs)
+        return np.concatenate(list(self._pool.map(_score_in_worker, chunks)))
+
+    def accuracy(self, parameters: FuzzyParameters) -> float:
+        """Exactitude mesurée avec le moteur lui-même (evaluate_batch), moteur jetable hors cache"""
+        engine = FuzzyLungDiseaseSystem(self.defuzzification, parameters=parameters, cache=False)
+        levels = engine.evaluate_batch(self.raw)['risk_level']
+        predicted = np.array([RISK_RANKS[level.value] for level in levels], dtype=np.int64)
+        return float(np.mean(predicted == self.labels)) if len(self.labels) else 0.0
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ==================== Recherche ====================
+
+    def differential_evolution(self, maxiter: int = 30, popsize: int = 10, seed: int = None,
+                               tol: float = 0.0, mutation=(0.5, 1.0), recombination: float = 0.7) -> TuningResult:
+        """
+        Évolution différentielle de SciPy, population évaluée d'un bloc
+        (vectorized=True). Le point de départ fait partie de la population;
+        le résultat n'est retenu que s'il bat les paramètres de départ sur
+        le moteur réel.
+        """
+        start = self.space.to_vector(self.parameters)
+
+        def objective(population: np.ndarray) -> np.ndarray:
+            return -self.score(population.T)
+
+        found = differential_evolution(
+            objective, self.space.bounds, x0=start, maxiter=maxiter, popsize=popsize,
+            tol=tol, mutation=mutation, recombination=recombination, rng=seed,
+            polish=False, vectorized=True, updating='deferred'
+        )
+
+        baseline = self.accuracy(self.parameters)
+        tuned = self.space.to_parameters(found.x)
+        score = self.accuracy(tuned)
+        if score <= baseline:
+            return TuningResult(self.parameters, baseline, baseline, self.evaluated)
+        return TuningResult(tuned, score, baseline, self.evaluated)
+
+
+def tune_fuzzy_system(df: pd.DataFrame, output_path: str = None, defuzzification: str = 'sampled',
+                      n_jobs: int = None, **kwargs) -> TuningResult:
+    """
+    Ajuste le système flou sur des données étiquetées et enregistre
+    éventuellement les paramètres. Avec output_path=Engine.TUNED_PARAMETERS,
+    ils sont chargés par FuzzyLungDiseaseSystem() au démarrage.
+    """
+    with FuzzyTuner(df, defuzzification=defuzzification, n_jobs=n_jobs) as tuner:
+        result = tuner.differential_evolution(**kwargs)
+
+    if output_path:
+        result.parameters.save(output_path)
+    return result
@@ -1,8 +1,54 @@
 from dataclasses import dataclass,field
-from typing import List,Dict,Set,Callable,Any
+import heapq
+from typing import List,Dict,Set,Callable,Any,Iterable,Optional,Sequence,Tuple
 from Knowledge.Hierarchy import Patient,RiskLevel
+from Logic.Modal_Logic.Frame import KripkeFrame
+from Logic.Modal_Logic.Formula import parse_formula
+import numpy as np
 import pandas as pd
 
+# Propositions per uint64 word of a batch mask
+WORD_BITS=64
+
+# A world is possible for a patient when at least this many of its propositions hold
+MIN_MATCHES=2
+
+# Up to this many worlds a single patient is scored with int.bit_count, past it with NumPy
+SCALAR_WORLDS=64
+
+# Past one posting entry per this many worlds, scores are counted over all worlds instead of sorted postings
+DENSE_POSTINGS=16
+
+@dataclass(frozen=True)
+class Threshold:
+    """
+    Proposition declared as data: low <= feature <= high (either bound
+    optional, strict with low_strict/high_strict). feature is 'age' or a
+    symptom name; a missing symptom is false, like Patient.has_symptom.
+    Used as a Proposition fn, it is compiled to column comparisons.
+    """
+    feature: str
+    low: Optional[float]=None
+    high: Optional[float]=None
+    low_strict: bool=False
+    high_strict: bool=False
+
+    def __call__(self,patient: Patient) -> bool:
+        if self.feature=='age':
+            return self.test(patient.age)
+        symptom=patient.get_symptom(self.feature)
+        return symptom is not None and self.test(symptom.severity)
+
+    def test(self,value) -> bool:
+        if self.low is not None and not (value>self.low if self.low_strict else value>=self.low):
+            return False
+        if self.high is not None and not (value<self.high if self.high_strict else value<=self.high):
+            return False
+        return True
+
+    def bounds(self) -> List[float]:
+        return [bound for bound in (self.low,self.high) if bound is not None]
+
 @dataclass(frozen=True, eq=True)
 class Proposition:
     name: str
@@ -21,6 +67,20 @@ class PossibleWorld:
     def __str__(self):
         return f"{self.risk_level.value}: {self.description}"
 
+class FrozenDict(dict):
+    """Read-only dict: the model state compiled masks and caches are built from"""
+
+    def _read_only(self,*args,**kwargs):
+        raise TypeError("Compiled model state is read-only: assign a new worlds, accessibility, valuation or propositions to the model instead")
+
+    __setitem__=__delitem__=clear=pop=popitem=setdefault=update=__ior__=_read_only
+
+    def __reduce__(self):
+        return (FrozenDict,(dict(self),))
+
+# Fields the compiled masks, frame and caches are built from
+MODEL_FIELDS=("worlds","accessibility","valuation","propositions")
+
 @dataclass
 class ModalLogic:
     
@@ -33,27 +93,343 @@ class ModalLogic:
         
         if isinstance(self.propositions, list):
             self.propositions = {prop.name: prop for prop in self.propositions}
+        self.compile()
+
+    def __setattr__(self,name: str,value):
+        super().__setattr__(name,value)
+        # Replacing model state recompiles: masks, frame and caches never go stale
+        if name in MODEL_FIELDS and "bits" in self.__dict__:
+            self.compile()
+
+    def compile(self):
+        """
+        Bit position per proposition name and world valuations as masks.
+        worlds, accessibility, valuation and propositions are frozen into
+        read-only copies (tuple, FrozenDict of frozensets): to change the
+        model assign a new value to one of them, which recompiles.
+        Names used only in a valuation get a bit too: they count in the
+        world size but no patient can match them.
+        """
+        state=self.__dict__
+        state["worlds"]=tuple(self.worlds)
+        state["accessibility"]=FrozenDict((world,frozenset(accessible)) for world,accessible in self.accessibility.items())
+        state["valuation"]=FrozenDict((world,frozenset(names)) for world,names in self.valuation.items())
+        state["propositions"]=FrozenDict(self.propositions)
+
+        names=list(self.propositions)
+        extra=set().union(*(self.valuation.get(world,set()) for world in self.worlds))-set(names)
+        names+=sorted(extra)
+        
+        self.bit_names=names
+        self.bits={name: i for i,name in enumerate(names)}
+        self.n_words=max(1,-(-len(names)//WORD_BITS))
+        self.world_index={world: i for i,world in enumerate(self.worlds)}
+        self.world_valuations=[self.valuation.get(world,frozenset()) for world in self.worlds]
+        self.world_ints=[self.mask(valuation) for valuation in self.world_valuations]
+        self.world_masks=np.array([self.words(mask) for mask in self.world_ints],dtype=np.uint64).reshape(len(self.worlds),self.n_words)
+        self.world_sizes=np.array([len(valuation) for valuation in self.world_valuations],dtype=np.int64)
+        self._compile_postings()
+        self.frame=KripkeFrame(self.worlds,self.accessibility)
+        self._truth={}
+        self._labels={}
+        self._compile_thresholds()
+
+    def _compile_postings(self):
+        """
+        Inverted index: bit -> worlds whose valuation holds it, in world
+        order (CSR: posting_worlds[posting_starts[b]:posting_starts[b+1]]).
+        """
+        bits=np.unpackbits(self.world_masks.astype('<u8').view(np.uint8),axis=1,bitorder='little')[:,:len(self.bit_names)]
+        bit_index,world_index=np.nonzero(bits.T)
+        self.posting_worlds=world_index.astype(np.int64)
+        self.posting_starts=np.searchsorted(bit_index,np.arange(len(self.bit_names)+1))
+
+    def postings(self,bit: int) -> np.ndarray:
+        return self.posting_worlds[self.posting_starts[bit]:self.posting_starts[bit+1]]
+
+    def _compile_thresholds(self):
+        """
+        Threshold propositions grouped by feature. Their bounds cut the
+        feature axis into cells (open intervals and the bounds themselves);
+        a truth table per cell answers every proposition of the feature
+        from one searchsorted pass over the column.
+        """
+        groups={}
+        self.opaque_propositions=[]
+        for bit,(name,proposition) in enumerate(self.propositions.items()):
+            if isinstance(proposition.fn,Threshold):
+                groups.setdefault(proposition.fn.feature,[]).append((bit,proposition.fn))
+            else:
+                self.opaque_propositions.append(bit)
+        
+        self.threshold_plan=[]
+        for feature,members in groups.items():
+            points=np.array(sorted({bound for _,threshold in members for bound in threshold.bounds()}),dtype=float)
+            if len(points):
+                gaps=np.concatenate([[points[0]-1],(points[:-1]+points[1:])/2,[points[-1]+1]])
+            else:
+                gaps=np.zeros(1)
+            cells=np.empty(2*len(points)+1)
+            cells[0::2],cells[1::2]=gaps,points
+            table=np.array([[threshold.test(value) for _,threshold in members] for value in cells],dtype=bool)
+            self.threshold_plan.append((feature,np.array([bit for bit,_ in members]),points,table))
+
+    def evaluate_columns(self,columns: Dict[str,Tuple[np.ndarray,np.ndarray]],n: int,patients: Sequence[Patient] = None) -> np.ndarray:
+        """
+        Truth of every proposition for n patients at once, (n, P) booleans
+        in proposition order. columns: feature name -> (values, present)
+        arrays; a missing symptom column means the symptom is absent.
+        Propositions that are not Threshold run on patients one by one.
+        """
+        matrix=np.zeros((n,len(self.propositions)),dtype=bool)
+        for feature,bits,points,table in self.threshold_plan:
+            if feature not in columns:
+                if feature=='age':
+                    raise ValueError("Missing 'age' column for age propositions")
+                continue
+            values,present=columns[feature]
+            values=np.asarray(values,dtype=float)
+            present=np.asarray(present,dtype=bool)&~np.isnan(values)
+            cell=np.searchsorted(points,values,'left')+np.searchsorted(points,values,'right')
+            matrix[:,bits]=table[cell]&present[:,None]
+        
+        if self.opaque_propositions:
+            if patients is None:
+                raise ValueError("Patients are required for propositions that are not Threshold")
+            names=list(self.propositions)
+            for bit in self.opaque_propositions:
+                proposition=self.propositions[names[bit]]
+                for i,patient in enumerate(patients):
+                    try:
+                        matrix[i,bit]=bool(proposition(patient))
+                    except Exception as e:
+                        print(f"Error evaluating proposition {names[bit]}: {e}")
+        return matrix
+
+    def masks_from_matrix(self,matrix: np.ndarray) -> np.ndarray:
+        """(n, P) proposition truth -> (n, n_words) uint64 patient masks"""
+        bits=np.zeros((len(matrix),self.n_words*WORD_BITS),dtype=bool)
+        bits[:,:matrix.shape[1]]=matrix
+        return np.packbits(bits,axis=1,bitorder='little').view('<u8').astype(np.uint64)
+
+    def int_mask(self,words: np.ndarray) -> int:
+        mask=0
+        for k,word in enumerate(words.tolist()):
+            mask|=int(word)<<(WORD_BITS*k)
+        return mask
+
+    def mask(self,names: Iterable[str]) -> int:
+        mask=0
+        for name in names:
+            mask|=1<<self.bits[name]
+        return mask
+
+    def names(self,mask: int) -> Set[str]:
+        names=set()
+        while mask:
+            low=mask&-mask
+            names.add(self.bit_names[low.bit_length()-1])
+            mask^=low
+        return names
+
+    def words(self,mask: int) -> np.ndarray:
+        """Python int mask -> uint64 words (bit i of the mask in word i // 64)"""
+        return np.array([(mask>>(WORD_BITS*k))&0xFFFFFFFFFFFFFFFF for k in range(self.n_words)],dtype=np.uint64)
+
+    def patient_mask(self,patient: Patient) -> int:
+        mask=0
+        for prop_name,proposition in self.propositions.items():
+            try:
+                if proposition(patient):
+                    mask|=1<<self.bits[prop_name]
+            except Exception as e:
+                print(f"Error evaluating proposition {prop_name}: {e}")
+                continue
+        return mask
+
+    def match_scores(self,masks: np.ndarray) -> np.ndarray:
+        """popcount(patient & world) for patient masks (N, n_words) against every world, shape (N, W)"""
+        masks=np.asarray(masks,dtype=np.uint64).reshape(-1,self.n_words)
+        scores=np.zeros((len(masks),len(self.worlds)),dtype=np.int64)
+        for k in range(self.n_words):
+            scores+=np.bitwise_count(masks[:,None,k]&self.world_masks[None,:,k])
+        return scores
+
+    def _patient_scores(self,mask: int):
+        """Scores and percentages of one patient mask against every world"""
+        if len(self.worlds)>SCALAR_WORLDS:
+            scores=self.match_scores(self.words(mask))[0]
+            return scores.tolist(),self.match_percentages(scores).tolist()
+        scores=[(mask&world_mask).bit_count() for world_mask in self.world_ints]
+        percentages=[score/size*100 if size>0 else 0 for score,size in zip(scores,self.world_sizes.tolist())]
+        return scores,percentages
+
+    def match_percentages(self,scores: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore',invalid='ignore'):
+            return np.where(self.world_sizes>0,scores/self.world_sizes*100,0.)
+
+    def rank_worlds(self,masks: np.ndarray,top_n: int = 3):
+        """
+        get_most_likely_worlds for N patient masks at once: world indices
+        (N, top_n) in ranking order, with scores, percentages and possible
+        flags (N, W). Rows with fewer candidate worlds are padded with -1.
+        """
+        scores=self.match_scores(masks)
+        percentages=self.match_percentages(scores)
+        possible=scores>=MIN_MATCHES
+        
+        # Impossible worlds only compete when no world is possible
+        candidates=possible|~possible.any(axis=1,keepdims=True)
+        
+        # sorted(reverse=True) keeps list order on ties: world index breaks them
+        index=np.broadcast_to(np.arange(len(self.worlds)),scores.shape)
+        order=np.lexsort((index,-scores,-percentages,~candidates),axis=1)[:,:top_n]
+        order=np.where(np.take_along_axis(candidates,order,axis=1),order,-1)
+        return order,scores,percentages,possible
+
+    def rank_sparse(self,mask: int,top_n: int = 3):
+        """
+        rank_worlds for one patient mask through the inverted index: scores
+        are accumulated only over worlds sharing a true proposition, and a
+        heap of top_n keeps the best of them. Every other world scores 0
+        and can only fill the ranking, in index order, when no world is
+        possible. Returns order, scores, percentages and possible flags
+        for the ranked worlds only (dicts by world index).
+        """
+        postings=[]
+        while mask:
+            low=mask&-mask
+            postings.append(self.postings(low.bit_length()-1))
+            mask^=low
+        touched=np.concatenate(postings) if postings else np.zeros(0,dtype=np.int64)
+        if len(touched)*DENSE_POSTINGS<len(self.worlds):
+            touched,counts=np.unique(touched,return_counts=True)
+        else:
+            counts=np.bincount(touched,minlength=len(self.worlds))
+            touched=np.flatnonzero(counts)
+            counts=counts[touched]
+        percentages=self.match_percentages_of(touched,counts)
+        
+        possible=counts>=MIN_MATCHES
+        fill=not possible.any()
+        if not fill:
+            touched,counts,percentages=touched[possible],counts[possible],percentages[possible]
+        
+        # Upper bound: a world below the top_n-th best percentage cannot enter the ranking
+        if len(touched)>top_n>0:
+            bound=np.partition(percentages,len(percentages)-top_n)[len(percentages)-top_n]
+            kept=percentages>=bound
+            touched,counts,percentages=touched[kept],counts[kept],percentages[kept]
+        
+        # sorted(reverse=True) keeps list order on ties: world index breaks them
+        keys=zip((-percentages).tolist(),(-counts).tolist(),touched.tolist())
+        ranked=heapq.nsmallest(top_n,keys)
+        order=[i for _,_,i in ranked]
+        scores={i: -score for _,score,i in ranked}
+        percents={i: -percentage for percentage,_,i in ranked}
+        
+        if fill and len(order)<top_n:
+            # Untouched worlds: score 0, lowest indices first
+            seen=set(touched.tolist())
+            for i in range(len(self.worlds)):
+                if len(order)>=top_n:
+                    break
+                if i not in seen:
+                    order.append(i)
+                    scores[i],percents[i]=0,0.
+        return order,scores,percents,{i: scores[i]>=MIN_MATCHES for i in order}
+
+    def match_percentages_of(self,worlds: np.ndarray,scores: np.ndarray) -> np.ndarray:
+        """match_percentages restricted to some worlds"""
+        sizes=self.world_sizes[worlds]
+        with np.errstate(divide='ignore',invalid='ignore'):
+            return np.where(sizes>0,scores/sizes*100,0.)
+
+    def truth(self,proposition_name: str) -> np.ndarray:
+        """Worlds whose valuation holds the proposition, (W,) booleans (cached until the model changes)"""
+        if proposition_name not in self._truth:
+            bit=self.bits.get(proposition_name)
+            if bit is None:
+                truth=np.zeros(len(self.worlds),dtype=bool)
+            else:
+                word,offset=divmod(bit,WORD_BITS)
+                truth=(self.world_masks[:,word]>>np.uint64(offset))&np.uint64(1)==1
+            self._truth[proposition_name]=truth
+        return self._truth[proposition_name]
+
+    def necessarily_all(self,proposition_name: str,steps: int = 1,system: str = "K") -> np.ndarray:
+        """knows() for every world at once; □ⁿ with steps, or under S4/S5 (see KripkeFrame.box)"""
+        return self.frame.box(self.truth(proposition_name),steps,system)
+
+    def possibly_all(self,proposition_name: str,steps: int = 1,system: str = "K") -> np.ndarray:
+        """possibly() for every world at once"""
+        return self.frame.diamond(self.truth(proposition_name),steps,system)
+
+    def satisfaction(self,formula,system: str = "K") -> np.ndarray:
+        """
+        Worlds where a modal formula holds, (W,) booleans. formula: Formula
+        or text (see parse_formula). Subformulas are labelled bottom-up,
+        each distinct one once, and kept until the model changes: queries
+        sharing parts reuse them. □ and ◇ follow knows() and possibly(), under
+        the accessibility of system (K, S4 or S5).
+        """
+        if isinstance(formula,str):
+            formula=parse_formula(formula)
+        labels=self._labels.setdefault(system,{})
+        if formula in labels:
+            return labels[formula]
+        
+        for node in formula.subformulas():
+            if node in labels:
+                continue
+            args=[labels[arg] for arg in node.args]
+            if node.op=='atom':
+                truth=self.truth(node.name)
+            elif node.op=='true':
+                truth=np.ones(len(self.worlds),dtype=bool)
+            elif node.op=='false':
+                truth=np.zeros(len(self.worlds),dtype=bool)
+            elif node.op=='not':
+                truth=~args[0]
+            elif node.op=='and':
+                truth=args[0]&args[1]
+            elif node.op=='or':
+                truth=args[0]|args[1]
+            elif node.op=='implies':
+                truth=~args[0]|args[1]
+            elif node.op=='box':
+                truth=self.frame.box(args[0],system=system)
+            else:
+                truth=self.frame.diamond(args[0],system=system)
+            truth.flags.writeable=False
+            labels[node]=truth
+        return labels[formula]
+
+    def holds(self,world: PossibleWorld,formula,system: str = "K") -> bool:
+        i=self.world_index.get(world)
+        return i is not None and bool(self.satisfaction(formula,system)[i])
+
+    def satisfying_worlds(self,formula,system: str = "K") -> List[PossibleWorld]:
+        return [self.worlds[i] for i in np.flatnonzero(self.satisfaction(formula,system))]
 
     def knows(self,world: PossibleWorld,proposition_name: str) -> bool:
-        if world not in self.accessibility:
+        i=self.world_index.get(world)
+        if i is None or not self.frame.has_entry[i]:
             return False
-        
-        for accessible_world in self.accessibility[world]:
-            if proposition_name not in self.valuation.get(accessible_world,set()):
-                return False
-        return True
+        return bool(self.truth(proposition_name)[self.frame.successors(i)].all())
     
     def believes(self,world: PossibleWorld,proposition_name: str) -> bool:
-        return proposition_name in self.valuation.get(world,set())
+        i=self.world_index.get(world)
+        if i is None:
+            return proposition_name in self.valuation.get(world,frozenset())
+        bit=self.bits.get(proposition_name)
+        return bit is not None and bool(self.world_ints[i]>>bit&1)
     
     def possibly(self,world: PossibleWorld,proposition_name: str) -> bool:
-        if world not in self.accessibility:
+        i=self.world_index.get(world)
+        if i is None or not self.frame.has_entry[i]:
             return False
-        
-        for accessible_world in self.accessibility[world]:
-            if proposition_name in self.valuation.get(accessible_world,set()):
-                return True
-        return False
+        return bool(self.truth(proposition_name)[self.frame.successors(i)].any())
     
     def necessarily(self,world: PossibleWorld,proposition_name: str) -> bool:
         return self.knows(world,proposition_name)
@@ -61,61 +437,71 @@ class ModalLogic:
     def evaluate_patient(self,patient: Patient) -> Dict[PossibleWorld,Dict[str,Any]]:
         results={}
         
-        patient_true_propositions=set()
-        for prop_name,proposition in self.propositions.items():
-            try:
-                if proposition(patient):
-                    patient_true_propositions.add(prop_name)
-            except Exception as e:
-                print(f"Error evaluating proposition {prop_name}: {e}")
-                continue
+        mask=self.patient_mask(patient)
+        patient_true_propositions=self.names(mask)
+        scores,percentages=self._patient_scores(mask)
         
-        for world in self.worlds:
-            world_propositions=self.valuation.get(world,set())
-            
-            match=patient_true_propositions.intersection(world_propositions)
-            match_score=len(match)
-            total_possible=len(world_propositions)
+        for i,world in enumerate(self.worlds):
+            world_propositions=self.world_valuations[i]
             
             results[world]={
                 'world': world,
                 'patient_propositions': patient_true_propositions,
                 'world_propositions': world_propositions,
-                'match_propositions': match,
-                'match_score': match_score,
-                'match_percentage': (match_score/total_possible*100) if total_possible > 0 else 0,
-                'is_possible': self._is_world_possible(world,patient_true_propositions)
+                'match_propositions': patient_true_propositions.intersection(world_propositions),
+                'match_score': scores[i],
+                'match_percentage': percentages[i],
+                'is_possible': scores[i]>=MIN_MATCHES
             }
         
         return results
     
     def _is_world_possible(self,world: PossibleWorld,patient_propositions: Set[str]) -> bool:
-        world_props=self.valuation.get(world,set())
-        match=patient_propositions.intersection(world_props)
-        return len(match)>=2
+        world_mask=self.world_ints[self.world_index[world]] if world in self.world_index else self.mask(self.valuation.get(world,frozenset()))
+        return (self.mask(patient_propositions&self.bits.keys())&world_mask).bit_count()>=MIN_MATCHES
     
     def get_most_likely_worlds(self,patient: Patient,top_n: int = 3) -> List[Dict[str, Any]]:
-        evaluations=self.evaluate_patient(patient)
-        
-        possible_worlds={w: d for w, d in evaluations.items() if d['is_possible']}
+        mask=self.patient_mask(patient)
+        if len(self.worlds)>SCALAR_WORLDS:
+            return self._ranked(self.names(mask),*self.rank_sparse(mask,top_n))
         
-        if not possible_worlds:
-            possible_worlds=evaluations
-        
-        sorted_worlds=sorted(
-            possible_worlds.items(),
-            key=lambda x: (x[1]['match_percentage'], x[1]['match_score']),
-            reverse=True
-        )
+        scores,percentages=self._patient_scores(mask)
+        possible=[score>=MIN_MATCHES for score in scores]
+        candidates=[i for i in range(len(self.worlds)) if possible[i]] or list(range(len(self.worlds)))
+        order=sorted(candidates,key=lambda i: (percentages[i],scores[i]),reverse=True)[:top_n]
+        return self._ranked(self.names(mask),order,scores,percentages,possible)
+
+    def get_most_likely_worlds_batch(self,masks: np.ndarray,top_n: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        get_most_likely_worlds for each row of patient masks (n, n_words).
+        Each distinct mask is decoded and ranked once: with rank_worlds up
+        to SCALAR_WORLDS worlds, past it through the inverted index
+        (rank_sparse), so no (n, W) array is built for large models.
+        """
+        masks=np.asarray(masks,dtype=np.uint64).reshape(-1,self.n_words)
+        distinct,inverse=np.unique(masks,axis=0,return_inverse=True)
+        ints=[self.int_mask(words) for words in distinct]
+        names=[self.names(mask) for mask in ints]
         
+        if len(self.worlds)>SCALAR_WORLDS:
+            rankings=[self.rank_sparse(mask,top_n) for mask in ints]
+        else:
+            order,scores,percentages,possible=self.rank_worlds(distinct,top_n)
+            rankings=[
+                (order[k].tolist(),scores[k].tolist(),percentages[k].tolist(),possible[k].tolist())
+                for k in range(len(distinct))
+            ]
+        return [self._ranked(names[k],*rankings[k]) for k in inverse.reshape(-1).tolist()]
+
+    def _ranked(self,patient_propositions: Set[str],order: List[int],scores: List[int],percentages: List[float],possible: List[bool]) -> List[Dict[str, Any]]:
         return [
             {
-                'world': world,
-                'risk_level': world.risk_level,
-                'match_percentage': data['match_percentage'],
-                'match_score': data['match_score'],
-                'match_propositions': data['match_propositions'],
-                'is_possible': data['is_possible']
+                'world': self.worlds[i],
+                'risk_level': self.worlds[i].risk_level,
+                'match_percentage': percentages[i],
+                'match_score': scores[i],
+                'match_propositions': patient_propositions.intersection(self.world_valuations[i]),
+                'is_possible': possible[i]
             }
-            for world,data in sorted_worlds[:top_n]
+            for i in order if i>=0
         ]
\ No newline at end of file
@@ -0,0 +1,215 @@
+import re
+import weakref
+from functools import lru_cache
+from typing import Iterator,List,Tuple
+
+# Operator -> (symbol, number of arguments); atoms and constants have none
+OPERATORS={
+    'atom': ('',0),
+    'true': ('⊤',0),
+    'false': ('⊥',0),
+    'not': ('¬',1),
+    'box': ('□',1),
+    'diamond': ('◇',1),
+    'and': ('∧',2),
+    'or': ('∨',2),
+    'implies': ('→',2),
+}
+
+# Binding strength of binary operators (unary ones bind tighter than all)
+PRECEDENCE={'implies': 1,'or': 2,'and': 3}
+
+
+class Formula:
+    """
+    Hash-consed modal formula node: building the same formula twice gives
+    the same object, so shared subformulas are one node and equality and
+    hashing are identity. Build with Atom/Not/And/Or/Implies/Box/Diamond,
+    the operators ~ & | >> or parse_formula().
+    """
+    __slots__=("op","args","name","size","__weakref__")
+    _table=weakref.WeakValueDictionary()
+
+    def __new__(cls,op: str,args: Tuple["Formula",...] = (),name: str = None):
+        if op not in OPERATORS or len(args)!=OPERATORS[op][1]:
+            raise ValueError(f"Invalid formula node: {op} with {len(args)} argument(s)")
+        # Children are alive while their parent is, so their ids are stable keys
+        key=(op,name)+tuple(id(arg) for arg in args)
+        node=cls._table.get(key)
+        if node is None:
+            node=super().__new__(cls)
+            node.op=op
+            node.args=tuple(args)
+            node.name=name
+            node.size=1+sum(arg.size for arg in args)
+            cls._table[key]=node
+        return node
+
+    def __reduce__(self):
+        return (Formula,(self.op,self.args,self.name))
+
+    def __invert__(self) -> "Formula":
+        return Not(self)
+
+    def __and__(self,other: "Formula") -> "Formula":
+        return And(self,other)
+
+    def __or__(self,other: "Formula") -> "Formula":
+        return Or(self,other)
+
+    def __rshift__(self,other: "Formula") -> "Formula":
+        return Implies(self,other)
+
+    def subformulas(self) -> Iterator["Formula"]:
+        """Distinct subformulas, children before parents"""
+        seen=set()
+        stack=[(self,False)]
+        while stack:
+            node,expanded=stack.pop()
+            if node in seen:
+                continue
+            if expanded:
+                seen.add(node)
+                yield node
+                continue
+            stack.append((node,True))
+            stack.extend((arg,False) for arg in reversed(node.args) if arg not in seen)
+
+    def atoms(self) -> List[str]:
+        return [node.name for node in self.subformulas() if node.op=='atom']
+
+    def __str__(self):
+        return self._text(0)
+
+    def _text(self,context: int) -> str:
+        symbol,arity=OPERATORS[self.op]
+        if self.op=='atom':
+            return self.name
+        if arity==0:
+            return symbol
+        if arity==1:
+            return symbol+self.args[0]._text(len(PRECEDENCE)+1)
+        precedence=PRECEDENCE[self.op]
+        # → is right-associative, ∧ and ∨ left-associative
+        left,right=(precedence+1,precedence) if self.op=='implies' else (precedence,precedence+1)
+        text=f"{self.args[0]._text(left)} {symbol} {self.args[1]._text(right)}"
+        return f"({text})" if precedence<context else text
+
+    def __repr__(self):
+        return f"Formula({self})"
+
+
+def Atom(name: str) -> Formula:
+    return Formula('atom',name=name)
+
+def Not(formula: Formula) -> Formula:
+    return Formula('not',(formula,))
+
+def And(left: Formula,right: Formula) -> Formula:
+    return Formula('and',(left,right))
+
+def Or(left: Formula,right: Formula) -> Formula:
+    return Formula('or',(left,right))
+
+def Implies(left: Formula,right: Formula) -> Formula:
+    return Formula('implies',(left,right))
+
+def Box(formula: Formula,steps: int = 1) -> Formula:
+    for _ in range(steps):
+        formula=Formula('box',(formula,))
+    return formula
+
+def Diamond(formula: Formula,steps: int = 1) -> Formula:
+    for _ in range(steps):
+        formula=Formula('diamond',(formula,))
+    return formula
+
+TRUE=Formula('true')
+FALSE=Formula('false')
+
+# ==================== Parser ====================
+
+# Accepted spellings: symbols, ASCII and keywords
+TOKENS={
+    '¬': 'not','~': 'not','!': 'not','not': 'not',
+    '∧': 'and','&': 'and','&&': 'and','and': 'and',
+    '∨': 'or','|': 'or','||': 'or','or': 'or',
+    '→': 'implies','->': 'implies','=>': 'implies','implies': 'implies',
+    '□': 'box','[]': 'box','box': 'box','necessarily': 'box',
+    '◇': 'diamond','<>': 'diamond','diamond': 'diamond','possibly': 'diamond',
+    '⊤': 'true','true': 'true','⊥': 'false','false': 'false',
+    '(': '(',')': ')',
+}
+
+_TOKEN=re.compile(r"\s*(->|=>|&&|\|\||\[\]|<>|[¬~!∧&∨|→□◇⊤⊥()]|[A-Za-z_][A-Za-z0-9_]*)")
+
+
+def _tokenize(text: str) -> List[Tuple[str,str]]:
+    tokens=[]
+    position=0
+    text=text.rstrip()
+    while position<len(text):
+        match=_TOKEN.match(text,position)
+        if match is None:
+            raise ValueError(f"Unexpected character in formula at {position}: {text[position:]!r}")
+        word=match.group(1)
+        tokens.append((TOKENS.get(word,'atom'),word))
+        position=match.end()
+    return tokens
+
+
+class _Parser:
+    """Precedence climbing: ¬ □ ◇ > ∧ > ∨ > → (right-associative)"""
+
+    def __init__(self,text: str):
+        self.text=text
+        self.tokens=_tokenize(text)
+        self.position=0
+
+    def peek(self) -> str:
+        return self.tokens[self.position][0] if self.position<len(self.tokens) else None
+
+    def take(self,kind: str = None) -> Tuple[str,str]:
+        if self.position>=len(self.tokens) or (kind is not None and self.peek()!=kind):
+            found=self.tokens[self.position][1] if self.position<len(self.tokens) else 'end of formula'
+            raise ValueError(f"Expected {kind or 'a formula'} in {self.text!r}, found {found}")
+        token=self.tokens[self.position]
+        self.position+=1
+        return token
+
+    def parse(self) -> Formula:
+        formula=self.binary(1)
+        if self.position<len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position][1]!r} in {self.text!r}")
+        return formula
+
+    def binary(self,precedence: int) -> Formula:
+        left=self.unary()
+        while self.peek() in PRECEDENCE and PRECEDENCE[self.peek()]>=precedence:
+            op=self.take()[0]
+            right=self.binary(PRECEDENCE[op] if op=='implies' else PRECEDENCE[op]+1)
+            left=Formula(op,(left,right))
+        return left
+
+    def unary(self) -> Formula:
+        kind,word=self.take()
+        if kind in ('not','box','diamond'):
+            return Formula(kind,(self.unary(),))
+        if kind=='(':
+            formula=self.binary(1)
+            self.take(')')
+            return formula
+        if kind in ('true','false'):
+            return Formula(kind)
+        if kind=='atom':
+            return Atom(word)
+        raise ValueError(f"Unexpected {word!r} in {self.text!r}")
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(text: str) -> Formula:
+    """
+    Formula from text, e.g. "□(coughing_blood → ◇senior) ∧ ¬young" or
+    "[](coughing_blood -> <>senior) & ~young". Cached per text.
+    """
+    return _Parser(text).parse()
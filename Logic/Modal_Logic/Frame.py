@@ -0,0 +1,141 @@
+from typing import Dict,Sequence,Set
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+# Modal systems answered from cached closures
+SYSTEMS=("K","S4","S5")
+
+
+def _boolean(matrix: sparse.spmatrix) -> sparse.csr_matrix:
+    """Sparse 0/1 int32 CSR (counts from products clipped back to 1)"""
+    matrix=sparse.csr_matrix(matrix,dtype=np.int32)
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+    matrix.data[:]=1
+    return matrix
+
+
+class KripkeFrame:
+    """
+    Accessibility relation of a Kripke model as a sparse W x W matrix
+    (row: from, column: to). Truth sets are boolean vectors over worlds,
+    so box/diamond are evaluated for every world by one sparse mat-vec.
+
+    Worlds without an accessibility entry know nothing and consider
+    nothing possible (box and diamond both false), as ModalLogic.knows.
+    """
+
+    def __init__(self,worlds: Sequence,accessibility: Dict[object,Set]):
+        index={world: i for i,world in enumerate(worlds)}
+        rows,cols=[],[]
+        for world,accessible in accessibility.items():
+            if world not in index:
+                raise ValueError(f"Accessibility entry for unknown world: {world}")
+            for target in accessible:
+                if target not in index:
+                    raise ValueError(f"Accessible world not in the model: {target}")
+                rows.append(index[world])
+                cols.append(index[target])
+
+        n=len(worlds)
+        self.size=n
+        self.matrix=_boolean(sparse.coo_matrix((np.ones(len(rows),dtype=np.int32),(rows,cols)),shape=(n,n)))
+        self.has_entry=np.zeros(n,dtype=bool)
+        self.has_entry[[index[world] for world in accessibility]]=True
+        self._closure=None
+        self._classes=None
+
+    # ==================== Operators ====================
+
+    def successors(self,i: int) -> np.ndarray:
+        return self.matrix.indices[self.matrix.indptr[i]:self.matrix.indptr[i+1]]
+
+    def box(self,truth: np.ndarray,steps: int = 1,system: str = "K") -> np.ndarray:
+        """
+        Worlds where truth holds in every accessible world. truth: (W,) or
+        (W, K) booleans (K formulas at once). steps: iterated □ⁿ under K;
+        S4 and S5 use the reflexive-transitive closure or the equivalence
+        classes instead (iteration adds nothing there).
+        """
+        truth=np.asarray(truth,dtype=bool)
+        if system=="S5":
+            return self._class_all(truth)
+        relation=self._relation(system)
+        for _ in range(steps if system=="K" else 1):
+            failing=relation@(~truth).astype(np.int32)
+            truth=(failing==0)&self._entry(truth)
+        return truth
+
+    def diamond(self,truth: np.ndarray,steps: int = 1,system: str = "K") -> np.ndarray:
+        """Worlds with at least one accessible world where truth holds (◇ = ¬□¬)"""
+        truth=np.asarray(truth,dtype=bool)
+        if system=="S5":
+            return ~self._class_all(~truth)&self._entry(truth)
+        relation=self._relation(system)
+        for _ in range(steps if system=="K" else 1):
+            truth=((relation@truth.astype(np.int32))>0)&self._entry(truth)
+        return truth
+
+    def _entry(self,truth: np.ndarray) -> np.ndarray:
+        return self.has_entry if truth.ndim==1 else self.has_entry[:,None]
+
+    def _relation(self,system: str) -> sparse.csr_matrix:
+        if system not in SYSTEMS:
+            raise ValueError(f"Unknown modal system: {system} (expected: {SYSTEMS})")
+        return self.matrix if system=="K" else self.closure()
+
+    def _class_all(self,truth: np.ndarray) -> np.ndarray:
+        """Truth holds in every world of the world's S5 equivalence class"""
+        labels=self.equivalence_classes()
+        failing=np.zeros((labels.max(initial=-1)+1,)+truth.shape[1:],dtype=np.int64)
+        np.add.at(failing,labels,~truth)
+        return (failing[labels]==0)&self._entry(truth)
+
+    # ==================== Cached closures ====================
+
+    def closure(self) -> sparse.csr_matrix:
+        """Reflexive-transitive closure R* (S4 accessibility): one breadth-first search per world"""
+        if self._closure is None:
+            reached=[np.sort(csgraph.breadth_first_order(self.matrix,i,directed=True,return_predecessors=False))
+                     for i in range(self.size)]
+            indptr=np.concatenate([[0],np.cumsum([len(r) for r in reached])])
+            indices=np.concatenate(reached) if reached else np.zeros(0,dtype=np.int32)
+            self._closure=sparse.csr_matrix((np.ones(len(indices),dtype=np.int32),indices,indptr),shape=(self.size,self.size))
+        return self._closure
+
+    def equivalence_classes(self) -> np.ndarray:
+        """Class label per world under the equivalence closure of R (S5)"""
+        if self._classes is None:
+            _,self._classes=csgraph.connected_components(self.matrix,directed=True,connection="weak")
+        return self._classes
+
+    # ==================== Frame properties ====================
+
+    def is_reflexive(self) -> bool:
+        return bool(np.all(self.matrix.diagonal()>0))
+
+    def is_symmetric(self) -> bool:
+        return (self.matrix!=self.matrix.T).nnz==0
+
+    def is_transitive(self) -> bool:
+        """R∘R ⊆ R"""
+        return self._contained(self.matrix@self.matrix)
+
+    def is_euclidean(self) -> bool:
+        """wRu and wRv imply uRv: RᵀR ⊆ R"""
+        return self._contained(self.matrix.T@self.matrix)
+
+    def _contained(self,product: sparse.spmatrix) -> bool:
+        return (_boolean(product)>self.matrix).nnz==0
+
+    def frame_properties(self) -> Dict[str,bool]:
+        properties={
+            'reflexive': self.is_reflexive(),
+            'symmetric': self.is_symmetric(),
+            'transitive': self.is_transitive(),
+            'euclidean': self.is_euclidean(),
+        }
+        properties['S4']=properties['reflexive'] and properties['transitive']
+        properties['S5']=properties['reflexive'] and properties['euclidean']
+        return properties
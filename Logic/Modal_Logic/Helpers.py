@@ -1,141 +1,161 @@
-from typing import List,Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List,Dict,Iterable,Tuple,Union
 from Knowledge.Hierarchy import Symptom,Patient,RiskLevel
-from Logic.Modal_Logic.Engine import Proposition,ModalLogic,PossibleWorld
+from Logic.Modal_Logic.Engine import Proposition,ModalLogic,PossibleWorld,Threshold
+from Logic.Modal_Logic.Induction import ValuationCounts,induce_valuation
+import numpy as np
 import pandas as pd
 
+SYMPTOM_MAPPING={
+    'Air Pollution': 'air_pollution_exposure',
+    'Alcohol use': 'alcohol_use',
+    'Dust Allergy': 'dust_allergy',
+    'OccuPational Hazards': 'occupational_exposure',
+    'Chest Pain': 'chest_pain',
+    'Coughing of Blood': 'coughing_blood',
+    'Fatigue': 'fatigue',
+    'Weight Loss': 'weight_loss',
+    'Shortness of Breath': 'shortness_of_breath',
+    'Wheezing': 'wheezing',
+    'Swallowing Difficulty': 'swallowing_difficulty',
+    'Frequent Cold': 'frequent_cold',
+    'Dry Cough': 'dry_cough',
+    'Snoring': 'snoring'
+}
+
 def create_lung_disease_propositions() -> List[Proposition]:
 
     propositions=[
         Proposition(
             name="young",
             description="Patient is young (age < 30)",
-            fn=lambda p: p.age<30
+            fn=Threshold("age",high=30,high_strict=True)
         ),
 
         Proposition(
             name="middle_aged",
             description="Patient is middle-aged (30-50)",
-            fn=lambda p: 30<=p.age<=50
+            fn=Threshold("age",30,50)
         ),
 
         Proposition(
             name="senior",
             description="Patient is senior (age > 50)",
-            fn=lambda p: p.age>50
+            fn=Threshold("age",low=50,low_strict=True)
         ),
 
         Proposition(
             name="coughing_blood",
             description="Has coughing of blood",
-            fn=lambda p: p.has_symptom("coughing_blood",1)
+            fn=Threshold("coughing_blood",1)
         ),
 
         Proposition(
             name="chest_pain",
             description="Has chest pain (severity >= 5)",
-            fn=lambda p: p.has_symptom("chest_pain",5)
+            fn=Threshold("chest_pain",5)
         ),
 
         Proposition(
             name="shortness_of_breath",
             description="Has shortness of breath (severity >= 6)",
-            fn=lambda p: p.has_symptom("shortness_of_breath",6)
+            fn=Threshold("shortness_of_breath",6)
         ),
 
         Proposition(
             name="light_fatigue",
             description="Has fatigue (severity >= 6)",
-            fn=lambda p: p.has_symptom("fatigue",1)
+            fn=Threshold("fatigue",1)
         ),
 
         Proposition(
             name="fatigue",
             description="Has fatigue (severity >= 6)",
-            fn=lambda p: p.has_symptom("fatigue",3)
+            fn=Threshold("fatigue",3)
         ),
 
         Proposition(
             name="weight_loss",
             description="Has unexplained weight loss",
-            fn=lambda p: p.has_symptom("weight_loss",2)
+            fn=Threshold("weight_loss",2)
         ),
 
         Proposition(
             name="wheezing",
             description="Has wheezing",
-            fn=lambda p: p.has_symptom("wheezing",1)
+            fn=Threshold("wheezing",1)
         ),
 
         Proposition(
             name="swallowing_difficulty",
             description="Difficulty swallowing food",
-            fn=lambda p: p.has_symptom("swallowing_difficulty",2)
+            fn=Threshold("swallowing_difficulty",2)
         ),
 
         Proposition(
             name="smoker",
             description="Current or former smoker",
-            fn=lambda p: p.has_symptom("smoking_history",1)
+            fn=Threshold("smoking_history",1)
         ),
 
         Proposition(
             name="heavy_smoker",
             description="Heavy smoker (smoking severity >= 5)",
-            fn=lambda p: p.has_symptom("smoking_history",5)
+            fn=Threshold("smoking_history",5)
         ),
 
         Proposition(
             name="alcohol_use",
             description="Alcohol abuse (alcohol use >= 4)",
-            fn=lambda p: p.has_symptom("alcohol_use",4)
+            fn=Threshold("alcohol_use",4)
         ),
 
         Proposition(
             name="alcoholic",
             description="Alcoholic (alcohol_use >= 6)",
-            fn=lambda p: p.has_symptom("alcohol_use",6)
+            fn=Threshold("alcohol_use",6)
         ),
 
         Proposition(
             name="light_passive_smoker",
             description="Exposed to passive smoking",
-            fn=lambda p: p.has_symptom("passive_smoke_exposure",2)
+            fn=Threshold("passive_smoke_exposure",2)
         ),
 
         Proposition(
             name="heavy_passive_smoker",
             description="Exposed to alot of passive smoking",
-            fn=lambda p: p.has_symptom("passive_smoke_exposure",7)
+            fn=Threshold("passive_smoke_exposure",7)
         ),
 
         Proposition(
             name="occupational_hazards",
             description="Exposed to occupational hazards",
-            fn=lambda p: p.has_symptom("occupational_exposure",4)
+            fn=Threshold("occupational_exposure",4)
         ),
 
         Proposition(
             name="air_pollution",
             description="High exposure to air pollution",
-            fn=lambda p: p.has_symptom("air_pollution_exposure",4)
+            fn=Threshold("air_pollution_exposure",4)
         ),
 
         Proposition(
             name="frequent_cold",
             description="Frequent cold >= 4",
-            fn=lambda p: p.has_symptom("frequent_cold", 4),
+            fn=Threshold("frequent_cold",4),
         ),
 
         Proposition(
             name="dry_cough",
             description="Dry cough >= 4",
-            fn=lambda p: p.has_symptom("dry_cough", 4),
+            fn=Threshold("dry_cough",4),
         ),
 
         Proposition(
             name="snoring",
             description="Snores",
-            fn=lambda p: p.has_symptom("snoring", 1),
+            fn=Threshold("snoring",1),
         ),
     ]
     
@@ -179,27 +199,70 @@ def create_lung_disease_modal_model() -> ModalLogic:
     
     return ModalLogic(worlds=worlds,accessibility=accessibility,valuation=valuation,propositions=propositions_dict)
 
+# Fine-grained risk states (create_risk_state_model): stage x subtype x exposure
+STAGE_PROPOSITIONS={
+    RiskLevel.LOW: {"young","snoring","light_fatigue"},
+    RiskLevel.MEDIUM: {"middle_aged","weight_loss","shortness_of_breath","dry_cough","fatigue"},
+    RiskLevel.HIGH: {"senior","coughing_blood","chest_pain","wheezing","swallowing_difficulty"}
+}
+
+SUBTYPE_PROPOSITIONS={
+    "adenocarcinoma": {"weight_loss","fatigue"},
+    "squamous_cell": {"coughing_blood","chest_pain"},
+    "small_cell": {"shortness_of_breath","wheezing"}
+}
+
+# Ordered: exposure moves one step at a time
+EXPOSURE_PROPOSITIONS=[
+    ("no",set()),
+    ("passive",{"light_passive_smoker"}),
+    ("occupational",{"occupational_hazards","air_pollution"}),
+    ("smoking",{"smoker","alcohol_use"}),
+    ("heavy",{"heavy_smoker","heavy_passive_smoker","alcoholic"})
+]
+
+
+def create_risk_state_model(substages: int = 10) -> ModalLogic:
+    """
+    Kripke model over stage x subtype x exposure worlds, substages stages
+    per risk level (3 * substages * 3 * 5 worlds). A world reaches the
+    worlds of the same subtype at the same or next stage, with exposure
+    at most one step away.
+    """
+    levels=list(STAGE_PROPOSITIONS)
+    n_stages=len(levels)*substages
+    grid={}
+    for stage in range(n_stages):
+        level=levels[stage//substages]
+        for subtype,subtype_props in SUBTYPE_PROPOSITIONS.items():
+            for e,(exposure,exposure_props) in enumerate(EXPOSURE_PROPOSITIONS):
+                world=PossibleWorld(
+                    risk_level=level,
+                    description=f"{level.value} risk stage {stage%substages+1}, {subtype}, {exposure} exposure"
+                )
+                grid[stage,subtype,e]=(world,STAGE_PROPOSITIONS[level]|subtype_props|exposure_props)
+    
+    accessibility={}
+    for (stage,subtype,e),(world,_) in grid.items():
+        accessibility[world]={
+            grid[next_stage,subtype,next_e][0]
+            for next_stage in (stage,stage+1) if next_stage<n_stages
+            for next_e in (e-1,e,e+1) if 0<=next_e<len(EXPOSURE_PROPOSITIONS)
+        }
+    
+    propositions={prop.name: prop for prop in create_lung_disease_propositions()}
+    return ModalLogic(
+        worlds=[world for world,_ in grid.values()],
+        accessibility=accessibility,
+        valuation={world: props for world,props in grid.values()},
+        propositions=propositions
+    )
+
+
 def create_patient_from_csv_row(row: pd.Series) -> Patient:
     symptoms=[]
     
-    symptom_mapping={
-        'Air Pollution': 'air_pollution_exposure',
-        'Alcohol use': 'alcohol_use',
-        'Dust Allergy': 'dust_allergy',
-        'OccuPational Hazards': 'occupational_exposure',
-        'Chest Pain': 'chest_pain',
-        'Coughing of Blood': 'coughing_blood',
-        'Fatigue': 'fatigue',
-        'Weight Loss': 'weight_loss',
-        'Shortness of Breath': 'shortness_of_breath',
-        'Wheezing': 'wheezing',
-        'Swallowing Difficulty': 'swallowing_difficulty',
-        'Frequent Cold': 'frequent_cold',
-        'Dry Cough': 'dry_cough',
-        'Snoring': 'snoring'
-    }
-    
-    for csv_col,symptom_name in symptom_mapping.items():
+    for csv_col,symptom_name in SYMPTOM_MAPPING.items():
         severity=int(row[csv_col])
         symptoms.append(Symptom(name=symptom_name, severity=severity))
     
@@ -217,26 +280,144 @@ def create_patient_from_csv_row(row: pd.Series) -> Patient:
     )
 
 
-def analyze_dataset_with_kripke(df: pd.DataFrame) -> List[Dict]:
+def _int_column(column: pd.Series) -> np.ndarray:
+    """int() over a column (truncated), as float so it can hold NaN"""
+    values=column.to_numpy()
+    if values.dtype.kind in "iufb":
+        return np.trunc(values.astype(float))
+    return np.array([int(v) for v in values],dtype=float)
+
+
+def create_patient_columns(df: pd.DataFrame) -> Dict[str,Tuple[np.ndarray,np.ndarray]]:
+    """
+    Column-wise create_patient_from_csv_row:
+    symptom name (or 'age') -> (values, present) arrays, one entry per row.
+    """
+    everyone=np.ones(len(df),dtype=bool)
+    columns={symptom_name: (_int_column(df[csv_col]),everyone) for csv_col,symptom_name in SYMPTOM_MAPPING.items()}
+    
+    smoking=_int_column(df['Smoking'])
+    columns['smoking_history']=(smoking,smoking>=1)
+    
+    passive=_int_column(df['Passive Smoker'])
+    columns['passive_smoke_exposure']=(passive,passive>=1)
+    
+    columns['age']=(_int_column(df['Age']),everyone)
+    return columns
+
+
+def create_patients_from_columns(df: pd.DataFrame,columns: Dict[str,Tuple[np.ndarray,np.ndarray]]) -> List[Patient]:
+    """create_patient_from_csv_row for every row, from create_patient_columns (no iterrows)"""
+    names=list(SYMPTOM_MAPPING.values())+['smoking_history','passive_smoke_exposure']
+    values=np.column_stack([columns[name][0] for name in names]).astype(np.int64).tolist()
+    present=np.column_stack([columns[name][1] for name in names]).tolist()
+    ages=columns['age'][0].astype(np.int64).tolist()
+    genders=["M" if gender==1 else "F" for gender in _int_column(df['Gender']).astype(np.int64).tolist()]
+    
+    return [
+        Patient(id=patient_id,age=age,gender=gender,symptoms=[
+            Symptom(name=name,severity=severity) for name,severity,keep in zip(names,row,flags) if keep
+        ])
+        for patient_id,age,gender,row,flags in zip(df['Patient Id'].tolist(),ages,genders,values,present)
+    ]
+
+
+def _risk_labels(levels: pd.Series) -> List[str]:
+    """'Level' column as RiskLevel values ('Low', 'Medium', 'High'), as analyze_dataset_with_kripke reads it"""
+    return [str(level).strip().capitalize() for level in levels.tolist()]
+
+
+def _count_chunk(model: ModalLogic,df: pd.DataFrame) -> ValuationCounts:
+    columns=create_patient_columns(df)
+    patients=create_patients_from_columns(df,columns) if model.opaque_propositions else None
+    matrix=model.evaluate_columns(columns,len(df),patients)
+    counts=ValuationCounts([level.value for level in RiskLevel],list(model.propositions))
+    return counts.update(matrix,_risk_labels(df['Level']))
+
+
+# Model of the counting processes
+_WORKER_MODEL=None
+
+
+def _init_counting_worker(model: ModalLogic):
+    global _WORKER_MODEL
+    _WORKER_MODEL=model
+
+
+def _count_in_worker(df: pd.DataFrame) -> ValuationCounts:
+    return _count_chunk(_WORKER_MODEL,df)
+
+
+def count_valuations(data: Union[pd.DataFrame,Iterable[pd.DataFrame]],model: ModalLogic = None,
+                     chunksize: int = 100_000,n_jobs: int = 1) -> ValuationCounts:
+    """
+    Proposition-by-risk-level counts over a labelled dataset, chunk by
+    chunk: data is a DataFrame or an iterable of them (e.g.
+    pd.read_csv(path, chunksize=...)), so it never has to fit in memory.
+    With n_jobs > 1 chunks are counted in worker processes, at most
+    2 * n_jobs chunks in flight, and their counts merged.
+    """
+    model=model or create_lung_disease_modal_model()
+    chunks=data
+    if isinstance(data,pd.DataFrame):
+        chunks=(data.iloc[start:start+chunksize] for start in range(0,len(data),chunksize))
+    
+    total=ValuationCounts([level.value for level in RiskLevel],list(model.propositions))
+    if n_jobs<=1:
+        for chunk in chunks:
+            total=total+_count_chunk(model,chunk)
+        return total
+    
+    with ProcessPoolExecutor(max_workers=n_jobs,initializer=_init_counting_worker,initargs=(model,)) as pool:
+        pending=[]
+        for chunk in chunks:
+            pending.append(pool.submit(_count_in_worker,chunk))
+            if len(pending)>=2*n_jobs:
+                total=total+pending.pop(0).result()
+        for future in pending:
+            total=total+future.result()
+    return total
+
+
+def create_induced_modal_model(counts: ValuationCounts,template: ModalLogic = None,**criteria) -> ModalLogic:
+    """
+    Lung disease model whose world valuations are learned from counts
+    (see induce_valuation for criteria) instead of written by hand:
+    worlds, accessibility and propositions come from template
+    (create_lung_disease_modal_model by default).
+    """
+    template=template or create_lung_disease_modal_model()
+    valuation=induce_valuation(counts,**criteria)
+    return ModalLogic(
+        worlds=list(template.worlds),
+        accessibility=template.accessibility,
+        valuation={world: valuation.get(world.risk_level.value,set()) for world in template.worlds},
+        propositions=template.propositions
+    )
+
+
+def analyze_dataset_with_kripke(df: pd.DataFrame,model: ModalLogic = None) -> List[Dict]:
     
-    model=create_lung_disease_modal_model()
+    model=model or create_lung_disease_modal_model()
     results=[]
     
     print("Analyzing patients with Kripke semantics...\n")
     
-    for idx,row in df.iterrows():
-        patient=create_patient_from_csv_row(row)
-        
-        likely_worlds=model.get_most_likely_worlds(patient, top_n=3)
-        
+    # All propositions for all rows as column comparisons, then ranking for all rows at once
+    columns=create_patient_columns(df)
+    patients=create_patients_from_columns(df,columns)
+    matrix=model.evaluate_columns(columns,len(df),patients)
+    ranked=model.get_most_likely_worlds_batch(model.masks_from_matrix(matrix),top_n=3)
+    
+    for idx,level,patient,likely_worlds in zip(df.index,df['Level'].tolist(),patients,ranked):
         try:
-            actual_risk=RiskLevel(row['Level'])
+            actual_risk=RiskLevel(level)
         except ValueError:
-            level_str=str(row['Level']).strip().capitalize()
+            level_str=str(level).strip().capitalize()
             if level_str in ['Low','Medium','High']:
                 actual_risk=RiskLevel(level_str)
             else:
-                print(f"Warning: Unknown risk level '{row['Level']}' for patient {patient.id}")
+                print(f"Warning: Unknown risk level '{level}' for patient {patient.id}")
                 continue
         
         predicted_risk=likely_worlds[0]['risk_level'] if likely_worlds else None
@@ -313,4 +494,12 @@ def demonstrate_modal_operators(model: ModalLogic,patient: Patient):
         print(f"  Possible (true in some accessible world): {possible}")
         
         necessary=model.necessarily(current_world, prop_name)
-        print(f"  Necessary: {necessary}")
\ No newline at end of file
+        print(f"  Necessary: {necessary}")
+    
+    test_formulas=["□(coughing_blood → chest_pain)","◇senior ∧ ¬□young","□◇(smoker ∨ heavy_smoker)"]
+    
+    print("\nModal Formulas:")
+    print("-" * 40)
+    
+    for formula in test_formulas:
+        print(f"  {formula}: {model.holds(current_world,formula)}")
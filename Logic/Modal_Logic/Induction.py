@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Dict,List,Sequence,Set
+import numpy as np
+
+# Scores a proposition can be ranked by when it is chosen for a world
+CRITERIA=("lift","information_gain")
+
+
+@dataclass
+class ValuationCounts:
+    """
+    Proposition-by-class frequency table: counts[c, p] rows of class c
+    where proposition p holds, totals[c] rows of class c. Accumulated
+    chunk by chunk with update(); tables from other chunks or processes
+    are combined with merge() (or +).
+    """
+    classes: List[str]
+    propositions: List[str]
+    counts: np.ndarray=None
+    totals: np.ndarray=None
+
+    def __post_init__(self):
+        if self.counts is None:
+            self.counts=np.zeros((len(self.classes),len(self.propositions)),dtype=np.int64)
+        if self.totals is None:
+            self.totals=np.zeros(len(self.classes),dtype=np.int64)
+
+    def update(self,matrix: np.ndarray,labels: Sequence) -> "ValuationCounts":
+        """
+        Add one chunk: matrix (n, P) proposition truth (ModalLogic.evaluate_columns),
+        labels (n,) class of each row. Rows with a label outside classes are skipped.
+        """
+        matrix=np.asarray(matrix,dtype=bool)
+        if matrix.shape[1]!=len(self.propositions):
+            raise ValueError(f"Expected {len(self.propositions)} proposition columns, got {matrix.shape[1]}")
+        codes={label: c for c,label in enumerate(self.classes)}
+        rows=np.array([codes.get(label,-1) for label in labels],dtype=np.int64)
+        known=rows>=0
+
+        # One (C, n) @ (n, P) product per chunk: one-hot classes against the truth matrix
+        onehot=np.zeros((len(self.classes),int(known.sum())))
+        onehot[rows[known],np.arange(onehot.shape[1])]=1.
+        self.counts+=np.rint(onehot@matrix[known]).astype(np.int64)
+        self.totals+=np.bincount(rows[known],minlength=len(self.classes))
+        return self
+
+    def merge(self,other: "ValuationCounts") -> "ValuationCounts":
+        if other.classes!=self.classes or other.propositions!=self.propositions:
+            raise ValueError("Cannot merge counts over different classes or propositions")
+        return ValuationCounts(self.classes,self.propositions,self.counts+other.counts,self.totals+other.totals)
+
+    def __add__(self,other: "ValuationCounts") -> "ValuationCounts":
+        return self.merge(other)
+
+    @property
+    def rows(self) -> int:
+        return int(self.totals.sum())
+
+    def support(self) -> np.ndarray:
+        """P(p | c), (C, P)"""
+        with np.errstate(divide='ignore',invalid='ignore'):
+            return np.where(self.totals[:,None]>0,self.counts/self.totals[:,None],0.)
+
+    def lift(self) -> np.ndarray:
+        """P(p | c) / P(p), (C, P); 0 where p never holds"""
+        base=self.counts.sum(axis=0)/max(self.rows,1)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            return np.where(base>0,self.support()/base,0.)
+
+    def information_gain(self) -> np.ndarray:
+        """Mutual information in bits between p and "row is of class c", (C, P)"""
+        n=max(self.rows,1)
+        p_true=self.counts.sum(axis=0)/n
+        p_class=(self.totals/n)[:,None]
+        both=self.counts/n
+        cells=[
+            (both,p_true,p_class),
+            (p_true-both,p_true,1-p_class),
+            (p_class-both,1-p_true,p_class),
+            (1-p_true-p_class+both,1-p_true,1-p_class),
+        ]
+        gain=np.zeros(self.counts.shape)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            for joint,px,py in cells:
+                gain+=np.where(joint>0,joint*np.log2(joint/(px*py)),0.)
+        return np.maximum(gain,0.)
+
+
+def induce_valuation(counts: ValuationCounts,criterion: str = "lift",min_lift: float = 1.2,
+                     min_support: float = 0.3,max_size: int = None) -> Dict[str,Set[str]]:
+    """
+    Valuation per class: the propositions over-represented in it (lift at
+    least min_lift) and frequent enough in it (P(p | c) at least
+    min_support), best criterion first, at most max_size of them.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unknown criterion: {criterion} (expected: {CRITERIA})")
+    lift=counts.lift()
+    support=counts.support()
+    scores=lift if criterion=="lift" else counts.information_gain()
+
+    valuation={}
+    for c,label in enumerate(counts.classes):
+        chosen=np.flatnonzero((lift[c]>=min_lift)&(support[c]>=min_support))
+        # Stable sort: proposition order breaks ties
+        chosen=chosen[np.argsort(-scores[c,chosen],kind='stable')][:max_size]
+        valuation[label]={counts.propositions[p] for p in chosen}
+    return valuation
@@ -16,6 +16,8 @@ from ..Helpers.funcs import Funcs
 
 from ..state.shared import patient_data
 
+from Logic.Belief_Functions.Session import BeliefSession
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 image_path = os.path.join(BASE_DIR, "..", "assets", "lung-cancer.webp")
 
@@ -46,6 +48,8 @@ class SymptomsPage(QWidget, ResponsiveMixin):
         patient_data["symptoms"] = {}
 
         self.symptom_sliders = {}
+        # Live belief output, updated per slider move without rebuilding a row
+        self.belief_session = BeliefSession()
 
         self.navbar = Navbar(self.stack)
         # content image
@@ -94,6 +98,10 @@ class SymptomsPage(QWidget, ResponsiveMixin):
         self.sliders_layout = QVBoxLayout()
         self.sliders_layout.setSpacing(10)
 
+        # Live belief estimate, refreshed on every slider move
+        self.belief_label = QLabel()
+        self.belief_label.setStyleSheet("font-size: 13px; color: #2c3e50;")
+
         # Method selecting (Modal, Default, Fuzzy)
         self.method_dropdown = QComboBox()
         self.method_dropdown.addItems([
@@ -154,6 +162,7 @@ class SymptomsPage(QWidget, ResponsiveMixin):
         right_col = QVBoxLayout()
         right_col.addLayout(select_row)
         right_col.addLayout(self.sliders_layout) 
+        right_col.addWidget(self.belief_label)
         right_col.addWidget(self.next_btn, alignment=Qt.AlignCenter)
         right_col.addStretch() 
 
@@ -202,6 +211,8 @@ class SymptomsPage(QWidget, ResponsiveMixin):
             "key": SYMPTOMS[symptom],
             "severity": 1
         }
+        self.update_belief(symptom, 1)
+
     def remove_range(self, symptom):
         if symptom not in self.symptom_sliders:
             return
@@ -214,6 +225,18 @@ class SymptomsPage(QWidget, ResponsiveMixin):
 
         patient_data.setdefault("symptoms_severity", {})
         patient_data["symptoms_severity"].pop(symptom, None)
+        self.update_belief(symptom, 0)
 
     def on_slid_change(self, symptom, value):
         patient_data["symptoms"][symptom]["severity"] = value
+        self.update_belief(symptom, value)
+
+    def update_belief(self, symptom, value):
+        self.belief_session.set(symptom, value)
+        if not self.symptom_sliders:
+            self.belief_label.setText("")
+            return
+
+        result = self.belief_session.result()
+        beliefs = ", ".join(f"{level.value} {belief:.0%}" for level, belief in result["beliefs"].items())
+        self.belief_label.setText(f"Live belief: {result['predicted'].value} ({beliefs})")
@@ -0,0 +1,102 @@
+import random
+import time
+from Knowledge.Hierarchy import Patient, Symptom, RiskLevel
+from Logic.Default_Logic.Engine import DefaultRule, ReiterDefaultEngine
+
+
+RULE_COUNTS = [10, 1000, 10000]
+N_PATIENTS = 2000
+N_FACT_NAMES = 5000
+FACTS_PER_PATIENT = 15
+
+
+def sequential_evaluate(engine, patient):
+    """Per-rule scan, as the engine did before rules were compiled"""
+    facts = engine._extract_facts(patient)
+
+    applied_rules = []
+    final_risk = RiskLevel.LOW
+
+    for rule in engine.rules:
+        if rule.prerequisite in facts:
+            if engine._is_consistent(rule.justification, facts):
+                applied_rules.append(rule.name)
+
+                if engine._risk_value(rule.conclusion) > engine._risk_value(final_risk):
+                    final_risk = rule.conclusion
+
+    return final_risk, applied_rules
+
+
+def make_rules(n, rng):
+    return [
+        DefaultRule(
+            f"R{i}",
+            f"finding_{rng.randrange(N_FACT_NAMES)}",
+            rng.choice(["HighRisk", "MediumRisk"]),
+            rng.choice([RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH])
+        )
+        for i in range(n)
+    ]
+
+
+def make_patients(rng):
+    return [
+        Patient(
+            id=str(i),
+            age=rng.randint(18, 90),
+            gender="M",
+            symptoms=[
+                Symptom(f"finding_{rng.randrange(N_FACT_NAMES)}", rng.randint(1, 9))
+                for _ in range(FACTS_PER_PATIENT)
+            ]
+        )
+        for i in range(N_PATIENTS)
+    ]
+
+
+def throughput(fn, patients):
+    start = time.perf_counter()
+    for patient in patients:
+        fn(patient)
+    return len(patients) / (time.perf_counter() - start)
+
+
+def main():
+    rng = random.Random(0)
+    patients = make_patients(rng)
+
+    print("=" * 60)
+    print("REITER DEFAULT LOGIC - RULE NETWORK BENCHMARK")
+    print("=" * 60)
+    print(f"{N_PATIENTS} patients, {FACTS_PER_PATIENT} facts each\n")
+    print(f"{'rules':>8} | {'sequential (pat/s)':>18} | {'network (pat/s)':>16} | {'speedup':>7}")
+    print("-" * 60)
+
+    for n_rules in RULE_COUNTS:
+        engine = ReiterDefaultEngine(make_rules(n_rules, rng))
+        engine.network     # compile outside the timed loop
+
+        for patient in patients[:50]:
+            evaluation = engine.evaluate(patient)
+            assert (evaluation["predicted"], evaluation["applied_rules"]) == sequential_evaluate(engine, patient)
+
+        sequential = throughput(lambda p: sequential_evaluate(engine, p), patients)
+        network = throughput(engine.evaluate, patients)
+
+        print(f"{n_rules:>8} | {sequential:>18.0f} | {network:>16.0f} | {network / sequential:>6.1f}x")
+
+    # Incremental: one fact changes per update
+    engine = ReiterDefaultEngine(make_rules(RULE_COUNTS[-1], rng))
+    session = engine.session(patients[0])
+    changes = [{f"finding_{rng.randrange(N_FACT_NAMES)}": rng.randint(1, 9)} for _ in range(N_PATIENTS)]
+
+    start = time.perf_counter()
+    for change in changes:
+        session.update(change)
+    rate = len(changes) / (time.perf_counter() - start)
+    print(f"\nIncremental session, {RULE_COUNTS[-1]} rules: {rate:.0f} single-fact updates/s")
+
+
+if __name__ == "__main__":
+    main()
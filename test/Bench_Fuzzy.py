@@ -0,0 +1,103 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from Logic.Fuzzy_logic.Engine import DEFINITION, FuzzyLungDiseaseSystem
+from Logic.Fuzzy_logic.Hierarchical import HierarchicalFuzzySystem
+from Logic.Fuzzy_logic.Snapshot import FuzzySnapshot, load_snapshot
+
+
+REPEATS = 7
+COMPACT_ROWS = 100_000
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startup of a fresh process (imports included), as paid by each pool worker
+STARTUP = {
+    "skfuzzy ControlSystem": (
+        "from Logic.Fuzzy_logic.Engine import FuzzyLungDiseaseSystem\n"
+        "FuzzyLungDiseaseSystem().system"
+    ),
+    "snapshot, cold cache": (
+        "from Logic.Fuzzy_logic.Engine import DEFINITION, FuzzyLungDiseaseSystem\n"
+        "from Logic.Fuzzy_logic.Snapshot import load_snapshot\n"
+        "FuzzyLungDiseaseSystem(snapshot=load_snapshot(DEFINITION, {cache!r}))"
+    ),
+    "snapshot, warm cache": (
+        "from Logic.Fuzzy_logic.Engine import DEFINITION, FuzzyLungDiseaseSystem\n"
+        "from Logic.Fuzzy_logic.Snapshot import load_snapshot\n"
+        "FuzzyLungDiseaseSystem(snapshot=load_snapshot(DEFINITION, {cache!r}))"
+    ),
+}
+
+
+def process_startup(code: str) -> float:
+    """Milliseconds from interpreter start to a ready engine"""
+    timed = f"import time\nstart = time.perf_counter()\n{code}\nprint((time.perf_counter() - start) * 1000)"
+    result = subprocess.run([sys.executable, "-c", timed], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def in_process(fn) -> float:
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    print("=" * 60)
+    print("FUZZY SYSTEM - STARTUP BENCHMARK")
+    print("=" * 60)
+    print(f"median of {REPEATS} runs\n")
+
+    print(f"{'new process':<28} | {'ms':>8}")
+    print("-" * 40)
+    with tempfile.TemporaryDirectory() as cache:
+        for name, code in STARTUP.items():
+            times = []
+            for _ in range(REPEATS):
+                if name == "snapshot, cold cache":
+                    for entry in os.listdir(cache):
+                        os.remove(os.path.join(cache, entry))
+                times.append(process_startup(code.format(cache=cache)))
+            print(f"{name:<28} | {statistics.median(times):>8.1f}")
+
+    snapshot = load_snapshot(DEFINITION)
+    print(f"\n{'in process (modules loaded)':<28} | {'ms':>8}")
+    print("-" * 40)
+    rows = {
+        "skfuzzy ControlSystem": lambda: FuzzyLungDiseaseSystem(snapshot=snapshot).setup_fuzzy_system(),
+        "compile snapshot": lambda: FuzzySnapshot.compile(DEFINITION),
+        "load snapshot file": lambda: load_snapshot(DEFINITION),
+        "engine from snapshot": lambda: FuzzyLungDiseaseSystem(snapshot=snapshot),
+    }
+    for name, fn in rows.items():
+        print(f"{name:<28} | {in_process(fn):>8.2f}")
+
+    # Rule-base compaction: report, then full vs compacted mamdani inference
+    system = FuzzyLungDiseaseSystem(snapshot=snapshot)
+    full = FuzzyLungDiseaseSystem(snapshot=snapshot, compact=False)
+    print()
+    print("\n".join(system.rule_report.summary()))
+    rng = np.random.default_rng(0)
+    x = np.column_stack([rng.uniform(0, 10, (COMPACT_ROWS, 6)), rng.uniform(0, 100, COMPACT_ROWS)])
+    print(f"\n{f'compute_batch, {COMPACT_ROWS} rows':<28} | {'ms':>8}")
+    print("-" * 40)
+    for name, engine in (("all rules", full), ("compacted rules", system)):
+        print(f"{name:<28} | {in_process(lambda: engine.compute_batch(x)):>8.1f}")
+
+    # Cascaded subsystems over all 15 symptoms (16 inputs, rules grow linearly)
+    hierarchy = HierarchicalFuzzySystem()
+    extra = rng.uniform(0, 10, (COMPACT_ROWS, len(hierarchy.input_names) - x.shape[1]))
+    counts = ", ".join(f"{stage.name} {len(stage.rule_names)}" for stage in hierarchy.stages + [hierarchy.top])
+    print(f"{f'hierarchical, {len(hierarchy.rule_names)} rules':<28} | "
+          f"{in_process(lambda: hierarchy.compute_batch(np.hstack([x, extra]))):>8.1f}  ({counts})")
+
+
+if __name__ == "__main__":
+    main()
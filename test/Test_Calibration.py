@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from Logic.Belief_Functions.Calibration import BeliefCalibrator
+from Logic.Belief_Functions.Engine import BeliefEngine, BeliefParameters
+
+
+def synthetic_rows(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    """Labeled rows with every column the engine reads (no data/lung_cancer.csv needed)"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({name: rng.integers(1, 10, n) for name in BeliefParameters().columns()})
+    df["Level"] = rng.choice(["Low", "Medium", "High"], n)
+    return df
+
+
+def engine_accuracy(params: BeliefParameters, df: pd.DataFrame) -> float:
+    predicted = BeliefEngine(params).infer_batch(df)["predicted"]
+    return float(np.mean([p.value == level for p, level in zip(predicted, df["Level"])]))
+
+
+def main():
+    print("=" * 60)
+    print("CALIBRATION OBJECTIVE VS ENGINE ACCURACY")
+    print("=" * 60)
+
+    df = synthetic_rows()
+    calibrator = BeliefCalibrator(df, n_jobs=1)
+    space = calibrator.space
+
+    # Corner of the bounds where competition makes the total evidence negative
+    corner = space.bounds[:, 1].copy()
+    for i, (attr, _) in enumerate(space.slots):
+        if attr == "gate_threshold":
+            corner[i] = space.bounds[i, 0]
+
+    rng = np.random.default_rng(1)
+    candidates = np.vstack([corner, space.to_vector(calibrator.params), space.sample(100, rng)])
+    scores = calibrator.score(candidates)
+
+    for candidate, score in zip(candidates, scores):
+        expected = engine_accuracy(space.to_params(candidate), df)
+        assert abs(score - expected) < 1e-12, (score, expected)
+
+    print(f"\n{len(candidates)} candidates: objective == engine accuracy")
+    print(f"Corner candidate accuracy: {scores[0]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import itertools
+import numpy as np
+import pandas as pd
+from Knowledge.Hierarchy import RiskLevel
+from Logic.Default_Logic.Analytics import analyze_rule_firing
+from Logic.Default_Logic.Engine import DefaultRule, ReiterDefaultEngine
+from Logic.Default_Logic.Helpers import (SYMPTOM_MAP, create_patient_from_csv_row, evaluate_dataframe,
+                                         get_lung_cancer_default_rules)
+from Logic.Default_Logic.Table import DecisionTable
+
+PREREQUISITES = [f"fact_{k}" for k in range(6)]
+JUSTIFICATIONS = ["J0", "J1", "J2", "Always", "Never"]
+
+
+class FlagEngine(ReiterDefaultEngine):
+    """Justification Jk is consistent when the fact ok_Jk holds; Always / Never are constants"""
+
+    justification_facts = {**{j: (f"ok_{j}",) for j in JUSTIFICATIONS[:3]}, "Always": (), "Never": ()}
+
+    def _is_consistent(self, justification, facts):
+        if justification in ("Always", "Never"):
+            return justification == "Always"
+        return bool(facts.get(f"ok_{justification}", False))
+
+
+def check_table(rng: np.random.Generator):
+    """Every entry of the table against RuleNetwork.match on the facts it stands for"""
+    rules = [
+        DefaultRule(f"R{i}", str(rng.choice(PREREQUISITES)), str(rng.choice(JUSTIFICATIONS)), rng.choice(list(RiskLevel)))
+        for i in range(12)
+    ]
+    engine = FlagEngine(rules)
+    network = engine.network
+    table = DecisionTable.compile(network)
+    offset = len(table.prerequisites)
+
+    for index in range(1 << table.bits):
+        facts = {p: 1 for bit, p in enumerate(table.prerequisites) if (index >> bit) & 1}
+        facts.update({f"ok_{j}": True for k, j in enumerate(table.justifications) if (index >> (offset + k)) & 1})
+
+        risk, applied = network.match(facts)
+        assert table.risks[index] == risk, (index, table.risks[index], risk)
+        assert table.names(index) == [network.rules[i].name for i in applied], index
+
+        # index() only sets a justification bit when a prerequisite it guards is present
+        expected = index
+        for justification, bit, watched in table.watch:
+            if not index & watched:
+                expected &= ~bit
+        assert table.index(facts) == expected
+    return table.bits
+
+
+def synthetic_rows(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    """CSV layout with a few unreadable cells and levels"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({column: rng.integers(1, 10, n).astype(object) for column in SYMPTOM_MAP})
+    df["Smoking"] = rng.integers(0, 10, n)
+    df["Age"] = rng.integers(14, 90, n).astype(float)
+    df.loc[rng.random(n) < 0.05, "Age"] = np.nan
+    df.loc[rng.random(n) < 0.05, "Coughing of Blood"] = "n/a"
+    df.loc[rng.random(n) < 0.05, "Air Pollution"] = "7.9"
+    df["Gender"] = rng.integers(1, 3, n)
+    df["Patient Id"] = [f"P{i}" for i in range(n)]
+    df["Level"] = rng.choice(["Low", "Medium", "High", "high", "unknown"], n)
+    return df
+
+
+def check_dataframe(engine: ReiterDefaultEngine, df: pd.DataFrame):
+    """evaluate_dataframe against evaluate() on Patients built row by row"""
+    evaluation = evaluate_dataframe(df, engine)
+    for i, (_, row) in enumerate(df.iterrows()):
+        single = engine.evaluate(create_patient_from_csv_row(row))
+        assert evaluation["predicted"][i] == single["predicted"], i
+        assert engine.rules_from_mask(evaluation["applied_mask"][i]) == single["applied_rules"], i
+
+
+def check_firing(engine: ReiterDefaultEngine, df: pd.DataFrame):
+    """analyze_rule_firing counters against a loop over evaluate()"""
+    stats = analyze_rule_firing(df, engine, chunk_size=701, verbose=False)
+    names = [rule.name for rule in engine.rules]
+    rank = engine._risk_value
+    fires, hits, decisive, shadowed, errors = (dict.fromkeys(names, 0) for _ in range(5))
+    cofiring = pd.DataFrame(0, index=names, columns=names)
+
+    for _, row in df.iterrows():
+        result = engine.evaluate(create_patient_from_csv_row(row))
+        level = str(row["Level"]).capitalize()
+        actual = RiskLevel(level) if level in ("Low", "Medium", "High") else None
+        for a, b in itertools.product(result["applied_rules"], repeat=2):
+            cofiring.loc[a, b] += 1
+        for rule in engine.rules:
+            if rule.name not in result["applied_rules"]:
+                continue
+            fires[rule.name] += 1
+            hits[rule.name] += actual is not None and rank(rule.conclusion) == rank(actual)
+            decisive[rule.name] += rank(rule.conclusion) == rank(result["predicted"])
+            shadowed[rule.name] += rank(rule.conclusion) < rank(result["predicted"])
+            errors[rule.name] += actual is not None and result["predicted"] != actual
+
+    summary = stats.summary()
+    assert summary["fires"].to_dict() == fires
+    assert summary["decisive"].to_dict() == decisive
+    assert summary["shadowed"].to_dict() == shadowed
+    assert summary["errors"].to_dict() == errors
+    assert (stats.cofiring_matrix() == cofiring).all().all()
+    assert stats.hits.tolist() == [hits[name] for name in names]
+
+
+def main():
+    print("=" * 60)
+    print("DEFAULT LOGIC: TABLE, COLUMNS AND FIRING ANALYTICS")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        bits = check_table(rng)
+    print(f"\nDecisionTable: every entry == RuleNetwork.match (5 rule sets, up to {bits} bits)")
+
+    df = synthetic_rows()
+    engine = ReiterDefaultEngine(get_lung_cancer_default_rules())
+    assert engine.table is not None
+    check_dataframe(engine, df)
+    check_dataframe(engine, df.drop(columns=["Smoking", "Chest Pain", "Age"]))
+
+    # Past TABLE_MAX_BITS the network answers directly
+    engine.rules += [DefaultRule(f"X{k}", f"extra_{k}", "MediumRisk", RiskLevel.MEDIUM) for k in range(20)]
+    assert engine.table is None
+    check_dataframe(engine, df)
+    print(f"evaluate_dataframe == evaluate() on {len(df)} rows, with and without a table")
+
+    engine = ReiterDefaultEngine(get_lung_cancer_default_rules())
+    check_firing(engine, df)
+    print("analyze_rule_firing counters == direct loop")
+
+    # Without Level nothing is labeled: no precision, no accuracy
+    stats = analyze_rule_firing(df.drop(columns=["Level"]), engine, verbose=False)
+    assert stats.labeled == 0 and stats.accuracy() is None
+    assert stats.fires.sum() > 0
+    assert all(value is None for value in stats.summary()["precision"])
+    print("No Level column: precision and accuracy are None")
+
+
+if __name__ == "__main__":
+    main()
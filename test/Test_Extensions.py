@@ -0,0 +1,69 @@
+from Knowledge.Hierarchy import Patient, RiskLevel, Symptom
+from Logic.Default_Logic.Engine import DefaultRule, ReiterDefaultEngine
+from Logic.Default_Logic.Extensions import ExtensionSolver, RISK_LITERALS
+
+
+def main():
+    print("=" * 60)
+    print("REITER EXTENSIONS - NIXON DIAMOND")
+    print("=" * 60)
+
+    engine = ReiterDefaultEngine([])
+
+    # Quakers are pacifists, republicans are not: Nixon is both
+    rules = [
+        DefaultRule("quaker", "quaker", "pacifist", "pacifist"),
+        DefaultRule("republican", "republican", "~pacifist", "~pacifist"),
+    ]
+    solved = ExtensionSolver(rules, engine).solve({"quaker", "republican"})
+    extensions = {ext.literals for ext in solved["extensions"]}
+
+    assert solved["complete"]
+    assert extensions == {
+        frozenset({"quaker", "republican", "pacifist"}),
+        frozenset({"quaker", "republican", "~pacifist"}),
+    }, extensions
+    skeptical = frozenset.intersection(*extensions)
+    assert skeptical == {"quaker", "republican"}
+    print(f"\nExtensions: {sorted(sorted(e) for e in extensions)}")
+    print(f"Skeptical: {sorted(skeptical)}")
+
+    # Only one side applies: a single extension
+    solved = ExtensionSolver(rules, engine).solve({"quaker"})
+    assert [ext.literals for ext in solved["extensions"]] == [frozenset({"quaker", "pacifist"})]
+
+    # Cached results are handed out as copies
+    solver = ExtensionSolver(rules, engine)
+    first = solver.solve({"quaker", "republican"})
+    first["extensions"][0].applied.append(99)
+    first["extensions"].clear()
+    again = solver.solve({"quaker", "republican"})
+    assert {ext.literals for ext in again["extensions"]} == extensions
+    assert all(99 not in ext.applied for ext in again["extensions"])
+
+    # Replacing a rule of the engine rebuilds its solver
+    engine = ReiterDefaultEngine(list(rules))
+    patient = Patient("nixon", 60, "M", [Symptom("quaker", 1), Symptom("republican", 1)])
+    assert len(engine.extensions(patient)["extensions"]) == 2
+    engine.rules[1] = DefaultRule("republican", "republican", "hawk", "hawk")
+    result = engine.extensions(patient)
+    assert [sorted(ext["conclusions"]) for ext in result["extensions"]] == [["hawk", "pacifist"]], result
+    print("Cached copies and rule replacement: ok")
+
+    # limit stops the search early
+    solved = ExtensionSolver(rules, engine).solve({"quaker", "republican"}, limit=1)
+    assert len(solved["extensions"]) == 1 and not solved["complete"]
+
+    # Same diamond over exclusive risk levels: HIGH and MEDIUM defaults compete
+    risk_rules = [
+        DefaultRule("blood", "coughing_blood", RiskLevel.HIGH, RiskLevel.HIGH),
+        DefaultRule("fatigue", "fatigue", RiskLevel.MEDIUM, RiskLevel.MEDIUM),
+    ]
+    solved = ExtensionSolver(risk_rules, engine, [RISK_LITERALS]).solve({"coughing_blood", "fatigue"})
+    predicted = sorted(ext.predicted.value for ext in solved["extensions"])
+    assert predicted == ["High", "Medium"], predicted
+    print(f"Exclusive risk extensions: {predicted}")
+
+
+if __name__ == "__main__":
+    main()
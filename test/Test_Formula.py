@@ -0,0 +1,82 @@
+import numpy as np
+from Logic.Modal_Logic.Formula import FALSE, TRUE, And, Atom, Box, Diamond, Formula, Implies, Not, Or, parse_formula
+from Logic.Modal_Logic.Helpers import create_lung_disease_modal_model
+
+
+def random_formula(rng: np.random.Generator, names, depth: int) -> Formula:
+    if depth == 0 or rng.random() < 0.2:
+        return Atom(str(rng.choice(names))) if rng.random() < 0.8 else (TRUE if rng.random() < 0.5 else FALSE)
+    op = rng.choice(['not', 'box', 'diamond', 'and', 'or', 'implies'])
+    if op in ('not', 'box', 'diamond'):
+        return Formula(op, (random_formula(rng, names, depth - 1),))
+    return Formula(op, (random_formula(rng, names, depth - 1), random_formula(rng, names, depth - 1)))
+
+
+def main():
+    print("=" * 60)
+    print("MODAL FORMULAS: PARSER AND MODEL CHECKER")
+    print("=" * 60)
+
+    a, b, c, d = Atom('a'), Atom('b'), Atom('c'), Atom('d')
+
+    # Precedence: ¬ □ ◇ > ∧ > ∨ > →, → right-associative
+    assert parse_formula("a & b | c -> d -> a") is Implies(Or(And(a, b), c), Implies(d, a))
+    assert parse_formula("~a & []b | <>c") is Or(And(Not(a), Box(b)), Diamond(c))
+    assert parse_formula("(a -> b) -> c") is Implies(Implies(a, b), c)
+    assert parse_formula("[](a -> <>b) & ~c") is parse_formula("□(a → ◇b) ∧ ¬c")
+    assert parse_formula("box box a") is Box(a, 2)
+
+    # Hash-consing: shared subformulas are one node
+    formula = parse_formula("(a & b) | ~(a & b)")
+    assert formula.args[0] is formula.args[1].args[0]
+
+    for text in ("a &", "(a", "a b", "& a", "a $ b"):
+        try:
+            parse_formula(text)
+        except ValueError:
+            continue
+        raise AssertionError(f"No error for {text!r}")
+    print("\nPrecedence, shared nodes and errors: ok")
+
+    # Round-trip: printing then parsing gives back the same node
+    rng = np.random.default_rng(0)
+    model = create_lung_disease_modal_model()
+    for _ in range(300):
+        formula = random_formula(rng, model.bit_names, 4)
+        assert parse_formula(str(formula)) is formula, str(formula)
+    print("Round-trip of 300 random formulas: ok")
+
+    # □p and ◇p agree with knows() and possibly()
+    for world in model.worlds:
+        for name in model.bit_names:
+            assert model.holds(world, f"□{name}") == model.knows(world, name)
+            assert model.holds(world, f"◇{name}") == model.possibly(world, name)
+    print("□ / ◇ against knows() / possibly(): ok")
+
+    # Editing the model: in place is refused, assigning recompiles every cache
+    world = model.worlds[0]
+    name = next(n for n in model.bit_names if not model.believes(world, n))
+    before = model.satisfaction(name)
+    try:
+        model.valuation[world] = {name}
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("In-place valuation edit accepted")
+    valuation = dict(model.valuation)
+    valuation[world] = valuation[world] | {name}
+    model.valuation = valuation
+    assert model.believes(world, name) and model.holds(world, name)
+    assert model.satisfaction(name)[0] and not before[0]
+    for other in model.worlds:
+        assert model.holds(other, f"□{name}") == model.knows(other, name)
+        assert model.believes(other, name) == model.holds(other, name)
+
+    model.accessibility = {w: set() for w in model.worlds}
+    assert not any(model.possibly(w, name) for w in model.worlds)
+    assert not model.satisfaction(f"◇{name}").any()
+    print("Model edits: caches follow the new valuation and accessibility")
+
+
+if __name__ == "__main__":
+    main()
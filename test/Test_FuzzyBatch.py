@@ -0,0 +1,108 @@
+import os
+import tempfile
+import numpy as np
+import skfuzzy as fuzz
+from Logic.Fuzzy_logic.Defuzzify import METHODS, shape_vertices
+from Logic.Fuzzy_logic.Engine import FuzzyLungDiseaseSystem, FuzzyParameters
+from Logic.Fuzzy_logic.Snapshot import FuzzySnapshot
+from Logic.Fuzzy_logic.Surface import RiskSurface, _risk_ranks
+
+
+def synthetic_inputs(n: int = 400, seed: int = 0) -> np.ndarray:
+    """Entrées (N, 7) dans l'ordre input_names: niveaux du CSV, valeurs réelles et bornes"""
+    rng = np.random.default_rng(seed)
+    symptoms = np.where(rng.random((n, 6)) < 0.5, (rng.integers(1, 10, (n, 6)) - 1) * 1.25, rng.uniform(-1, 11, (n, 6)))
+    age = np.where(rng.random(n) < 0.5, rng.integers(14, 80, n), rng.uniform(0, 100, n))
+    return np.column_stack([symptoms, age])
+
+
+def simulate(system: FuzzyLungDiseaseSystem, row: np.ndarray) -> float:
+    """Sortie du ControlSystemSimulation skfuzzy, NaN quand il échoue (aucune règle active)"""
+    simulation = system.simulation
+    for name, value in zip(system.input_names, row):
+        simulation.input[name] = value
+    try:
+        simulation.compute()
+        return simulation.output['risk_level']
+    except (ValueError, AssertionError, KeyError):
+        return np.nan
+
+
+def sampled_defuzzification(system: FuzzyLungDiseaseSystem, cuts: np.ndarray, method: str) -> np.ndarray:
+    """Défuzzification skfuzzy de l'agrégation sur un univers très fin"""
+    output = system.snapshot.definition['output'][1]
+    universe = np.linspace(system._output_universe.min(), system._output_universe.max(), 20_001)
+    crisp = np.full(len(cuts), np.nan)
+    for i, row in enumerate(cuts):
+        aggregated = np.zeros_like(universe)
+        for cut, label in zip(row, system.snapshot.output_labels):
+            np.maximum(aggregated, np.minimum(cut, np.interp(universe, *shape_vertices(*output[label]))), out=aggregated)
+        if aggregated.any():
+            crisp[i] = fuzz.defuzz(universe, aggregated, method)
+    return crisp
+
+
+def main():
+    print("=" * 60)
+    print("MAMDANI VECTORISÉ VS SKFUZZY")
+    print("=" * 60)
+
+    x = synthetic_inputs()
+    system = FuzzyLungDiseaseSystem(parameters=FuzzyParameters(), cache=False)
+
+    # evaluate_batch == ControlSystemSimulation, patient par patient
+    batch = system.evaluate_batch(x)
+    expected = np.array([simulate(system, row) for row in batch['inputs']])
+    assert np.array_equal(np.isnan(expected), batch['fallback'])
+    kept = ~batch['fallback']
+    difference = np.abs(batch['risk_value'][kept] - expected[kept]).max()
+    assert difference < 1e-9, difference
+    print(f"\n{len(x)} patients ({int(batch['fallback'].sum())} en secours), écart maximal: {difference:.2e}")
+
+    # Défuzzification analytique == échantillonnage fin
+    cuts = system._mamdani_cuts(system._universe_clip(system._clip_inputs(x[:100])))
+    for method in METHODS:
+        analytic = FuzzyLungDiseaseSystem(method, snapshot=system.snapshot, parameters=FuzzyParameters())
+        exact = analytic._defuzzify(cuts)
+        sampled = sampled_defuzzification(system, cuts, method)
+        assert np.array_equal(np.isnan(exact), np.isnan(sampled))
+        gap = np.nanmax(np.abs(exact - sampled))
+        assert gap < 1e-3, (method, gap)
+        print(f"{method}: écart maximal avec l'échantillonnage {gap:.2e}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Snapshot: aller-retour par fichier
+        path = os.path.join(directory, 'snapshot.npz')
+        system.snapshot.save(path)
+        loaded = FuzzySnapshot.load(path)
+        for name, value in vars(system.snapshot).items():
+            other = getattr(loaded, name)
+            if isinstance(value, list) and value and isinstance(value[0], np.ndarray):
+                assert all(np.array_equal(a, b) for a, b in zip(value, other)), name
+            elif isinstance(value, np.ndarray):
+                assert np.array_equal(value, other) and value.dtype == other.dtype, name
+            else:
+                assert value == other, name
+        reloaded = FuzzyLungDiseaseSystem(snapshot=loaded, parameters=FuzzyParameters())
+        assert np.array_equal(reloaded.compute_batch(x), system.compute_batch(x), equal_nan=True)
+        print("Snapshot: aller-retour identique")
+
+        # Surface sur une petite grille: valeurs exactes aux points de la grille
+        axes = [np.array([0., 5., 10.])] * 6 + [np.array([30., 55., 80.])]
+        surface = RiskSurface.build(system, cache_dir=directory, axes=axes)
+        grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+        exact = system.compute_batch(grid)
+        thresholds = system.parameters.risk_thresholds
+        looked_up = surface.lookup(grid)
+        assert np.array_equal(np.isnan(looked_up), np.isnan(exact))
+        assert np.allclose(looked_up, exact, rtol=1e-3, atol=1e-3, equal_nan=True)
+        assert np.array_equal(surface.level_ranks(grid), _risk_ranks(exact, thresholds))
+
+        system.surface = surface
+        assert np.array_equal(_risk_ranks(system.compute_batch(grid), thresholds), _risk_ranks(exact, thresholds))
+        system.surface = None
+        print(f"Surface sur {len(grid)} points: sorties et classes exactes")
+
+
+if __name__ == "__main__":
+    main()
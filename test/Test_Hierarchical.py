@@ -0,0 +1,49 @@
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+from Logic.Fuzzy_logic.Helpers import analyze_dataset_with_fuzzy, create_patient_from_csv_row
+from Logic.Fuzzy_logic.Hierarchical import HierarchicalFuzzySystem
+
+
+def synthetic_rows(n: int = 200, seed: int = 0) -> pd.DataFrame:
+    """Lignes au format du CSV (sans data/lung_cancer.csv): niveaux 1-9, âge, niveau de risque"""
+    rng = np.random.default_rng(seed)
+    columns = list(HierarchicalFuzzySystem.symptom_mapping.values())
+    df = pd.DataFrame({column: rng.integers(1, 10, n) for column in columns})
+    df.insert(0, 'Age', rng.integers(14, 80, n))
+    df.insert(0, 'Patient Id', [f"P{i}" for i in range(n)])
+    df['Level'] = rng.choice(['Low', 'Medium', 'High'], n)
+    return df
+
+
+def main():
+    print("=" * 60)
+    print("HIERARCHICAL FUZZY SYSTEM: PATIENT VS BATCH")
+    print("=" * 60)
+
+    df = synthetic_rows()
+    system = HierarchicalFuzzySystem()
+
+    # Les deux chemins affichent chaque patient: sortie masquée
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = analyze_dataset_with_fuzzy(df, verbose=False, hierarchical=True)
+        single = [system.evaluate_patient(create_patient_from_csv_row(row, system.symptom_mapping))
+                  for _, row in df.iterrows()]
+
+    # Chaque colonne du mapping devient un symptôme du patient
+    patient = single[0]['patient']
+    assert len(patient.symptoms) == len(system.symptom_mapping), len(patient.symptoms)
+
+    batch_values = np.array([r['risk_value'] for r in batch])
+    single_values = np.array([r['risk_value'] for r in single])
+    difference = np.abs(batch_values - single_values).max()
+    assert difference < 1e-9, difference
+    assert [r['predicted_risk'] for r in batch] == [r['risk_level'] for r in single]
+
+    print(f"\n{len(df)} patients, écart maximal: {difference:.2e}")
+    print("Patient par patient et batch: mêmes résultats")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from Logic.Modal_Logic.Helpers import (SYMPTOM_MAPPING, count_valuations, create_induced_modal_model,
+                                       create_lung_disease_modal_model, create_patient_columns)
+from Logic.Modal_Logic.Induction import ValuationCounts
+
+
+def synthetic_rows(n: int = 20000, seed: int = 0) -> pd.DataFrame:
+    """Labelled rows in the CSV layout (no data/lung_cancer.csv needed), a few with an unknown level"""
+    rng = np.random.default_rng(seed)
+    columns = list(SYMPTOM_MAPPING) + ['Smoking', 'Passive Smoker']
+    df = pd.DataFrame({column: rng.integers(1, 10, n) for column in columns})
+    df['Age'] = rng.integers(14, 80, n)
+    df['Gender'] = rng.integers(1, 3, n)
+    df['Patient Id'] = [f"P{i}" for i in range(n)]
+    df['Level'] = rng.choice(['Low', 'Medium', 'High', 'unknown'], n, p=[0.33, 0.33, 0.33, 0.01])
+    return df
+
+
+def single_pass(df: pd.DataFrame) -> ValuationCounts:
+    """Reference table: every row at once, counted per class with boolean masks"""
+    model = create_lung_disease_modal_model()
+    matrix = model.evaluate_columns(create_patient_columns(df), len(df))
+    labels = df['Level'].str.strip().str.capitalize().to_numpy()
+    counts = ValuationCounts(['Low', 'Medium', 'High'], list(model.propositions))
+    counts.counts = np.array([matrix[labels == level].sum(axis=0) for level in counts.classes])
+    counts.totals = np.array([(labels == level).sum() for level in counts.classes])
+    return counts
+
+
+def main():
+    print("=" * 60)
+    print("VALUATION INDUCTION: STREAMED COUNTS")
+    print("=" * 60)
+
+    df = synthetic_rows()
+    reference = single_pass(df)
+
+    streamed = {
+        'one chunk': count_valuations(df, chunksize=len(df)),
+        'chunks of 3000': count_valuations(df, chunksize=3000),
+        'iterable of chunks': count_valuations(df.iloc[start:start + 7000] for start in range(0, len(df), 7000)),
+        '2 processes': count_valuations(df, chunksize=2500, n_jobs=2),
+    }
+    for name, counts in streamed.items():
+        assert np.array_equal(counts.counts, reference.counts), name
+        assert np.array_equal(counts.totals, reference.totals), name
+        print(f"\n{name}: same table as a single pass ({counts.rows} rows)")
+
+    # merge() of two halves == the whole
+    half = len(df) // 2
+    merged = count_valuations(df.iloc[:half]).merge(count_valuations(df.iloc[half:]))
+    assert np.array_equal(merged.counts, reference.counts)
+
+    # Learned valuations only name propositions
+    model = create_induced_modal_model(reference, min_lift=1.0, min_support=0.2)
+    for world in model.worlds:
+        assert model.valuation[world] <= set(model.propositions), model.valuation[world]
+    print("Merged halves and induced valuations: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+from functools import reduce
+from Logic.Belief_Functions.Mass import Frame, MassFunction, combine
+
+
+def random_masses(rng: np.random.Generator, frame: Frame, shape=(), focal: int = 4) -> np.ndarray:
+    """Random mass functions with a few focal elements each (the empty set excluded)"""
+    masses = np.zeros(tuple(shape) + (frame.n_subsets,))
+    flat = masses.reshape(-1, frame.n_subsets)
+    for row in flat:
+        chosen = rng.choice(np.arange(1, frame.n_subsets), size=min(focal, frame.n_subsets - 1), replace=False)
+        row[chosen] = rng.random(len(chosen))
+        row /= row.sum()
+    return masses
+
+
+def dempster_brute_force(m1: np.ndarray, m2: np.ndarray) -> np.ndarray:
+    """Dempster's rule by enumerating every pair of focal elements"""
+    out = np.zeros_like(m1)
+    for a in np.flatnonzero(m1):
+        for b in np.flatnonzero(m2):
+            out[a & b] += m1[a] * m2[b]
+    conflict = out[0]
+    out[0] = 0.0
+    return out / (1.0 - conflict)
+
+
+def main():
+    print("=" * 60)
+    print("MASS COMBINATION VS BRUTE-FORCE DEMPSTER")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    for size in (2, 3, 5):
+        frame = Frame([f"h{i}" for i in range(size)])
+        for _ in range(20):
+            sources = [random_masses(rng, frame) for _ in range(rng.integers(2, 5))]
+            expected = reduce(dempster_brute_force, sources)
+            combined = combine([MassFunction(frame, m) for m in sources]).masses
+            assert np.allclose(combined, expected), (size, combined, expected)
+    print("\nDempster (2 to 4 sources, frames of 2, 3, 5): ok")
+
+    # Broadcastable batch shapes, in either order
+    frame = Frame(["low", "medium", "high"])
+    single = MassFunction(frame, random_masses(rng, frame))
+    batched = MassFunction(frame, random_masses(rng, frame, shape=(2,)))
+    forward = combine([single, batched]).masses
+    backward = combine([batched, single]).masses
+    assert forward.shape == backward.shape == (2, frame.n_subsets)
+    assert np.allclose(forward, backward)
+    for k in range(2):
+        assert np.allclose(forward[k], dempster_brute_force(single.masses, batched.masses[k]))
+    print("Batch shapes (8,) with (2, 8), both orders: ok")
+
+    # Total conflict in one row: that row is undefined, the others are combined
+    low = MassFunction.simple(frame, ["low"], np.array([0.5, 1.0, 0.3]))
+    high = MassFunction.simple(frame, ["high"], np.array([0.5, 1.0, 0.0]))
+    combined = combine([low, high])
+    assert combined.undefined().tolist() == [False, True, False]
+    assert np.isnan(combined.masses[1]).all()
+    for k in (0, 2):
+        assert np.allclose(combined.masses[k], dempster_brute_force(low.masses[k], high.masses[k]))
+    print("Total conflict in one row: NaN for that row only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import threading
+import numpy as np
+from dataclasses import replace
+from Knowledge.Hierarchy import RiskLevel
+from Logic.Belief_Functions.Engine import BeliefEngine, RISK_ORDER
+from Logic.Belief_Functions.Online import OnlinePriorAdapter
+
+
+def decayed_frequencies(levels, growth: float) -> np.ndarray:
+    """Reference: event i of n weighs growth ** (i - n + 1), latest weighs 1"""
+    ages = np.arange(len(levels))[::-1]
+    weights = np.exp(-ages * np.log(growth))
+    counts = np.array([weights[np.array(levels) == level].sum() for level in RISK_ORDER])
+    return counts / counts.sum()
+
+
+def main():
+    print("=" * 60)
+    print("ONLINE PRIOR ADAPTATION")
+    print("=" * 60)
+
+    # Half-life: one LOW then half_life HIGH events, the LOW counts half the latest
+    half_life = 50
+    adapter = OnlinePriorAdapter(half_life=half_life, publish_every=0)
+    adapter.observe(RiskLevel.LOW, RiskLevel.LOW)
+    for _ in range(half_life):
+        adapter.observe(RiskLevel.HIGH, "high")
+    counts, total, weight, events = adapter._snapshot()
+    latest = weight / adapter.growth
+    assert events == half_life + 1
+    assert abs(counts[0] / latest - 0.5) < 1e-12, counts[0] / latest
+
+    # Effective sample size of n events: geometric sum of their relative weights
+    n = events
+    expected = (1 - adapter.growth ** -n) / (1 - 1 / adapter.growth)
+    assert abs(adapter.effective_sample_size() - expected) < 1e-9, (adapter.effective_sample_size(), expected)
+    print(f"\nHalf-life {half_life}: ok, effective sample size {expected:.2f}")
+
+    # Rescale: growth 2 passes 1e150 after ~500 events, frequencies keep their value
+    rng = np.random.default_rng(0)
+    adapter = OnlinePriorAdapter(half_life=1.0, publish_every=0)
+    levels = list(rng.choice(RISK_ORDER, 2000))
+    for level in levels:
+        adapter.observe(level, level)
+        assert adapter._weight <= 1e150
+    frequencies = np.array(list(adapter.class_frequencies().values()))
+    assert np.allclose(frequencies, decayed_frequencies(levels, 2.0)), frequencies
+    assert abs(adapter.effective_sample_size() - 2.0) < 1e-9
+    print("Rescale past 1e150: ok")
+
+    # Threads publishing on every event, with a params swap in the middle
+    adapter = OnlinePriorAdapter(half_life=200, publish_every=1)
+    engine = adapter.attach(BeliefEngine())
+    recalibrated = replace(engine.params, gate_threshold=0.5)
+    threads_count, per_thread = 8, 300
+
+    def swap():
+        engine.params = replace(recalibrated, priors=dict(engine.params.priors))
+
+    barrier = threading.Barrier(threads_count, action=swap)
+
+    def stream(seed: int):
+        local = np.random.default_rng(seed)
+        for i in range(per_thread):
+            if i == per_thread // 2:
+                barrier.wait()
+            level = RISK_ORDER[local.integers(len(RISK_ORDER))]
+            adapter.observe(level, level)
+
+    threads = [threading.Thread(target=stream, args=(seed,)) for seed in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert adapter.events == threads_count * per_thread
+    assert engine.params.gate_threshold == recalibrated.gate_threshold
+    assert engine.params.priors == adapter.priors(), (engine.params.priors, adapter.priors())
+    print(f"{threads_count} publishing threads: engine ends with the newest priors and the swapped params")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import numpy as np
+from Knowledge.Hierarchy import Patient, RiskLevel, Symptom
+from Logic.Modal_Logic.Engine import ModalLogic, PossibleWorld, Proposition, Threshold
+
+FEATURES = ['age', 's0', 's1', 's2', 's3']
+LEVELS = list(RiskLevel)
+
+
+def random_threshold(rng: np.random.Generator) -> Threshold:
+    """Bounds on a few integer points so that values land on them, strict or not"""
+    feature = str(rng.choice(FEATURES))
+    scale = 10 if feature == 'age' else 1
+    low, high = sorted(rng.integers(0, 10, 2) * scale)
+    kind = rng.integers(3)
+    return Threshold(
+        feature,
+        low=float(low) if kind != 1 else None,
+        high=float(high) if kind != 0 else None,
+        low_strict=bool(rng.integers(2)),
+        high_strict=bool(rng.integers(2)),
+    )
+
+
+def random_model(rng: np.random.Generator, n_worlds: int, n_propositions: int, density: float) -> ModalLogic:
+    """Thresholds plus two valuation-only names; some worlds have an empty valuation"""
+    propositions = [Proposition(f"p{k}", "", random_threshold(rng)) for k in range(n_propositions)]
+    names = [p.name for p in propositions] + ['only_a', 'only_b']
+    worlds = [PossibleWorld(LEVELS[i % 3], f"w{i}") for i in range(n_worlds)]
+    valuation = {
+        world: set() if rng.random() < 0.05 else {name for name in names if rng.random() < density}
+        for world in worlds
+    }
+    return ModalLogic(worlds=worlds, accessibility={}, valuation=valuation, propositions=propositions)
+
+
+def reference_ranking(model: ModalLogic, patient_propositions: set, top_n: int):
+    """Ranking of the original get_most_likely_worlds: sets and sorted()"""
+    evaluations = []
+    for world in model.worlds:
+        world_propositions = model.valuation.get(world, set())
+        score = len(patient_propositions & world_propositions)
+        percentage = score / len(world_propositions) * 100 if world_propositions else 0
+        evaluations.append((world, percentage, score, score >= 2))
+    candidates = [e for e in evaluations if e[3]] or evaluations
+    ranked = sorted(candidates, key=lambda e: (e[1], e[2]), reverse=True)[:top_n]
+    return [(world, percentage, score, possible) for world, percentage, score, possible in ranked]
+
+
+def check_ranking(model: ModalLogic, rng: np.random.Generator, n_masks: int = 60):
+    n = len(model.propositions)
+    full = (1 << n) - 1
+    masks = [0, full, 1, 1 << (n - 1)] + [
+        sum(1 << b for b in range(n) if rng.random() < rate) for rate in rng.uniform(0.02, 0.8, n_masks)
+    ]
+    words = np.array([model.words(mask) for mask in masks])
+    for top_n in (1, 3, len(model.worlds) + 5):
+        order, scores, percentages, possible = model.rank_worlds(words, top_n)
+        batch = model.get_most_likely_worlds_batch(words, top_n)
+        for k, mask in enumerate(masks):
+            expected = reference_ranking(model, model.names(mask), top_n)
+            indices = [model.world_index[world] for world, _, _, _ in expected]
+
+            dense = [i for i in order[k].tolist() if i >= 0]
+            assert dense == indices, (top_n, mask, dense, indices)
+            assert [scores[k, i] for i in dense] == [score for _, _, score, _ in expected]
+
+            sparse_order, sparse_scores, sparse_percentages, sparse_possible = model.rank_sparse(mask, top_n)
+            assert sparse_order == indices, (top_n, mask, sparse_order, indices)
+            for i, (_, percentage, score, is_possible) in zip(sparse_order, expected):
+                assert sparse_scores[i] == score and sparse_possible[i] == is_possible
+                assert sparse_percentages[i] == percentage
+
+            got = [(r['world'], r['match_percentage'], r['match_score'], r['is_possible']) for r in batch[k]]
+            assert got == expected, (top_n, mask)
+
+
+def check_columns(model: ModalLogic, rng: np.random.Generator, n: int = 400):
+    """evaluate_columns against Threshold.__call__ / patient_mask on bounds, NaN and missing columns"""
+    points = np.array(sorted({b for p in model.propositions.values() for b in p.fn.bounds()}))
+    values = {}
+    for feature in FEATURES:
+        on_bounds = rng.choice(points, n) if len(points) else np.zeros(n)
+        near = on_bounds + rng.choice([-0.5, 0., 0.5], n)
+        column = np.where(rng.random(n) < 0.5, on_bounds, near)
+        if feature != 'age':
+            column = np.where(rng.random(n) < 0.1, np.nan, column)
+        values[feature] = column
+
+    # s3 has no column at all: the symptom is absent for everyone
+    present = {feature: rng.random(n) < 0.8 for feature in ('s0', 's1', 's2')}
+    columns = {'age': (values['age'], np.ones(n, dtype=bool))}
+    columns.update({feature: (values[feature], present[feature]) for feature in present})
+
+    patients = []
+    for i in range(n):
+        symptoms = [
+            Symptom(feature, values[feature][i]) for feature in present
+            if present[feature][i] and not np.isnan(values[feature][i])
+        ]
+        patients.append(Patient(f"P{i}", values['age'][i], 'M', symptoms))
+
+    matrix = model.evaluate_columns(columns, n)
+    for i, patient in enumerate(patients):
+        expected = [bool(p(patient)) for p in model.propositions.values()]
+        assert matrix[i].tolist() == expected, (i, patient)
+        assert model.int_mask(model.masks_from_matrix(matrix[i:i + 1])[0]) == model.patient_mask(patient)
+
+
+def main():
+    print("=" * 60)
+    print("WORLD RANKING AND COLUMN-WISE PROPOSITIONS")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    # 3 and 40 worlds rank with int masks, 300 through bincount, 3000 through unique
+    for n_worlds, n_propositions, density in ((3, 12, 0.5), (40, 20, 0.3), (300, 70, 0.4), (3000, 90, 0.02)):
+        model = random_model(rng, n_worlds, n_propositions, density)
+        check_ranking(model, rng)
+        print(f"\n{n_worlds} worlds, {n_propositions} propositions: rank_worlds == rank_sparse == sorted()")
+
+        check_columns(model, rng)
+        print(f"{n_worlds} worlds: evaluate_columns == Threshold / patient_mask")
+
+
+if __name__ == "__main__":
+    main()